@@ -0,0 +1,87 @@
+import argparse
+import json
+
+from utils.run_control import RunConfig, install_stop_handlers
+
+# -----------------------------------
+
+# DEF: Parse a JSON option value (e.g. --cam-settings '{"1": {"detector": "yunet"}}')
+def json_option(value):
+    return json.loads(value)
+
+# DEF: Build the argument parser for the headless runner
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the Single or Hybrid model from the command line (headless by default)")
+    parser.add_argument("model", choices=["single", "hybrid"])
+    parser.add_argument("--cams", type=int, nargs="+", default=[0], help="Camera IDs")
+    parser.add_argument("--framerate", type=int, default=24)
+    parser.add_argument("--frequency", type=int, default=24, help="Analyse each camera at most once every N frames")
+    parser.add_argument("--detector", default="haar", help="Hybrid model detector backend")
+    parser.add_argument("--cam-settings", type=json_option, help="Per-camera settings as JSON, keyed by camera ID")
+    parser.add_argument("--actions", nargs="*", default=["age", "gender", "race"], choices=["age", "gender", "race"],
+                        help="Attributes to analyse (only their models are loaded), none for detection-only counts")
+    parser.add_argument("--workers", type=int, default=0, help="Inference processes (0 = analyse inline)")
+    parser.add_argument("--shared-capture", action="store_true", help="Capture in separate processes into shared memory (no frame copies)")
+    parser.add_argument("--capture-processes", type=int, help="Capture processes for --shared-capture (cameras are split between them)")
+    parser.add_argument("--tracking", action="store_true", help="Save one aggregated record per tracked face")
+    parser.add_argument("--motion", action="store_true", help="Only detect faces on cameras with recent motion")
+    parser.add_argument("--embeddings", action="store_true", help="Store face embeddings for re-identification searches")
+    parser.add_argument("--crops", action="store_true", help="Keep a JPEG crop of every saved face")
+    parser.add_argument("--result-cache", action="store_true", help="Reuse the result of a near-identical face seen recently on the same camera")
+    parser.add_argument("--retention-days", type=int, help="Drop saved faces older than this many days (checked hourly)")
+    parser.add_argument("--detect-width", type=int, help="Downscale frames to this width for detection (crops stay full resolution)")
+
+    limits = parser.add_argument_group("run limits")
+    limits.add_argument("--max-frames", type=int, help="Stop after this many frames")
+    limits.add_argument("--max-duration", type=float, help="Stop after this many seconds")
+    limits.add_argument("--max-faces", type=int, help="Stop after this many analysed faces")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--display", action="store_true", help="Show the camera feeds")
+    output.add_argument("--display-fps", type=float, default=10, help="Maximum feed refreshes per second")
+    output.add_argument("--metrics-port", type=int, help="Serve metrics on http://127.0.0.1:<port>/metrics")
+    output.add_argument("--metrics-path", help="Write a JSON metrics snapshot at the end of the run")
+    return parser
+
+# Main
+# SIGINT/SIGTERM stop the run cleanly: in-flight work is drained, writers are flushed and cameras released
+def main():
+    args = build_parser().parse_args()
+
+    # JSON object keys are strings, camera IDs are ints
+    cam_settings = {int(cam_id): settings for cam_id, settings in args.cam_settings.items()} if args.cam_settings else None
+    config = RunConfig(
+        framerate=args.framerate,
+        frequency=args.frequency,
+        cam_ids=args.cams,
+        detector=args.detector,
+        cam_settings=cam_settings,
+        workers=args.workers,
+        actions=args.actions,
+        shared_capture=({"processes": args.capture_processes} if args.capture_processes else True) if args.shared_capture else None,
+        tracking=args.tracking,
+        motion=args.motion or None,
+        detection={"detect_width": args.detect_width} if args.detect_width else None,
+        embeddings=args.embeddings or None,
+        crops=args.crops or None,
+        retention=args.retention_days,
+        result_cache=args.result_cache or None,
+        metrics_port=args.metrics_port,
+        metrics_path=args.metrics_path,
+        display=args.display,
+        display_fps=args.display_fps,
+        max_frames=args.max_frames,
+        max_duration=args.max_duration,
+        max_faces=args.max_faces,
+        stop_event=install_stop_handlers(),
+    )
+
+    if args.model == "hybrid":
+        from intellai_hybrid import HybridModel
+        HybridModel().run_model(config)
+    else:
+        from intellai_single import SingleModel
+        SingleModel().run_model(config)
+
+if __name__ == "__main__":
+    main()
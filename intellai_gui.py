@@ -1,21 +1,90 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog
 import threading
+from bisect import bisect_left
 
-from utils.db_utils import filter_entries, reset_db
-from intellai_single import SingleModel
-from intellai_hybrid import HybridModel
+import numpy as np
+
+from utils.db_utils import query_page, query_new, count_entries, last_entry_id, reset_db, sort_key, cursor_key, SORT_COLUMNS
+from utils.export import export_entries
+from utils.update_bus import UpdateBus
+
+# The models (DeepFace, TensorFlow, Keras) are imported on first use or by the background warm-up,
+# so the window appears without waiting for them
+
+# Rows fetched per database page, and the largest count shown exactly in the manager info
+PAGE_SIZE = 200
+MAX_COUNT = 100000
+# Pages kept in the table at once, pages far from the visible rows are dropped and fetched again when scrolled back to
+MAX_LOADED_PAGES = 5
+
+# GUI refresh interval for model updates (ms), and how often the database viewer picks up new rows while a model runs
+UI_INTERVAL_MS = 100
+DB_REFRESH_MS = 2000
+
+# Background warm-up steps, in order (shown as progress in the model controls)
+WARM_UP_STEPS = ("Importing DeepFace", "Building age model", "Building gender model", "Building race model", "Loading face detectors", "Running test inference")
+
+# Database viewer columns and the face_data columns they sort by
+DB_COLUMNS = {"ID": "id", "Age": "age", "Gender": "gender", "Race": "race", "Timestamp": "timestamp"}
+
+# CLASS: Row sort key compared in reverse, so a descending view's keys are an ascending list (for bisect)
+class ReversedKey:
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
 
 class intellai_gui(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("IntellAI Cam Manager")
         self.geometry("1000x900")
+
+        # Database viewer paging state
+        self.sort_column = "timestamp"
+        self.sort_descending = True
+        self.db_filters = {}
+        self.filter_info = ""
+        self.next_page = None
+        self.prev_page = None
+        self.loaded_rows = 0
+        self.rows_above = 0
+        self.row_keys = []
+        self.row_cursors = []
+        self.total_rows = 0
+        self.last_id = 0
+
+        # Model threads publish status updates to the bus, the GUI drains it every UI_INTERVAL_MS
+        self.update_bus = UpdateBus()
+        self.model_running = False
+        self.db_refresh_due = 0
+
+        # New rows are queried on a background thread and published as (generation, rows) to the refresh bus
+        # The generation changes with every reload, so rows queried for an old filter or sort are dropped
+        self.refresh_bus = UpdateBus()
+        self.refresh_running = False
+        self.db_generation = 0
+
+        # Model objects, created on first use (see get_model)
+        self.models = {}
+        self.models_lock = threading.Lock()
+
+        # Warm-up progress is published to its own bus and shown in the model controls
+        self.warm_up_bus = UpdateBus()
+        self.warm_up_done = threading.Event()
+
+        # Exports run on their own thread and publish (finished, message) to the export bus
+        self.export_bus = UpdateBus()
+        self.export_stop = None
+
         self.create_widgets()
 
-        # Initialize model objects
-        self.single_model = SingleModel()
-        self.hybrid_model = HybridModel()
+        self.after(UI_INTERVAL_MS, self.poll_updates)
+        threading.Thread(target=self.warm_up_thread, daemon=True).start()
 
     def create_widgets(self):
         # FRAME: Models
@@ -27,6 +96,12 @@ class intellai_gui(tk.Tk):
         hybrid_button = ttk.Button(control_frame, text="Run Hybrid Model", command=self.run_hybrid_model)
         hybrid_button.pack(side="left", padx=5)
 
+        # Background warm-up progress
+        self.warm_up_label = ttk.Label(control_frame, text="Warm-up: starting...")
+        self.warm_up_label.pack(side="right", padx=5)
+        self.warm_up_progress = ttk.Progressbar(control_frame, maximum=len(WARM_UP_STEPS), length=150)
+        self.warm_up_progress.pack(side="right", padx=5)
+
         # FRAME: Analysis Section (holds current + previous side-by-side)
         analysis_section_frame = ttk.Frame(self)
         analysis_section_frame.pack(fill="x", padx=10, pady=5)
@@ -90,31 +165,47 @@ class intellai_gui(tk.Tk):
         ttk.Button(filter_frame, text="Reset DB", command=self.reset_db).pack(side="right")
 
         # Refresh DB button
-        ttk.Button(filter_frame, text="Refresh DB", command=self.load_db_entries).pack(side="right")
+        ttk.Button(filter_frame, text="Refresh DB", command=self.refresh_db_entries).pack(side="right")
+
+        # Export button (exports the rows matching the applied filter, becomes Cancel Export while running)
+        self.export_button = ttk.Button(filter_frame, text="Export...", command=self.export_db_entries)
+        self.export_button.pack(side="right")
 
         # Show database table
-        self.db_table = ttk.Treeview(db_frame, columns=("ID", "Age", "Gender", "Race", "Timestamp"), show="headings")
+        # Rows are fetched a page at a time, the next page loads when scrolling near the bottom
+        table_frame = ttk.Frame(db_frame)
+        table_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        self.db_scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
+        self.db_table = ttk.Treeview(table_frame, columns=tuple(DB_COLUMNS), show="headings", yscrollcommand=self.on_table_scroll)
+        self.db_scrollbar.configure(command=self.db_table.yview)
         for col in self.db_table["columns"]:
-            self.db_table.heading(col, text=col, command=lambda _col=col: self.sort_by_column(_col, False))
+            self.db_table.heading(col, text=col, command=lambda _col=col: self.sort_by_column(_col))
             if col == "ID":
                 self.db_table.column(col, width=15, anchor="center")
             else:
                 self.db_table.column(col, anchor="center")
-        self.db_table.pack(fill="both", expand=True, padx=5, pady=5)
+        self.db_scrollbar.pack(side="right", fill="y")
+        self.db_table.pack(side="left", fill="both", expand=True)
 
     # DEF: Sorts database viewer by column
-    def sort_by_column(self, col, descending):
-        data = [(self.db_table.set(child, col), child) for child in self.db_table.get_children()]
-
-        try:
-            data.sort(key=lambda t: float(t[0]), reverse=descending)
-        except ValueError:
-            data.sort(reverse=descending)
-
-        for index, (_, child) in enumerate(data):
-            self.db_table.move(child, '', index)
+    # Sorting is done by the database query, clicking the same column again flips the direction
+    def sort_by_column(self, col):
+        column = DB_COLUMNS[col]
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = column in ("id", "timestamp")
+        self.load_db_entries()
 
-        self.db_table.heading(col, command=lambda: self.sort_by_column(col, not descending))
+    # DEF: Scroll handler for the database table
+    # Updates the scrollbar and fetches the next (or dropped previous) page when the edge of the loaded rows comes into view
+    def on_table_scroll(self, first, last):
+        self.db_scrollbar.set(first, last)
+        if self.next_page is not None and float(last) > 0.9:
+            self.load_next_page()
+        elif self.prev_page is not None and float(first) < 0.1:
+            self.load_previous_page()
 
     # DEF: Resets the database
     # Uses db_utils function to delete the database file and reload entries
@@ -124,7 +215,7 @@ class intellai_gui(tk.Tk):
         self.update_manager_info("Database reset.")
 
     # DEF: Loads database entries into the table
-    # Uses db_utils functions, gets all entries or filtered entries
+    # Uses db_utils functions, loads the first page of filtered entries and counts the total
     def load_db_entries(self):
         for row in self.db_table.get_children():
             self.db_table.delete(row)
@@ -144,24 +235,232 @@ class intellai_gui(tk.Tk):
         except ValueError:
             max_age_val = None
 
-        rows = filter_entries(
-            gender=gender,
-            race=race,
-            min_age=min_age_val,
-            max_age=max_age_val
-        )
-
-        for row in rows:
-            self.db_table.insert("", "end", values=row)
+        self.db_filters = {
+            "gender": gender,
+            "race": race,
+            "min_age": min_age_val,
+            "max_age": max_age_val
+        }
+        self.next_page = None
+        self.prev_page = None
+        self.loaded_rows = 0
+        self.rows_above = 0
+        self.row_keys = []
+        self.row_cursors = []
+        self.db_generation += 1
+        # Taken before the first page, rows added in between are skipped by refresh_db_entries as already shown
+        self.last_id = last_entry_id()
+        self.total_rows = count_entries(max_count=MAX_COUNT, **self.db_filters)
+        self.load_next_page(first_page=True)
 
         if min_age_val is None:
             min_age = "None"
         if max_age_val is None:
             max_age = "None"
 
+        self.filter_info = f"Filter: [Gender = {gender}]  [Race = {race}]  [Min Age = {min_age}]  [Max Age = {max_age}]"
+        self.update_entries_info()
+
+    # DEF: Fetches the next page of entries and appends it to the table
+    def load_next_page(self, first_page=False):
+        if not first_page and self.next_page is None:
+            return
+
+        rows, self.next_page = query_page(
+            order_by=self.sort_column,
+            descending=self.sort_descending,
+            after=None if first_page else self.next_page,
+            limit=PAGE_SIZE,
+            **self.db_filters
+        )
+
+        for row in rows:
+            if not self.db_table.exists(row[0]):
+                self.db_table.insert("", "end", iid=row[0], values=row)
+                self.row_keys.append(self.view_key(sort_key(row, self.sort_column)))
+                self.row_cursors.append(self.row_cursor(row))
+        self.loaded_rows = len(self.row_keys)
+
+        if not first_page:
+            self.drop_pages(above=True)
+            self.update_entries_info()
+
+    # DEF: Fetches the page before the first loaded row (dropped earlier) and puts it back at the top of the table
+    # The same query as load_next_page in the opposite direction, so the rows come nearest first
+    def load_previous_page(self):
+        if self.prev_page is None:
+            return
+
+        rows, more = query_page(
+            order_by=self.sort_column,
+            descending=not self.sort_descending,
+            after=self.prev_page,
+            limit=PAGE_SIZE,
+            **self.db_filters
+        )
+
+        top, _ = self.visible_rows()
+        added = 0
+        for row in rows:
+            if not self.db_table.exists(row[0]):
+                self.db_table.insert("", 0, iid=row[0], values=row)
+                self.row_keys.insert(0, self.view_key(sort_key(row, self.sort_column)))
+                self.row_cursors.insert(0, self.row_cursor(row))
+                added += 1
+        self.loaded_rows = len(self.row_keys)
+        if more is None:
+            self.prev_page = None
+            self.rows_above = 0
+        else:
+            self.prev_page = self.row_cursors[0]
+            self.rows_above = max(0, self.rows_above - added)
+        # The rows in view stay in view
+        self.db_table.yview_moveto((top + added) / max(self.loaded_rows, 1))
+
+        self.drop_pages(above=False)
+        self.update_entries_info()
+
+    # DEF: Drops loaded rows beyond MAX_LOADED_PAGES pages, from the end away from the visible rows
+    # A page around the visible rows is always kept, the dropped rows are fetched again when scrolled back to
+    def drop_pages(self, above):
+        excess = len(self.row_keys) - MAX_LOADED_PAGES * PAGE_SIZE
+        if excess <= 0:
+            return
+        top, bottom = self.visible_rows()
+        items = self.db_table.get_children()
+        if above:
+            count = min(excess, top - PAGE_SIZE)
+            if count <= 0:
+                return
+            self.db_table.delete(*items[:count])
+            del self.row_keys[:count]
+            del self.row_cursors[:count]
+            self.rows_above += count
+            self.prev_page = self.row_cursors[0]
+            self.db_table.yview_moveto((top - count) / len(self.row_keys))
+        else:
+            count = min(excess, len(items) - bottom - PAGE_SIZE)
+            if count <= 0:
+                return
+            self.db_table.delete(*items[-count:])
+            del self.row_keys[-count:]
+            del self.row_cursors[-count:]
+            self.next_page = self.row_cursors[-1]
+        self.loaded_rows = len(self.row_keys)
+
+    # DEF: Index range of the loaded rows currently in view (first, last)
+    def visible_rows(self):
+        first, last = self.db_table.yview()
+        return round(first * len(self.row_keys)), round(last * len(self.row_keys))
+
+    # DEF: Sort key in the viewer's current order (ascending in display order)
+    def view_key(self, key):
+        return ReversedKey(key) if self.sort_descending else key
+
+    # DEF: Page cursor (sort value, id) of a row in the viewer's current order, as query_page returns
+    def row_cursor(self, row):
+        return row[SORT_COLUMNS.index(self.sort_column)], row[0]
+
+    # DEF: Queries the entries written since the last load or refresh on a background thread
+    # The rows are added to the table by the next poll (apply_new_entries), the GUI thread never waits on the database
+    def refresh_db_entries(self):
+        if self.refresh_running:
+            return
+        self.refresh_running = True
+        threading.Thread(target=self.refresh_thread, args=(self.db_generation, self.last_id, dict(self.db_filters)), daemon=True).start()
+
+    # DEF: Runs a refresh query (refresh thread), only rows with an ID above the last one seen are fetched
+    def refresh_thread(self, generation, last_id, filters):
+        rows = []
+        try:
+            rows = query_new(after_id=last_id, limit=PAGE_SIZE * 10, **filters)
+        except Exception as e:
+            print("Refresh Error:", e)
+        # Always published, so the next refresh can start
+        finally:
+            self.refresh_bus.publish((generation, rows))
+
+    # DEF: Adds entries from a refresh query to the table (GUI thread)
+    # The loaded rows stay in place (no query over the loaded rows). Each new row goes to its sorted position among them,
+    # rows sorting outside the loaded window (before a dropped page or after the next page's cursor)
+    # are left for the page that will contain them
+    def apply_new_entries(self, rows):
+        if not rows:
+            return
+        if len(rows) == PAGE_SIZE * 10:
+            # Too far behind to catch up row by row
+            self.load_db_entries()
+            return
+        self.last_id = max(self.last_id, rows[-1][0])
+        first = self.view_key(cursor_key(self.prev_page)) if self.prev_page is not None else None
+        cursor = self.view_key(cursor_key(self.next_page)) if self.next_page is not None else None
+
+        added = 0
+        for row in rows:
+            if self.db_table.exists(row[0]):
+                continue
+            self.total_rows += 1
+            key = self.view_key(sort_key(row, self.sort_column))
+            if first is not None and key < first:
+                self.rows_above += 1
+                continue
+            if cursor is not None and not key < cursor:
+                continue
+            position = bisect_left(self.row_keys, key)
+            self.row_keys.insert(position, key)
+            self.row_cursors.insert(position, self.row_cursor(row))
+            self.db_table.insert("", position, iid=row[0], values=row)
+            added += 1
+        self.loaded_rows += added
+        self.update_entries_info()
+
+    # DEF: Exports the entries matching the applied filter to a file chosen by the user, or cancels a running export
+    # The export streams rows on a background thread, so the viewer stays usable and memory use stays flat
+    def export_db_entries(self):
+        if self.export_stop is not None:
+            self.export_stop.set()
+            return
+
+        path = filedialog.asksaveasfilename(
+            title="Export entries",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet"), ("Compressed CSV", "*.csv.gz"), ("Compressed JSON Lines", "*.jsonl.gz")]
+        )
+        if not path:
+            return
+
+        self.export_stop = threading.Event()
+        self.export_button.config(text="Cancel Export")
+        threading.Thread(target=self.export_thread, args=(path, dict(self.db_filters), self.export_stop), daemon=True).start()
+
+    # DEF: Runs an export (export thread), progress is shown in the manager info on the next poll
+    def export_thread(self, path, filters, stop_event):
+        # DEF: Publish export progress
+        def progress(exported, total):
+            percent = exported / total * 100 if total else 100
+            self.export_bus.publish((False, f"Exporting... {exported} of {total} entries ({percent:.0f}%)"))
+
+        message = "Export failed, see the console for details."
+        try:
+            exported = export_entries(path, progress=progress, stop_event=stop_event, **filters)
+            if exported is not None:
+                message = f"Exported {exported} entries to {path}"
+            elif stop_event.is_set():
+                message = "Export cancelled."
+        except Exception as e:
+            print("Export Error:", e)
+        # Always finishes, so the button goes back to Export... whatever happened
+        finally:
+            self.export_bus.publish((True, message))
+
+    # DEF: Shows the loaded and total entry counts with the current filter
+    def update_entries_info(self):
+        total = f"{MAX_COUNT}+" if self.total_rows >= MAX_COUNT else str(self.total_rows)
+        order = "DESC" if self.sort_descending else "ASC"
+        shown = f"{self.rows_above + 1}-{self.rows_above + self.loaded_rows}" if self.rows_above else str(self.loaded_rows)
         self.update_manager_info(f"""
-            Showing {len(rows)} entries 
-            \nFilter: [Gender = {gender}]  [Race = {race}]  [Min Age = {min_age}]  [Max Age = {max_age}]
+            Showing {shown} of {total} entries (sorted by {self.sort_column} {order})
+            \n{self.filter_info}
         """)
 
     # DEF: Specifies Single Model to the threading function
@@ -174,25 +473,112 @@ class intellai_gui(tk.Tk):
         self.update_previous_analysis()
         threading.Thread(target=self.run_model_thread, args=("hybrid",), daemon=True).start()
 
+    # DEF: Get a model object, importing its module on first use
+    def get_model(self, model_type):
+        with self.models_lock:
+            model = self.models.get(model_type)
+            if model is None:
+                if model_type == "single":
+                    from intellai_single import SingleModel
+                    model = SingleModel()
+                elif model_type == "hybrid":
+                    from intellai_hybrid import HybridModel
+                    model = HybridModel()
+                else:
+                    raise ValueError(f"Unknown model type: {model_type}")
+                self.models[model_type] = model
+        return model
+
+    # DEF: Imports the models and builds the detector and attribute models in the background
+    # Runs once at startup while the database can already be browsed, progress is shown in the model controls
+    # The models are cached per process, so the first run starts with everything loaded
+    def warm_up_thread(self):
+        step = 0
+        try:
+            self.warm_up_bus.publish((step, WARM_UP_STEPS[step]))
+            single_model = self.get_model("single")
+            hybrid_model = self.get_model("hybrid")
+            from utils.attributes import ACTIONS, get_attribute_model, warm_up_attributes
+            from utils.detectors import get_detector
+
+            for action in ACTIONS:
+                step += 1
+                self.warm_up_bus.publish((step, WARM_UP_STEPS[step]))
+                get_attribute_model(action)
+
+            step += 1
+            self.warm_up_bus.publish((step, WARM_UP_STEPS[step]))
+            get_detector('haar')
+            # First MTCNN call builds its networks
+            single_model.extract(np.zeros((160, 160, 3), dtype=np.uint8))
+
+            step += 1
+            self.warm_up_bus.publish((step, WARM_UP_STEPS[step]))
+            warm_up_attributes(ACTIONS)
+            self.warm_up_bus.publish((step + 1, "Ready"))
+        except Exception as e:
+            print("Warm-up Error:", e)
+            self.warm_up_bus.publish((step, f"Failed ({WARM_UP_STEPS[step]}): {e}"))
+        finally:
+            self.warm_up_done.set()
+
     # DEF: Runs specified analysis model in a separate thread
     def run_model_thread(self, model_type):
         # Indicate the model is running
+        self.model_running = True
         self.update_analysis_info("Processing... Please wait.")
 
         try:
-            if model_type == "single":
-                result = self.single_model.run_model(update_callback=self.update_analysis_info)
-            elif model_type == "hybrid":
-                result = self.hybrid_model.run_model(update_callback=self.update_analysis_info)
-            else:
-                self.update_analysis_info("Unknown Model Type")
-                result = "Unknown Model Type"
+            if not self.warm_up_done.is_set():
+                # Loading the same models twice would only slow both down
+                self.update_analysis_info("Waiting for model warm-up to finish...")
+                self.warm_up_done.wait()
+                self.update_analysis_info("Processing... Please wait.")
+            result = self.get_model(model_type).run_model(update_callback=self.update_analysis_info)
         except Exception as e:
             self.update_analysis_info(f"Error: {str(e)}")
+        finally:
+            self.model_running = False
+
+    # DEF: Applies queued model updates to the GUI (GUI thread, every UI_INTERVAL_MS)
+    # Only the latest status is shown, however many were published since the last poll
+    # While a model runs (and once after it stops) the database viewer is refreshed every DB_REFRESH_MS, the query runs on a background thread
+    def poll_updates(self):
+        messages = self.update_bus.drain()
+        if messages:
+            self.analysis_info_label.config(text=messages[-1])
+
+        warm_up = self.warm_up_bus.drain()
+        if warm_up:
+            step, message = warm_up[-1]
+            self.warm_up_progress.config(value=step)
+            self.warm_up_label.config(text=f"Warm-up: {message}")
+
+        exports = self.export_bus.drain()
+        if exports:
+            self.manager_info_label.config(text=exports[-1][1])
+            if any(finished for finished, _ in exports):
+                self.export_stop = None
+                self.export_button.config(text="Export...")
+
+        for generation, rows in self.refresh_bus.drain():
+            self.refresh_running = False
+            if generation == self.db_generation:
+                self.apply_new_entries(rows)
+
+        if self.model_running or self.db_refresh_due:
+            self.db_refresh_due += UI_INTERVAL_MS
+            # One refresh query at a time, a due refresh waits for the running one to come back
+            if (self.db_refresh_due >= DB_REFRESH_MS or not self.model_running) and not self.refresh_running:
+                self.refresh_db_entries()
+                self.db_refresh_due = UI_INTERVAL_MS if self.model_running else 0
+
+        self.after(UI_INTERVAL_MS, self.poll_updates)
 
     # DEF: Updates analysis info label
+    # Safe to call from model threads, the message is shown on the next poll
     def update_analysis_info(self, message):
-        self.after(0, lambda: self.analysis_info_label.config(text=message))
+        self.update_bus.publish(message)
     
     # DEF: Updates manager info label
     def update_manager_info(self, message):
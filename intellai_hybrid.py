@@ -1,159 +1,67 @@
-import cv2
-from deepface import DeepFace
-
-from utils.model_utils import open_cam, save_analysis
-from utils.timer import Timer
-from utils.db_utils import init_db, save_analysis_db
+from utils.model_utils import get_cam_setting
+from utils.detectors import get_detector
+from utils.attributes import ACTIONS, warm_up_attributes
+from utils.pipeline import FaceModel
 
 # -----------------------------------
 
 # CLASS: Hybrid model implementation for face analysis
-# Uses OpenCV (Haar Cascade) for face detection and DeepFace for analysis
-# Saves analysis to JSON and SQLite database
-class HybridModel:
-    # DEF: Extracts faces from a frame using OpenCV Haar cascades
-    # Returns face image and face coords
-    def extract(self, frame):
+# Uses OpenCV (Haar, LBP, DNN SSD or YuNet) for face detection and DeepFace for analysis
+# Saves analysis to JSON and SQLite database (run loop, saving and summaries in utils/pipeline.py)
+class HybridModel(FaceModel):
+    name = "HYBRID"
+    model_type = "hybrid"
+    log_file = './analysis/hybridmodel_analysis.jsonl'
+
+    # DEF: Extracts faces from a frame using an OpenCV detector backend (see utils/detectors.py)
+    # Detectors are loaded once and reused across frames
+    # stage: optional DetectionStage (downscale, ROI, face size bounds), crops are always taken from the full-resolution frame
+    # Returns list of (face image, face coords) for every face found
+    def extract(self, frame, detector='haar', stage=None):
         try:
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-            faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
-
-            for (x, y, w, h) in faces:
-                faces_coords = (x, y, w, h)
-                face_img = frame[y:y+h, x:x+w]
-
-                return face_img, faces_coords
-            return None, None
+            backend = get_detector(detector)
+            if stage:
+                faces = stage.detect(frame, backend.detect, backend.min_face)
+            else:
+                faces = backend.detect(frame)
+            return [(frame[y:y+h, x:x+w], (x, y, w, h)) for (x, y, w, h) in faces]
         except Exception as e:
             print("Extraction Error:", e)
-            return None, None
+            return []
+
+    # DEF: Extract the faces of one camera's frame with that camera's detector backend (default Haar)
+    def extract_camera(self, cam_id, frame, stage=None, cam_detectors=None):
+        return self.extract(frame, cam_detectors.get(cam_id, 'haar') if cam_detectors else 'haar', stage)
 
-    # DEF: Analyse a frame for faces and their facial attributes (age, gender, race) using DeepFace
-    # Returns list of analysis results
-    def analyse(self, frame):
-        try: 
-            analysis = DeepFace.analyze(
-                frame,
-                actions = ['age', 'gender', 'race'],
-                detector_backend = 'mtcnn',
-                enforce_detection=False
-            )
-            return analysis
+    # DEF: Analyse a batch of faces for their facial attributes (age, gender, race) using DeepFace attribute models
+    # Runs one batched forward pass per attribute for all faces in the batch
+    # cam_actions: actions per camera (default age, gender and race), 'embedding' also computes a face embedding (stored by save_results)
+    # Returns list of analysis results, each tagged with its camera ID and face region
+    def analyse(self, face_batch, cam_actions=None):
+        try:
+            return face_batch.analyse(cam_actions=cam_actions)
         except Exception as e:
             print("Analysis Error:", e)
-            analysis = {}
-
-    # DEF: Runs the model
-    # Opens camera(s), extracts faces, analyses faces, saves analysis results (json & DB), prints performance summary
-    def run_model(self, framerate=24, frequency=24, cam_ids=[0], update_callback=None):
-        print("----------------------")
-        print("Running Model - HYBRID")
-        print("----------------------")
-
-        # INITS
-        init_db()
-
-        if update_callback: update_callback("Starting Model: HYBRID")
-        total_timer = Timer(label="Total")
-        analysis_timer = Timer(label="Analysis")
-
-        frame_counter = 0
-        analysis_counter = 0
-
-        total_timer.start()
-
-        # OPEN CAMS
-        cams = [open_cam(cam_id) for cam_id in cam_ids]
-        if None in cams:
-            error = "Run Model Error: One or more cameras could not be opened."
-            if update_callback: update_callback(error)
-            print(error)
-            return
-        if not cams:
-            error = "Run Model Error: No cameras available."
-            if update_callback: update_callback(error)
-            print(error)
-            return
-        for cam in cams:
-            cam.set(cv2.CAP_PROP_FPS, framerate)
-
-        # LIVE CAM FEED
-        while True:
-            for cam in cams:
-                ret, frame = cam.read()
-                if not ret:
-                    error = "Run Model Error: Could not read frame from camera."
-                    if update_callback: update_callback(error)
-                    print(error)
-                    continue
-
-                frame_counter += 1
-
-                # EXTRACTION, ANALYSIS & SAVING (every 24 frames)
-                if frame_counter % frequency == 0:
-                    if update_callback: update_callback(f"Processing frame {frame_counter}")
-                    analysis_timer.start()
-
-                    face_img, faces_coords = self.extract(frame)
-                    
-                    if face_img is not None:
-                        print("Face detected in the frame.")
-
-                        x, y, w, h = faces_coords
-                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                        analysis = self.analyse(face_img)
-
-                        if isinstance(analysis, list) and len(analysis) > 0:
-                            result = analysis[0]
-                            save_analysis(result, './analysis/hybridmodel_analysis.json')
-                            save_analysis_db(result)
-                            analysis_counter += 1
-                            if update_callback: 
-                                update_callback(f"Analysis result: Age - {result.get('age')}, Gender - {result.get('dominant_gender')}, Race - {result.get('dominant_gender')}")
-                    else:
-                        print("No face detected in the frame.")
-                        analysis_timer.reset()
-                        
-                    print(f"Frame: {frame_counter}")
-                    analysis_timer.stop()
-                
-                cv2.imshow(f"Hybrid Model Feed {cam}", frame)
-
-            # -------------------------------
-            # TESTING - STOP AFTER 20 SECONDS
-            # if total_timer.get_time() > 20:
-            #     msg = "20 seconds elapsed, stopping analysis."
-            #     if update_callback: update_callback(msg)
-            #     print(msg)
-            #     break
-            # # -------------------------------
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-        
-        total_timer.stop()
-
-        cam.release()
-        cv2.destroyAllWindows()
-
-         # PERFORMANCE SUMMARY
-        summary = "\n==== HYBRID  MODEL\n"
-        summary += "== Performance Summary\n"
-        summary += f"Processed Frames: {frame_counter}\n"
-        summary += f"Analysed Frames: {analysis_counter}\n"
-        estimated_fps = frame_counter / total_timer.total_time if total_timer.total_time > 0 else 0
-        summary += f"Estimated FPS: {estimated_fps:.2f}\n"
-
-        total_summary = total_timer.summary(False, False)
-        analysis_summary = analysis_timer.summary()
-
-        full_summary = summary + "\n" + total_summary + "\n" + analysis_summary
-
-        if update_callback: update_callback(full_summary)
-        print(full_summary)
+            return []
+
+    # DEF: Load the detectors and attribute models and run a dummy inference through them
+    # actions: only the models these actions need are loaded
+    def warm_up(self, detectors=('haar',), actions=ACTIONS):
+        for detector in detectors:
+            get_detector(detector)
+        warm_up_attributes(actions)
+
+    # DEF: Detector backend per camera ID for a run (config.detector, per-camera overrides under cam_settings[cam_id]["detector"])
+    # Every backend is loaded here, before the feed starts
+    def load_detectors(self, config):
+        cam_detectors = {cam_id: get_cam_setting(config.cam_settings, cam_id, "detector", config.detector) for cam_id in config.cam_ids}
+        for name in set(cam_detectors.values()):
+            get_detector(name)
+        return cam_detectors
+
+    # DEF: warm_up() arguments for the inference workers of a run
+    def worker_warm_up(self, cam_detectors, actions):
+        return {"detectors": tuple(set(cam_detectors.values())), "actions": actions}
 
 # -----------------------------------
 
@@ -166,4 +74,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -1,133 +1,71 @@
-import cv2
+import numpy as np
 from deepface import DeepFace
 
-from utils.model_utils import open_cam, save_analysis
-from utils.timer import Timer
-from utils.db_utils import init_db, save_analysis_db
+from utils.attributes import ACTIONS, warm_up_attributes
+from utils.detectors import filter_sizes
+from utils.pipeline import FaceModel
 
 # -----------------------------------
 
 # CLASS: Single model implementation for face analysis
-# Uses DeepFace for face detection and analysis
-# Saves analysis to JSON and SQLite database
-class SingleModel:
-    # DEF: Analyse a frame for faces and their facial attributes (age, gender, race) using DeepFace
-    # Includes inbuilt face extraction
-    # Returns list of analysis results
-    def analyse(self, frame):
-        try: 
-            analysis = DeepFace.analyze(
-                frame,
-                actions = ['age', 'gender', 'race'],
-                detector_backend = 'mtcnn'
-            )
-            return analysis
+# Uses DeepFace for face detection (MTCNN) and analysis
+# Saves analysis to JSON and SQLite database (run loop, saving and summaries in utils/pipeline.py)
+class SingleModel(FaceModel):
+    name = "SINGLE"
+    model_type = "single"
+    log_file = './analysis/singlemodel_analysis.jsonl'
+
+    # Smallest face MTCNN finds (its default minimum face size, pixels)
+    min_face = 20
+
+    # DEF: Detect faces in an image using DeepFace's inbuilt face extraction (MTCNN)
+    # Returns list of face coords (x, y, w, h) within min_size / max_size
+    def detect(self, image, min_size=None, max_size=None):
+        faces = DeepFace.extract_faces(
+            image,
+            detector_backend = 'mtcnn',
+            enforce_detection=False
+        )
+        coords = []
+        for face in faces:
+            # Without enforce_detection, an empty frame comes back as one zero-confidence "face"
+            if face.get("confidence", 0) <= 0:
+                continue
+            area = face["facial_area"]
+            coords.append((max(0, area["x"]), max(0, area["y"]), area["w"], area["h"]))
+        return filter_sizes(coords, min_size, max_size)
+
+    # DEF: Extracts faces from a frame using MTCNN
+    # stage: optional DetectionStage (downscale, ROI, face size bounds), crops are always taken from the full-resolution frame
+    # Returns list of (face image, face coords) for every face found
+    def extract(self, frame, stage=None):
+        try:
+            faces = stage.detect(frame, self.detect, self.min_face) if stage else self.detect(frame)
+            return [(frame[y:y+h, x:x+w], (x, y, w, h)) for (x, y, w, h) in faces]
+        except Exception as e:
+            print("Extraction Error:", e)
+            return []
+
+    # DEF: Extract the faces of one camera's frame (MTCNN for every camera, cam_detectors is ignored)
+    def extract_camera(self, cam_id, frame, stage=None, cam_detectors=None):
+        return self.extract(frame, stage)
+
+    # DEF: Analyse a batch of faces for their facial attributes (age, gender, race) using DeepFace attribute models
+    # Runs one batched forward pass per attribute for all faces in the batch
+    # cam_actions: actions per camera (default age, gender and race), 'embedding' also computes a face embedding (stored by save_results)
+    # Returns list of analysis results, each tagged with its camera ID and face region
+    def analyse(self, face_batch, cam_actions=None):
+        try:
+            return face_batch.analyse(cam_actions=cam_actions)
         except Exception as e:
             print("Analysis Error:", e)
-            analysis = {}
-
-    # DEF: Runs the model
-    # Opens camera(s), analyses faces, saves analysis results (json & DB), prints performance summary
-    def run_model(self, framerate=24, frequency=24, cam_ids=[0], update_callback=None):
-        print("----------------------")
-        print("Running Model - SINGLE")
-        print("----------------------")
-
-        # INITS
-        init_db()
-
-        if update_callback: update_callback("Starting Model: SINGLE")
-        total_timer = Timer(label="Total")
-        analysis_timer = Timer(label="Analysis")
-
-        frame_counter = 0
-        analysis_counter = 0
-
-        total_timer.start()
-
-        # OPEN CAMS
-        cams = [open_cam(cam_id) for cam_id in cam_ids]
-        if None in cams:
-            error = "Run Model Error: One or more cameras could not be opened."
-            if update_callback: update_callback(error)
-            print(error)
-            return
-        if not cams:
-            error = "Run Model Error: No cameras available."
-            if update_callback: update_callback(error)
-            print(error)
-            return
-        for cam in cams:
-            cam.set(cv2.CAP_PROP_FPS, framerate)
-
-        # LIVE CAM FEED
-        while True:
-            for cam in cams:
-                ret, frame = cam.read()
-                if not ret:
-                    error = "Run Model Error: Could not read frame from camera."
-                    if update_callback: update_callback(error)
-                    print(error)
-                    continue
-
-                frame_counter += 1
-
-                # ANALYSIS & SAVING (every 24 frames)
-                if frame_counter % frequency == 0:
-                    if update_callback: update_callback(f"Processing frame {frame_counter}")
-                    analysis_timer.start()
-
-                    analysis = self.analyse(frame)
-
-                    if isinstance(analysis, list) and len(analysis) > 0:
-                        print("Face detected in the frame.")
-                        result = analysis[0]
-                        save_analysis(result, './analysis/singlemodel_analysis.json')
-                        save_analysis_db(result)
-                        analysis_counter += 1
-                        if update_callback: 
-                            update_callback(f"Analysis result: Age - {result.get('age')}, Gender - {result.get('dominant_gender')}, Race - {result.get('dominant_gender')}")
-                    else:
-                        print("No faces detected or analysis failed.")
-                        analysis_timer.reset()
-
-                    print(f"Frame: {frame_counter}")
-                    analysis_timer.stop()
-                    
-                cv2.imshow(f"Single Model Feed {cam}", frame)
-
-            # -------------------------------
-            # TESTING - STOP AFTER 20 SECONDS
-            # if total_timer.get_time() > 20:
-            #     msg = "20 seconds elapsed, stopping analysis."
-            #     if update_callback: update_callback(msg)
-            #     print(msg)
-            #     break
-            # -------------------------------
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-        
-        total_timer.stop()
-
-        cam.release()
-        cv2.destroyAllWindows()
-
-        # PERFORMANCE SUMMARY
-        summary = "\n==== SINGLE  MODEL\n"
-        summary += "== Performance Summary\n"
-        summary += f"Processed Frames: {frame_counter}\n"
-        summary += f"Analysed Frames: {analysis_counter}\n"
-        estimated_fps = frame_counter / total_timer.total_time if total_timer.total_time > 0 else 0
-        summary += f"Estimated FPS: {estimated_fps:.2f}\n"
-
-        total_summary = total_timer.summary(False, False)
-        analysis_summary = analysis_timer.summary()
-
-        full_summary = summary + "\n" + total_summary + "\n" + analysis_summary
+            return []
 
-        if update_callback: update_callback(full_summary)
-        print(full_summary)
+    # DEF: Load the MTCNN detector and attribute models and run a dummy inference through them
+    # actions: only the models these actions need are loaded
+    def warm_up(self, actions=ACTIONS):
+        self.extract(np.zeros((160, 160, 3), dtype=np.uint8))
+        warm_up_attributes(actions)
 
 # -----------------------------------
 
@@ -0,0 +1,43 @@
+import random
+import sqlite3
+
+import pytest
+
+from utils.db_utils import init_db, insert_rows
+
+# Days the sample rows are spread over (one partition each)
+DAYS = ("2024-03-01", "2024-03-02", "2024-03-03")
+
+# -----------------------------------
+
+# DEF: Deterministic face_data rows over DAYS, with NULL ages, genders and races mixed in and repeated values
+# Returns list of (timestamp, age, gender, race, image_path, cam_id, embedding_id), in timestamp order
+def sample_rows(per_day=40, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for day in DAYS:
+        for i in range(per_day):
+            # Some rows share a timestamp, so the id tie-break matters
+            timestamp = f"{day}T{i // 3:02d}:{rng.randrange(60):02d}:00.000000"
+            rows.append((
+                timestamp,
+                rng.choice([None, 18, 25, 25, 33, 40, 61]),
+                rng.choice([None, "Man", "Woman", "Woman"]),
+                rng.choice([None, "asian", "white", "black", "white"]),
+                None,
+                rng.choice([None, 0, 1]),
+                None,
+            ))
+    return sorted(rows, key=lambda row: row[0])
+
+# DEF: Database with sample_rows() inserted through insert_rows()
+# Returns the database path
+@pytest.fixture
+def face_db(tmp_path):
+    db_path = str(tmp_path / "faces.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        insert_rows(conn.cursor(), sample_rows())
+    conn.close()
+    return db_path
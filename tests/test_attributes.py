@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from utils import attributes
+from utils.attributes import FaceBatch, analyse_faces, build_cam_actions, check_actions, prepare_face
+from utils.model_utils import get_cam_setting
+
+# CLASS: Stand-in for a Keras attribute model, returns fixed scores for every face and records its batch sizes
+class FakeModel:
+    def __init__(self, scores):
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.batches = []
+
+    def __call__(self, batch, training=False):
+        self.batches.append(len(batch))
+        return FakeTensor(np.tile(self.scores, (len(batch), 1)))
+
+# CLASS: Stand-in for a TensorFlow tensor
+class FakeTensor:
+    def __init__(self, value):
+        self.value = value
+
+    def numpy(self):
+        return self.value
+
+# DEF: Fake models for every attribute action, built in place of the DeepFace ones
+@pytest.fixture
+def models(monkeypatch):
+    age = np.zeros(101)
+    age[30] = 1.0
+    fakes = {
+        "age": FakeModel(age),
+        "gender": FakeModel([0.2, 0.8]),
+        "race": FakeModel([0.1, 0.1, 0.1, 0.5, 0.1, 0.1]),
+    }
+    monkeypatch.setattr(attributes, "_models", dict(fakes))
+    return fakes
+
+# DEF: Face crop of the given size
+def face(h=80, w=60):
+    return np.full((h, w, 3), 128, np.uint8)
+
+# -----------------------------------
+
+def test_prepare_face_letterboxes_to_target_size():
+    prepared = prepare_face(np.full((100, 50, 3), 255, np.uint8))
+    assert prepared.shape == (224, 224, 3) and prepared.dtype == np.float32
+    assert prepared.max() == 1.0
+    # Tall crop: padded left and right
+    assert prepared[112, 0].sum() == 0 and prepared[112, 112].sum() == 3
+
+def test_one_forward_pass_per_action(models):
+    results = analyse_faces([face(), face(40, 40), face(120, 90)])
+    assert all(model.batches == [3] for model in models.values())
+    assert [result["age"] for result in results] == [30, 30, 30]
+    assert results[0]["dominant_gender"] == "Man"
+    assert results[0]["dominant_race"] == "white"
+    assert results[0]["race"]["white"] == pytest.approx(50.0)
+
+def test_large_batches_are_chunked(models):
+    analyse_faces([face()] * 5, actions=("age",), batch_size=2)
+    assert models["age"].batches == [2, 2, 1]
+
+def test_only_requested_actions_run(models):
+    results = analyse_faces([face()], actions=("gender",))
+    assert set(results[0]) == {"gender", "dominant_gender"}
+    assert models["age"].batches == [] and models["race"].batches == []
+    assert analyse_faces([]) == []
+
+def test_face_batch_tags_results_across_cameras(models):
+    batch = FaceBatch()
+    batch.add(0, face(), (10, 20, 60, 80))
+    batch.add(1, face(), (np.int64(5), 6, 7, 8))
+    results = batch.analyse()
+
+    assert models["age"].batches == [2]
+    assert [result["cam_id"] for result in results] == [0, 1]
+    assert results[1]["region"] == {"x": 5, "y": 6, "w": 7, "h": 8}
+    assert type(results[1]["region"]["x"]) is int
+
+def test_face_batch_groups_faces_by_camera_actions(models):
+    batch = FaceBatch()
+    batch.add(0, face(), (0, 0, 60, 80))
+    batch.add(1, face(), (0, 0, 60, 80))
+    batch.add(0, face(), (0, 0, 60, 80))
+    results = batch.analyse(cam_actions={0: ("age",), 1: ("age", "gender")})
+
+    # Both groups need age, only camera 1's face needs gender
+    assert models["age"].batches == [2, 1]
+    assert models["gender"].batches == [1]
+    assert models["race"].batches == []
+    assert "dominant_gender" not in results[0] and "dominant_gender" in results[1]
+    assert [result["cam_id"] for result in results] == [0, 1, 0]
+
+def test_check_actions_orders_and_rejects_unknown():
+    assert check_actions(["race", "embedding", "age"]) == ("age", "race", "embedding")
+    with pytest.raises(ValueError, match="emotion"):
+        check_actions(["age", "emotion"])
+
+def test_camera_actions_override_run_actions():
+    cam_actions = build_cam_actions([0, 1, 2], actions=("age", "gender"), cam_settings={1: {"actions": ["race"]}, 2: {"detector": "lbp"}})
+    assert cam_actions == {0: ("age", "gender"), 1: ("race",), 2: ("age", "gender")}
+
+    embedded = build_cam_actions([0], actions=(), embed=True)
+    assert embedded == {0: ("embedding",)}
+
+def test_get_cam_setting():
+    assert get_cam_setting(None, 0, "actions", ("age",)) == ("age",)
+    assert get_cam_setting({1: {"actions": ["race"]}}, 0, "actions") is None
+    assert get_cam_setting({1: {"actions": ["race"]}}, 1, "actions") == ["race"]
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import numpy as np
+
+from utils.capture import CameraStream, CaptureGroup
+
+# CLASS: Stand-in for cv2.VideoCapture, returns numbered frames until it runs out
+# step: Event the test sets to let one frame through (None: frames are read as fast as possible)
+class FakeCamera:
+    def __init__(self, frames=5, step=None):
+        self.frames = frames
+        self.step = step
+        self.count = 0
+        self.released = False
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        if self.step is not None:
+            self.step.wait(1.0)
+            self.step.clear()
+        if self.count >= self.frames:
+            return False, None
+        self.count += 1
+        return True, np.full((4, 4, 3), self.count, np.uint8)
+
+    def release(self):
+        self.released = True
+
+# DEF: Wait until a condition holds
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+# -----------------------------------
+
+def test_latest_frame_wins_and_overwrites_are_counted():
+    step = threading.Event()
+    stream = CameraStream(0, FakeCamera(frames=3, step=step), max_failures=1)
+    stream.start()
+    assert stream.read() is None
+
+    step.set()
+    assert wait_for(lambda: stream.seq == 1)
+    seq, timestamp, frame = stream.read()
+    assert seq == 1 and frame[0, 0, 0] == 1
+    # Nothing new since the last read
+    assert stream.read() is None
+
+    # Two frames arrive before the next read: the older one is dropped
+    step.set()
+    assert wait_for(lambda: stream.seq == 2)
+    step.set()
+    assert wait_for(lambda: stream.seq == 3)
+    seq, _, frame = stream.read()
+    assert seq == 3 and frame[0, 0, 0] == 3
+    assert stream.dropped == 1
+    stream.stop()
+
+def test_stream_ends_after_failed_reads():
+    camera = FakeCamera(frames=2)
+    stream = CameraStream(0, camera, max_failures=3)
+    stream.start()
+    assert wait_for(lambda: stream.ended)
+    assert stream.read()[0] == 2
+    stream.stop()
+    assert camera.released
+
+def test_group_reads_every_camera_with_a_new_frame():
+    group = CaptureGroup({0: FakeCamera(frames=1), 1: FakeCamera(frames=1)})
+    for stream in group.streams:
+        stream.max_failures = 1
+    group.start()
+    assert wait_for(lambda: group.ended())
+
+    latest = group.read_latest(timeout=0.5)
+    assert sorted(cam_id for cam_id, _, _, _ in latest) == [0, 1]
+    assert group.read_latest(timeout=0.01) == []
+    assert group.dropped() == 0
+    group.stop()
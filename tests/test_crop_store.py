@@ -0,0 +1,116 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from utils.crop_store import CropStore
+
+# DEF: Random face-sized crop, different for every seed
+def crop(seed, size=64):
+    return np.random.default_rng(seed).integers(0, 256, (size, size, 3), dtype=np.uint8)
+
+# DEF: Wait until every crop handed to the store has been written
+def wait_written(store, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while store.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.pending == 0
+
+# DEF: Every crop file under a store's root
+def stored_files(root):
+    return sorted(os.path.join(dirpath, name) for dirpath, _, names in os.walk(root) for name in names)
+
+# -----------------------------------
+
+def test_save_writes_content_addressed_files(tmp_path):
+    store = CropStore(root=str(tmp_path))
+    first = store.save(crop(1), cam_id=0, track_id=1)
+    second = store.save(crop(2), cam_id=0, track_id=2)
+    store.close()
+
+    assert first != second
+    assert stored_files(tmp_path) == sorted([first, second])
+    # Paths are <root>/<ab>/<cd>/<hash>.jpg
+    name = os.path.basename(first)
+    assert first == os.path.join(str(tmp_path), name[:2], name[2:4], name)
+    assert store.saved == 2
+    assert store.save(None) is None
+
+def test_identical_crop_shares_file(tmp_path):
+    store = CropStore(root=str(tmp_path))
+    image = crop(1)
+    # Different tracks, so only the content hash can match
+    assert store.save(image, cam_id=0, track_id=1) == store.save(image.copy(), cam_id=1, track_id=2)
+    store.close()
+    assert store.saved == 1
+    assert store.duplicates == 1
+
+def test_near_duplicate_dedupe_is_per_track(tmp_path):
+    store = CropStore(root=str(tmp_path), dedupe_distance=3)
+    image = crop(1)
+    nudged = np.clip(image.astype(int) + 1, 0, 255).astype(np.uint8)
+
+    path = store.save(image, cam_id=0, track_id=1)
+    # Same track: a near-identical crop reuses the stored file
+    assert store.save(nudged, cam_id=0, track_id=1) == path
+    # Another person's near-identical crop gets its own file
+    assert store.save(nudged, cam_id=0, track_id=2) != path
+    store.close()
+    assert store.duplicates == 1
+    assert len(stored_files(tmp_path)) == 2
+
+def test_dedupe_window_expires(tmp_path, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("utils.crop_store.time.monotonic", lambda: clock[0])
+    store = CropStore(root=str(tmp_path), dedupe_seconds=10.0)
+    image = crop(1)
+    nudged = np.clip(image.astype(int) + 1, 0, 255).astype(np.uint8)
+
+    path = store.save(image, track_id=1)
+    clock[0] += 11.0
+    assert store.save(nudged, track_id=1) != path
+    store.close()
+    assert store.duplicates == 0
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    store = CropStore(root=str(tmp_path), workers=1)
+    first = store.save(crop(1), track_id=1)
+    store.close()
+    size = os.path.getsize(first)
+
+    # Room for two crops: writing a third evicts the least recently used
+    store = CropStore(root=str(tmp_path), max_bytes=int(size * 2.5), workers=1)
+    assert store.total_bytes == size
+    second = store.save(crop(2), track_id=2)
+    wait_written(store)
+    # Reusing the first crop makes it the most recently used
+    assert store.save(crop(1), track_id=3) == first
+    third = store.save(crop(3), track_id=4)
+    store.close()
+
+    assert store.evicted == 1
+    assert stored_files(tmp_path) == sorted([first, third])
+    assert second not in store.files
+    assert store.total_bytes <= store.max_bytes
+
+def test_drops_when_writer_is_busy(tmp_path):
+    store = CropStore(root=str(tmp_path), max_pending=0)
+    assert store.save(crop(1)) is None
+    store.close()
+    assert store.dropped == 1
+    assert "Dropped (writer busy): 1" in store.summary()
+
+def test_scan_removes_interrupted_writes(tmp_path):
+    leftover = tmp_path / "ab" / "cd" / "partial.jpg.tmp"
+    leftover.parent.mkdir(parents=True)
+    leftover.write_bytes(b"x")
+    (tmp_path / "ab" / "cd" / "done.jpg").write_bytes(b"12345")
+
+    store = CropStore(root=str(tmp_path))
+    assert not leftover.exists()
+    assert store.total_bytes == 5
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        CropStore(root=str(tmp_path), image_format='png')
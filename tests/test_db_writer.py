@@ -0,0 +1,111 @@
+import threading
+import time
+
+from utils import db_writer as db_writer_module
+from utils.db_utils import count_entries
+from utils.db_writer import DBWriter
+
+RESULT = {"age": 30, "dominant_gender": "Woman", "dominant_race": "asian", "cam_id": 0}
+
+# DEF: Writer on a fresh database in tmp_path
+def make_writer(tmp_path, **options):
+    return DBWriter(db_path=str(tmp_path / "faces.db"), **options)
+
+# -----------------------------------
+
+def test_writes_in_batches(tmp_path):
+    writer = make_writer(tmp_path, batch_size=10, flush_interval=0.05).start()
+    for _ in range(25):
+        assert writer.write(RESULT)
+    assert writer.flush(timeout=10)
+    writer.stop()
+
+    assert count_entries(db_path=writer.db_path) == 25
+    assert writer.written == 25
+    assert writer.batches >= 3
+    assert writer.dropped == 0
+
+def test_stop_commits_queued_rows(tmp_path):
+    writer = make_writer(tmp_path, batch_size=1000, flush_interval=60).start()
+    for _ in range(5):
+        writer.write(RESULT)
+    writer.stop()
+    assert count_entries(db_path=writer.db_path) == 5
+    assert not writer.thread.is_alive()
+
+def test_write_before_start_and_after_stop_is_dropped(tmp_path):
+    writer = make_writer(tmp_path)
+    assert not writer.write(RESULT)
+    writer.start()
+    writer.stop()
+    assert not writer.write(RESULT)
+    assert writer.dropped == 2
+    assert "Dropped rows: 2" in writer.summary()
+
+def test_connection_failure_does_not_hang(tmp_path, monkeypatch):
+    writer = make_writer(tmp_path)
+    monkeypatch.setattr(db_writer_module, "WRITER_PRAGMAS", ("NOT A PRAGMA",))
+    writer.start()
+    writer.thread.join(5)
+
+    assert not writer.write(RESULT)
+    assert writer.flush(timeout=5) is True
+    writer.stop(timeout=1)
+    assert writer.dropped == 1
+
+def test_commit_failure_keeps_writer_running(tmp_path, monkeypatch):
+    calls = []
+
+    def flaky_insert(conn, rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise ValueError("bad row")
+        real_insert(conn, rows)
+    real_insert = db_writer_module.insert_rows
+    monkeypatch.setattr(db_writer_module, "insert_rows", flaky_insert)
+
+    writer = make_writer(tmp_path, batch_size=1, flush_interval=0.01).start()
+    writer.write(RESULT)
+    assert writer.flush(timeout=5)
+    writer.write(RESULT)
+    assert writer.flush(timeout=5)
+    writer.stop()
+
+    assert writer.errors == 1
+    assert writer.written == 1
+    assert "Failed rows: 1" in writer.summary()
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def blocked_insert(conn, rows):
+        release.wait(10)
+    monkeypatch.setattr(db_writer_module, "insert_rows", blocked_insert)
+
+    writer = make_writer(tmp_path, batch_size=1, queue_size=2).start()
+    start = time.monotonic()
+    accepted = sum(writer.write(RESULT) for _ in range(10))
+    assert time.monotonic() - start < 1.0
+    # One row is held by the blocked commit, two fit in the queue
+    assert accepted <= 3
+    assert writer.dropped == 10 - accepted
+
+    # Timed flush and stop return while the commit is stuck, the queued rows are reported as dropped
+    assert writer.flush(timeout=0.2) is False
+    writer.stop(timeout=0.5)
+    assert writer.dropped >= 10 - accepted + 1
+    release.set()
+    writer.thread.join(5)
+    assert not writer.thread.is_alive()
+
+def test_stop_with_full_queue_returns(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(db_writer_module, "insert_rows", lambda conn, rows: release.wait(10))
+
+    writer = make_writer(tmp_path, batch_size=1, queue_size=1).start()
+    for _ in range(3):
+        writer.write(RESULT)
+    start = time.monotonic()
+    writer.stop(timeout=0.2)
+    assert time.monotonic() - start < 1.5
+    release.set()
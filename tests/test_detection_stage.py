@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from utils.detection_stage import DetectionStage, build_detection_stages, face_size_range
+
+# DEF: Detector stand-in that records what it was given and finds one fixed face
+# Returns (detect_fn, calls), calls collects (image shape, min_size, max_size)
+def fixed_detector(face):
+    calls = []
+
+    def detect(image, min_size, max_size):
+        calls.append((image.shape, min_size, max_size))
+        return [face]
+    return detect, calls
+
+# -----------------------------------
+
+def test_face_size_range_from_geometry():
+    # 90 degree FOV: focal length is half the frame height
+    min_face, max_face = face_size_range(1000, 90, min_distance=1.0, max_distance=5.0)
+    assert min_face == 22
+    # Rounded up, never below the closest face
+    assert 110 <= max_face <= 111
+
+def test_downscale_maps_faces_back_to_full_resolution():
+    stage = DetectionStage(detect_width=640)
+    detect, calls = fixed_detector((100, 50, 40, 40))
+    faces = stage.detect(np.zeros((1080, 1920, 3), np.uint8), detect)
+
+    assert calls[0][0] == (360, 640, 3)
+    assert faces == [(300, 150, 120, 120)]
+
+def test_downscale_keeps_smallest_face_detectable():
+    # Smallest face 60 px, detector needs 30 px: no more than a 2x downscale
+    stage = DetectionStage(detect_width=480, min_face=60, max_face=300)
+    detect, calls = fixed_detector((0, 0, 30, 30))
+    stage.detect(np.zeros((1080, 1920, 3), np.uint8), detect, detector_min_face=30)
+
+    shape, min_size, max_size = calls[0]
+    assert shape == (540, 960, 3)
+    assert (min_size, max_size) == (30, 150)
+
+def test_roi_crops_and_drops_faces_outside_polygon():
+    # Triangle in the left half of the frame (fractions)
+    stage = DetectionStage(detect_width=None, roi=[[(0, 0), (0.5, 0), (0, 1)]])
+    frame = np.full((100, 200, 3), 255, np.uint8)
+
+    detect, calls = fixed_detector((10, 10, 10, 10))
+    assert stage.detect(frame, detect) == [(10, 10, 10, 10)]
+    # Detection runs on the triangle's bounding box only
+    assert calls[0][0] == (100, 101, 3)
+
+    # Face centred in the box but outside the triangle
+    detect, _ = fixed_detector((70, 70, 20, 20))
+    assert stage.detect(frame, detect) == []
+
+def test_roi_pixels_outside_polygon_are_blanked():
+    stage = DetectionStage(detect_width=None, roi=[[(0, 0), (100, 0), (100, 50), (0, 50)], [(0, 60), (20, 60), (20, 100), (0, 100)]])
+    seen = []
+    stage.detect(np.full((100, 200, 3), 255, np.uint8), lambda image, min_size, max_size: seen.append(image) or [])
+
+    image = seen[0]
+    assert image[10, 10].all() and image[80, 10].all()
+    # Between the polygons
+    assert not image[55, 50].any()
+
+def test_build_stages_with_camera_overrides():
+    stages = build_detection_stages([0, 1, 2], detection={"detect_width": 320}, cam_settings={1: {"detection": False}, 2: {"detection": {"min_face": 40}}})
+    assert sorted(stages) == [0, 2]
+    assert stages[2].detect_width == 320 and stages[2].min_face == 40
+
+    # No default stage: only cameras with their own settings get one
+    assert sorted(build_detection_stages([0, 1], cam_settings={0: {"detection": True}})) == [0]
+
+def test_unknown_stage_option():
+    with pytest.raises(TypeError):
+        build_detection_stages([0], detection={"detect_size": 320})
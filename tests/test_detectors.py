@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils import detectors
+from utils.detectors import MODELS_DIR, filter_sizes, get_detector
+from utils.fetch_models import MODEL_SHA256, fetch_models, file_sha256, verify_model
+
+# -----------------------------------
+
+def test_models_dir_does_not_depend_on_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isabs(MODELS_DIR)
+    assert os.path.isdir(MODELS_DIR)
+    # The committed cascade loads from any working directory
+    assert detectors.LBPDetector().detect(np.zeros((120, 160, 3), np.uint8)) == []
+
+def test_committed_models_match_pins():
+    for filename in ("lbpcascade_frontalface_improved.xml", "deploy.prototxt"):
+        assert file_sha256(os.path.join(MODELS_DIR, filename)) == MODEL_SHA256[filename]
+
+def test_verify_model_rejects_mismatch(tmp_path, monkeypatch):
+    path = tmp_path / "deploy.prototxt"
+    path.write_text("not the model")
+    assert not verify_model(str(path), "deploy.prototxt")
+
+    # Files without a pin are accepted
+    monkeypatch.setitem(MODEL_SHA256, "deploy.prototxt", None)
+    assert verify_model(str(path), "deploy.prototxt")
+
+def test_fetch_models_deletes_bad_download(tmp_path, monkeypatch):
+    def fake_download(url, path):
+        with open(path, "w") as f:
+            f.write("tampered")
+    monkeypatch.setattr("urllib.request.urlretrieve", fake_download)
+    monkeypatch.setattr("utils.fetch_models.MODEL_URLS", {"deploy.prototxt": "http://example.invalid/deploy.prototxt"})
+
+    fetch_models(str(tmp_path))
+    assert not (tmp_path / "deploy.prototxt").exists()
+
+def test_filter_sizes():
+    faces = [(0, 0, 10, 10), (0, 0, 50, 50), (0, 0, 200, 200)]
+    assert filter_sizes(faces) == faces
+    assert filter_sizes(faces, min_size=20, max_size=100) == [(0, 0, 50, 50)]
+
+def test_get_detector_loads_once():
+    assert get_detector('haar') is get_detector('haar')
+    with pytest.raises(ValueError):
+        get_detector('nope')
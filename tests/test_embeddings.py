@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from utils import embeddings as embeddings_module
+from utils.db_utils import init_db, save_analysis_db
+from utils.embeddings import EmbeddingStore, IVFIndex, find_sightings, normalise
+
+# DEF: Random unit vectors, different for every seed
+def vectors(count, dim=32, seed=0):
+    return normalise(np.random.default_rng(seed).standard_normal((count, dim)))
+
+# DEF: Exact top k of the queries by brute force, best first
+def brute_force(data, queries, k):
+    scores = normalise(queries) @ normalise(data).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+# -----------------------------------
+
+def test_append_assigns_sequential_ids_and_persists(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    assert store.count() == 0
+    assert store.append(vectors(3)) == [0, 1, 2]
+    assert store.append(vectors(2, seed=1)) == [3, 4]
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert (reopened.dim, reopened.count()) == (32, 5)
+    with pytest.raises(ValueError):
+        reopened.append(vectors(1, dim=16))
+
+def test_partial_row_is_cut_off(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.append(vectors(2))
+    # A crash left half a row behind
+    with open(store.data_path, "ab") as f:
+        f.write(b"\0" * 10)
+    assert store.append(vectors(1, seed=1)) == [2]
+    assert store.count() == 3
+
+def test_exact_search_matches_brute_force(tmp_path, monkeypatch):
+    # Small chunks so the scan merges top k across chunks
+    monkeypatch.setattr(embeddings_module, "SEARCH_CHUNK", 7)
+    data = vectors(50)
+    store = EmbeddingStore(str(tmp_path))
+    store.append(data)
+
+    queries = vectors(4, seed=1)
+    ids, scores = store.search(queries, k=5)
+    assert ids.tolist() == brute_force(data, queries, 5).tolist()
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+    # A stored vector finds itself first
+    ids, scores = store.search(data[17], k=1)
+    assert ids[0, 0] == 17 and scores[0, 0] == pytest.approx(1.0, abs=1e-2)
+
+def test_search_pads_missing_matches(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    ids, scores = store.search(vectors(1), k=3)
+    assert ids.tolist() == [[-1, -1, -1]]
+
+    store.append(vectors(2))
+    ids, scores = store.search(vectors(1, seed=1), k=3)
+    assert ids[0, 2] == -1 and scores[0, 2] == -np.inf
+
+def test_ivf_search_finds_rows_added_after_build(tmp_path):
+    data = vectors(200)
+    store = EmbeddingStore(str(tmp_path))
+    store.append(data)
+    IVFIndex.build(store, nlist=8)
+
+    # Probing every list is exact
+    queries = vectors(3, seed=1)
+    ids, _ = store.search(queries, k=5, nprobe=8)
+    assert ids.tolist() == brute_force(data, queries, 5).tolist()
+
+    # Rows appended since the build are scanned as well
+    new_id = store.append(vectors(1, seed=2))[0]
+    ids, _ = store.search(vectors(1, seed=2), k=1, nprobe=1)
+    assert ids[0, 0] == new_id
+
+def test_add_results_replaces_embedding_with_id(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    results = [{"embedding": vectors(1)[0]}, {"age": 30}, {"embedding": vectors(1, seed=1)[0]}]
+    store.add_results(results)
+    assert [result.get("embedding_id") for result in results] == [0, None, 1]
+    assert not any("embedding" in result for result in results)
+
+def test_find_sightings_joins_face_data(tmp_path):
+    db_path = str(tmp_path / "faces.db")
+    init_db(db_path)
+    store = EmbeddingStore(str(tmp_path / "embeddings"))
+    data = vectors(3)
+    for cam_id, embedding_id in enumerate(store.append(data)):
+        save_analysis_db({"age": 30 + cam_id, "cam_id": cam_id, "embedding_id": embedding_id}, db_path=db_path)
+
+    sightings = find_sightings(store, data[1], k=3, threshold=0.9, db_path=db_path)
+    assert [(s["embedding_id"], s["cam_id"], s["age"]) for s in sightings] == [(1, 1, 31)]
+    assert find_sightings(store, vectors(1, seed=5), threshold=0.99, db_path=db_path) == []
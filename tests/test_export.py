@@ -0,0 +1,94 @@
+import csv
+import gzip
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from utils.export import export_entries, export_format, iter_entries
+from utils.partitions import COLUMNS
+
+# DEF: Every face_data row matching the filters of the tests, in ID order (COLUMNS order)
+def expected_rows(db_path, where="1", params=()):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM face_data WHERE {where} ORDER BY id", params).fetchall()
+    conn.close()
+    return rows
+
+# -----------------------------------
+
+@pytest.mark.parametrize("path, file_format", [
+    ("out.csv", "csv"), ("out.CSV.gz", "csv"), ("out.jsonl", "jsonl"), ("out.json", "jsonl"),
+    ("out.jsonl.gz", "jsonl"), ("out.parquet", "parquet"),
+])
+def test_export_format(path, file_format):
+    assert export_format(path) == file_format
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        export_format("out.xlsx")
+
+def test_chunks_cover_filtered_rows(face_db):
+    chunks = list(iter_entries(gender="Woman", start="2024-03-02", chunk_size=7, db_path=face_db))
+    assert all(len(chunk) <= 7 for chunk in chunks)
+    rows = [row for chunk in chunks for row in chunk]
+    assert rows == expected_rows(face_db, "gender = ? AND timestamp >= ?", ("Woman", "2024-03-02"))
+
+def test_csv_export(face_db, tmp_path):
+    path = str(tmp_path / "out.csv")
+    expected = expected_rows(face_db, "race = 'white'")
+    progress = []
+    assert export_entries(path, race="white", chunk_size=10, progress=lambda done, total: progress.append((done, total)), db_path=face_db) == len(expected)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(COLUMNS)
+    assert rows[1:] == [["" if value is None else str(value) for value in row] for row in expected]
+    assert progress[0] == (0, len(expected)) and progress[-1] == (len(expected), len(expected))
+
+def test_compressed_jsonl_export(face_db, tmp_path):
+    path = str(tmp_path / "out.jsonl.gz")
+    assert export_entries(path, min_age=30, db_path=face_db) == len(expected_rows(face_db, "age >= 30"))
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records == [dict(zip(COLUMNS, row)) for row in expected_rows(face_db, "age >= 30")]
+
+def test_cancelled_export_leaves_no_file(face_db, tmp_path):
+    path = tmp_path / "out" / "out.csv"
+    stop_event = threading.Event()
+
+    # Cancelled after the first chunk
+    def progress(done, total):
+        if done:
+            stop_event.set()
+
+    assert export_entries(str(path), chunk_size=5, progress=progress, stop_event=stop_event, db_path=face_db) is None
+    assert list(path.parent.iterdir()) == []
+
+def test_failed_export_leaves_no_file(face_db, tmp_path):
+    path = tmp_path / "out" / "out.jsonl"
+
+    def progress(done, total):
+        if done:
+            raise RuntimeError("progress failed")
+
+    with pytest.raises(RuntimeError):
+        export_entries(str(path), chunk_size=5, progress=progress, db_path=face_db)
+    assert list(path.parent.iterdir()) == []
+    # Errors the export handles itself are reported with None
+    assert export_entries(str(tmp_path / "out.xlsx"), db_path=face_db) is None
+
+def test_parquet_export(face_db, tmp_path):
+    path = tmp_path / "out" / "out.parquet"
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        # Without pyarrow the export fails cleanly
+        assert export_entries(str(path), db_path=face_db) is None
+        assert list(path.parent.iterdir()) == []
+        return
+    assert export_entries(str(path), chunk_size=7, db_path=face_db) == len(expected_rows(face_db))
+    table = pq.read_table(path)
+    assert table.column_names == list(COLUMNS)
+    assert [tuple(row.values()) for row in table.to_pylist()] == expected_rows(face_db)
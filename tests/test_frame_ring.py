@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from utils.frame_ring import FrameRing, SharedFrame, attach_ring, release_ring, resolve_frames, drop_overwritten
+
+SHAPE = (4, 6, 3)
+
+# DEF: Frame filled with one value
+def frame(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(SHAPE, slots=3)
+    yield ring
+    release_ring(ring.spec)
+    ring.close(unlink=True)
+
+# -----------------------------------
+
+def test_latest_frame_is_read_once(ring):
+    assert ring.read_latest() is None
+    ring.write(frame(1), 1.0)
+    ring.write(frame(2), 2.0)
+    seq, timestamp, view, ref = ring.read_latest()
+    assert (seq, timestamp, int(view[0, 0, 0])) == (2, 2.0, 2)
+    assert ring.read_latest() is None
+    # Frame 1 was never read
+    assert (ring.captured(), ring.dropped()) == (2, 1)
+
+def test_rejects_other_shapes(ring):
+    assert ring.write(np.zeros((2, 2, 3), dtype=np.uint8), 0.0) is None
+    assert ring.captured() == 0
+
+def test_read_frame_is_not_overwritten(ring):
+    ring.write(frame(1), 1.0)
+    _, _, view, ref = ring.read_latest()
+    for value in range(2, 10):
+        ring.write(frame(value), float(value))
+    # The slot of the frame last taken by the reader is never reused
+    assert ring.valid(ref) and int(view[0, 0, 0]) == 1
+
+def test_pinned_frames_survive_until_unpinned(ring):
+    ring.write(frame(1), 1.0)
+    first = ring.read_latest()[3]
+    assert ring.pin(first)
+    ring.write(frame(2), 2.0)
+    second = ring.read_latest()[3]
+    assert ring.pin(second)
+
+    # One free slot is left, and it is reused for every new frame
+    for value in range(3, 8):
+        assert ring.write(frame(value), float(value))
+    assert ring.valid(first) and ring.valid(second)
+    assert int(ring.view(first)[0, 0, 0]) == 1
+
+    ring.unpin(first)
+    ring.write(frame(8), 8.0)
+    ring.write(frame(9), 9.0)
+    assert not ring.valid(first)
+    assert ring.view(first) is None
+    # A reused slot cannot be pinned
+    assert not ring.pin(first)
+
+def test_frames_dropped_when_every_slot_is_taken(ring):
+    refs = []
+    for value in range(1, 4):
+        ring.write(frame(value), float(value))
+        ref = ring.read_latest()[3]
+        assert ring.pin(ref)
+        refs.append(ref)
+    dropped = ring.dropped()
+    assert ring.write(frame(4), 4.0) == 0
+    assert ring.dropped() == dropped + 1
+    assert all(ring.valid(ref) for ref in refs)
+
+    ring.unpin(refs[0])
+    assert ring.write(frame(5), 5.0) > 0
+    # Unpinning more than pinned does not go negative
+    ring.unpin(refs[0])
+    assert ring.slot_pins.min() >= 0
+
+def test_resolve_and_drop_overwritten(ring):
+    ring.write(frame(1), 1.0)
+    ref = ring.read_latest()[3]
+    attached = attach_ring(ring.spec)
+    assert attach_ring(ring.spec) is attached
+
+    resolved, refs = resolve_frames([(0, ref), (1, frame(7))])
+    assert [cam_id for cam_id, _ in resolved] == [0, 1]
+    assert int(resolved[0][1][0, 0, 0]) == 1 and refs == {0: ref}
+    results = [{"cam_id": 0}, {"cam_id": 1}]
+    assert drop_overwritten(results, refs) == (results, 0)
+
+    # The reader moves on and the old frame's slot is reused
+    ring.write(frame(2), 2.0)
+    ring.read_latest()
+    ring.write(frame(3), 3.0)
+    ring.write(frame(4), 4.0)
+    assert drop_overwritten(results, refs) == ([{"cam_id": 1}], 1)
+    assert resolve_frames([(0, ref)]) == ([], {})
+
+def test_missing_ring_is_left_out():
+    ring = FrameRing.create(SHAPE, slots=2)
+    ring.write(frame(1), 1.0)
+    ref = SharedFrame(ring.spec, 0, 1)
+    ring.close(unlink=True)
+    assert resolve_frames([(0, ref)]) == ([], {})
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+import threading
+from types import SimpleNamespace
+
+from intellai_gui import WARM_UP_STEPS, intellai_gui
+from utils.update_bus import UpdateBus
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# -----------------------------------
+
+def test_gui_import_does_not_load_models():
+    # Fresh interpreter: the test session may already have imported the models
+    check = (
+        "import sys, intellai_gui; "
+        "loaded = [name for name in ('deepface', 'tensorflow', 'keras', 'intellai_single', 'intellai_hybrid', 'utils.attributes') if name in sys.modules]; "
+        "print(','.join(loaded))"
+    )
+    output = subprocess.run([sys.executable, "-c", check], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == ""
+
+def test_failed_warm_up_is_reported_and_unblocks_runs():
+    # DEF: Model import that fails, as when DeepFace is missing
+    def get_model(model_type):
+        raise ImportError("No module named 'deepface'")
+    gui = SimpleNamespace(warm_up_bus=UpdateBus(), warm_up_done=threading.Event(), get_model=get_model)
+
+    intellai_gui.warm_up_thread(gui)
+    assert gui.warm_up_done.is_set()
+    assert gui.warm_up_bus.drain() == [(0, WARM_UP_STEPS[0]), (0, f"Failed ({WARM_UP_STEPS[0]}): No module named 'deepface'")]
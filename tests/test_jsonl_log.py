@@ -0,0 +1,81 @@
+import json
+import time
+
+from utils.jsonl_log import JsonlWriter, iter_records, log_files, convert_json_array, compress_segment
+
+# DEF: Wait for background compression to leave only .gz segments
+def wait_compressed(path, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        segments = log_files(path)[:-1]
+        if segments and all(segment.suffix == ".gz" for segment in segments):
+            return segments
+        time.sleep(0.01)
+    return log_files(path)[:-1]
+
+# -----------------------------------
+
+def test_rotates_by_size_and_reads_in_order(tmp_path):
+    path = tmp_path / "analysis.jsonl"
+    writer = JsonlWriter(path, max_bytes=200, compress=False)
+    for i in range(40):
+        writer.write({"n": i, "cam_id": 0})
+    writer.close()
+
+    files = log_files(path)
+    assert len(files) > 2
+    assert files[-1] == path
+    # Every segment but the active file stays under max_bytes
+    assert all(file.stat().st_size <= 200 for file in files)
+    assert [record["n"] for record in iter_records(path)] == list(range(40))
+    assert [record["n"] for record in iter_records(path, include_rotated=False)] == [
+        json.loads(line)["n"] for line in path.read_text().splitlines()
+    ]
+
+def test_rotates_by_age(tmp_path, monkeypatch):
+    path = tmp_path / "analysis.jsonl"
+    writer = JsonlWriter(path, max_bytes=None, max_age=60, compress=False)
+    writer.write({"n": 0})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    writer.write({"n": 1})
+    writer.close()
+    assert len(log_files(path)) == 2
+
+def test_compressed_segments_are_read(tmp_path):
+    path = tmp_path / "analysis.jsonl"
+    writer = JsonlWriter(path, max_bytes=100, compress=True)
+    for i in range(20):
+        writer.write({"n": i})
+    writer.close()
+
+    segments = wait_compressed(path)
+    assert segments and all(segment.suffix == ".gz" for segment in segments)
+    assert [record["n"] for record in iter_records(path)] == list(range(20))
+
+def test_segment_listed_once_while_compressing(tmp_path):
+    path = tmp_path / "analysis.jsonl"
+    segment = tmp_path / "analysis.20240301-000000-000000.jsonl"
+    segment.write_text('{"n": 0}\n')
+    path.write_text('{"n": 1}\n')
+    # Compressed copy written, uncompressed file not removed yet
+    compress_segment(segment)
+    segment.write_text('{"n": 0}\n')
+
+    assert log_files(path) == [segment, path]
+    assert [record["n"] for record in iter_records(path)] == [0, 1]
+
+def test_partial_last_line_is_skipped(tmp_path):
+    path = tmp_path / "analysis.jsonl"
+    path.write_text('{"n": 0}\n\n{"n": 1}\n{"n": 2, "ag')
+    assert [record["n"] for record in iter_records(path)] == [0, 1]
+    assert list(iter_records(tmp_path / "missing.jsonl")) == []
+
+def test_convert_json_array(tmp_path):
+    json_path = tmp_path / "analysis.json"
+    json_path.write_text(json.dumps([{"n": 0}, {"n": 1}]))
+    jsonl_path = convert_json_array(json_path, remove_original=True)
+    assert jsonl_path == tmp_path / "analysis.jsonl"
+    assert not json_path.exists()
+    assert list(iter_records(jsonl_path)) == [{"n": 0}, {"n": 1}]
+    assert convert_json_array(tmp_path / "missing.json") is None
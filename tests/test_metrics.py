@@ -0,0 +1,101 @@
+import json
+import urllib.request
+
+import pytest
+
+from utils.metrics import Histogram, MetricsRegistry, MetricsServer, format_labels, format_value
+
+# -----------------------------------
+
+def test_percentiles_within_a_bucket():
+    histogram = Histogram()
+    values = [i / 1000 for i in range(1, 1001)]
+    for value in values:
+        histogram.record(value)
+    for q, exact in ((0.5, 0.5), (0.9, 0.9), (0.99, 0.99)):
+        # Half a bucket width with the default growth (2 ** 0.125)
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.05)
+    assert histogram.percentile(1.0) <= histogram.max == 1.0
+    assert histogram.count == 1000
+    assert histogram.snapshot()["mean"] == pytest.approx(sum(values) / 1000)
+
+def test_out_of_range_values():
+    histogram = Histogram(min_value=1e-3, max_value=1.0)
+    histogram.record(1e-5)
+    histogram.record(50.0)
+    assert histogram.percentile(0.01) == 1e-5
+    assert histogram.percentile(1.0) == 50.0
+    assert len(histogram.buckets) == histogram.size
+
+def test_empty_and_reset():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) is None
+    histogram.record(0.1)
+    histogram.reset()
+    assert histogram.snapshot()["count"] == 0
+    assert histogram.snapshot()["mean"] is None
+
+def test_time_records_on_error():
+    histogram = Histogram()
+    with pytest.raises(RuntimeError):
+        with histogram.time():
+            raise RuntimeError
+    assert histogram.count == 1
+
+def test_registry_reuses_metrics_by_labels():
+    registry = MetricsRegistry()
+    assert registry.counter("frames", cam=0) is registry.counter("frames", cam="0")
+    assert registry.counter("frames", cam=0) is not registry.counter("frames", cam=1)
+    with pytest.raises(ValueError):
+        registry.histogram("frames", cam=0)
+
+    registry.gauge("queue", fn=lambda: 3, writer="db")
+    assert registry.gauge("queue", writer="db").value() == 3
+    registry.remove("queue", writer="db")
+    assert registry.snapshot()["gauges"] == []
+    registry.clear()
+    assert registry.metrics == {}
+
+def test_snapshot(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("frames", cam=0).inc(5)
+    registry.gauge("broken", fn=lambda: 1 / 0)
+    registry.histogram("stage_seconds", stage="detect").record(0.02)
+
+    path = tmp_path / "metrics.json"
+    registry.write_snapshot(path)
+    snapshot = json.loads(path.read_text())
+    assert snapshot["counters"] == [{"name": "frames", "labels": {"cam": "0"}, "value": 5}]
+    assert snapshot["gauges"] == [{"name": "broken", "labels": {}, "value": None}]
+    assert snapshot["histograms"][0]["count"] == 1
+
+def test_prometheus_text():
+    registry = MetricsRegistry(prefix="test")
+    registry.counter("frames", cam=0).inc(2)
+    registry.counter("frames", cam=1).inc()
+    registry.histogram("stage_seconds", stage="detect").record(0.5)
+    lines = registry.prometheus().splitlines()
+
+    # One TYPE line per metric name
+    assert lines.count("# TYPE test_frames counter") == 1
+    assert 'test_frames{cam="0"} 2.0' in lines
+    assert "# TYPE test_stage_seconds summary" in lines
+    assert 'test_stage_seconds{stage="detect",quantile="0.5"} 0.5' in lines
+    assert 'test_stage_seconds_count{stage="detect"} 1' in lines
+
+def test_label_and_value_format():
+    assert format_labels(()) == ""
+    assert format_labels((("path", 'a"b\\c'),)) == '{path="a\\"b\\\\c"}'
+    assert format_value(None) == "NaN"
+    assert format_value(3) == "3.0"
+
+def test_server():
+    registry = MetricsRegistry()
+    registry.counter("frames").inc()
+    server = MetricsServer(registry, port=0).start()
+    try:
+        base = f"http://{server.host}:{server.port}"
+        assert "intellai_frames 1.0" in urllib.request.urlopen(base + "/metrics").read().decode()
+        assert json.loads(urllib.request.urlopen(base + "/metrics.json").read())["counters"][0]["value"] == 1
+    finally:
+        server.stop()
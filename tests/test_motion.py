@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from utils.motion import MotionGate, build_motion_gates, motion_summary
+
+# DEF: Gray 640x480 frame with an optional bright square at (x, y)
+def frame(square=None, size=80):
+    image = np.full((480, 640, 3), 60, np.uint8)
+    if square is not None:
+        x, y = square
+        image[y:y + size, x:x + size] = 220
+    return image
+
+# -----------------------------------
+
+def test_diff_gate_detects_change():
+    gate = MotionGate(method='diff', hold_time=2.0)
+    # First frame only sets the reference
+    assert not gate.update(frame(), 0.0)
+    assert not gate.update(frame(), 0.1)
+    assert gate.update(frame((100, 100)), 0.2)
+    assert gate.motion_frames == 1
+
+def test_hold_time_keeps_gate_open():
+    gate = MotionGate(method='diff', hold_time=2.0)
+    gate.update(frame(), 0.0)
+    gate.update(frame((100, 100)), 1.0)
+    assert gate.should_analyse(2.5)
+    assert not gate.should_analyse(3.5)
+    assert (gate.triggered, gate.skipped) == (1, 1)
+
+def test_region_ignores_motion_elsewhere():
+    gate = MotionGate(method='diff', region=(400, 300, 200, 150))
+    gate.update(frame(), 0.0)
+    assert not gate.update(frame((50, 50)), 0.1)
+    assert gate.update(frame((450, 340)), 0.2)
+
+def test_mog2_learns_static_background():
+    gate = MotionGate(method='mog2', history=20)
+    for i in range(30):
+        gate.update(frame(), i * 0.1)
+    assert not gate.update(frame(), 3.0)
+    assert gate.update(frame((200, 200), size=120), 3.1)
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        MotionGate(method='optical-flow')
+
+def test_build_gates_with_camera_overrides():
+    gates = build_motion_gates([0, 1, 2], motion={"min_area": 0.01}, cam_settings={1: {"motion": False}, 2: {"motion": {"method": "diff"}}})
+    assert sorted(gates) == [0, 2]
+    assert gates[0].min_area == 0.01 and gates[0].method == 'mog2'
+    assert gates[2].min_area == 0.01 and gates[2].method == 'diff'
+
+    # No default gate: only cameras with their own settings are gated
+    assert sorted(build_motion_gates([0, 1], cam_settings={1: {"motion": True}})) == [1]
+    assert "Cam 0:" in motion_summary(gates)
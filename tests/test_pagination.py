@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from utils import db_utils
+from utils.db_utils import SORT_COLUMNS, query_page, query_new, last_entry_id, count_entries, sort_key
+
+# Filter sets: (gender, race, min_age, max_age, start, end)
+FILTERS = [
+    (None, None, None, None, None, None),
+    ("Woman", None, None, None, None, None),
+    (None, "white", None, None, None, None),
+    ("Man", "asian", None, None, None, None),
+    (None, None, 20, 40, None, None),
+    ("Woman", "white", 20, 40, None, None),
+    (None, None, None, None, "2024-03-01T06:00:00", "2024-03-03T04:00:00"),
+    ("Woman", None, 25, None, "2024-03-02T00:00:00", None),
+]
+
+# -----------------------------------
+
+# DEF: Every face_data row matching a filter set, in a sort order (as SQLite sorts them, NULLs first ascending)
+def expected_rows(db_path, order_by, descending, gender, race, min_age, max_age, start, end):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT id, age, gender, race, timestamp FROM face_data").fetchall()
+    conn.close()
+    rows = [
+        row for row in rows
+        if (gender is None or row[2] == gender)
+        and (race is None or row[3] == race)
+        and (min_age is None or (row[1] is not None and row[1] >= min_age))
+        and (max_age is None or (row[1] is not None and row[1] <= max_age))
+        and (start is None or row[4] >= start)
+        and (end is None or row[4] < end)
+    ]
+    return sorted(rows, key=lambda row: sort_key(row, order_by), reverse=descending)
+
+# DEF: Every row of a filter set, read a page at a time
+def read_pages(db_path, order_by, descending, filters, limit):
+    gender, race, min_age, max_age, start, end = filters
+    rows, after = [], None
+    while True:
+        page, after = query_page(gender, race, min_age, max_age, order_by, descending, after, limit, start, end, db_path)
+        assert len(page) <= limit
+        rows += page
+        if after is None:
+            return rows
+
+# -----------------------------------
+
+@pytest.mark.parametrize("order_by", SORT_COLUMNS)
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_pages_match_full_sort(face_db, order_by, descending, filters):
+    expected = expected_rows(face_db, order_by, descending, *filters)
+    # Page sizes that end pages inside runs of equal values and of NULLs
+    for limit in (1, 7, 500):
+        assert read_pages(face_db, order_by, descending, filters, limit) == expected
+
+def test_last_page_has_no_cursor(face_db):
+    rows, after = query_page(order_by="age", limit=10 ** 6, db_path=face_db)
+    assert after is None
+    assert len(rows) == count_entries(db_path=face_db)
+
+def test_unknown_sort_column(face_db):
+    with pytest.raises(ValueError):
+        query_page(order_by="image_path", db_path=face_db)
+
+# DEF: Check no page query sorts its rows in a temporary B-tree (every sort walks an index)
+@pytest.mark.parametrize("order_by", SORT_COLUMNS)
+@pytest.mark.parametrize("filters", FILTERS)
+def test_pages_walk_indexes(face_db, monkeypatch, order_by, filters):
+    statements = []
+    connect = sqlite3.connect
+
+    def tracing_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(db_utils.sqlite3, "connect", tracing_connect)
+    for descending in (True, False):
+        read_pages(face_db, order_by, descending, filters, 7)
+    monkeypatch.undo()
+
+    conn = sqlite3.connect(face_db)
+    queries = [statement for statement in statements if "FROM face_data_2" in statement]
+    assert queries
+    for query in queries:
+        plan = " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query))
+        assert "TEMP B-TREE" not in plan, query
+    conn.close()
+
+def test_query_new_returns_rows_after_id(face_db):
+    conn = sqlite3.connect(face_db)
+    ids = [row[0] for row in conn.execute("SELECT id FROM face_data WHERE gender = 'Woman' ORDER BY id")]
+    conn.close()
+
+    assert last_entry_id(face_db) == max(row[0] for row in query_new(after_id=0, limit=10 ** 6, db_path=face_db))
+    rows = query_new(gender="Woman", after_id=ids[10], limit=5, db_path=face_db)
+    assert [row[0] for row in rows] == ids[11:16]
+    assert query_new(after_id=last_entry_id(face_db), db_path=face_db) == []
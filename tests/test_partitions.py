@@ -0,0 +1,134 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from utils.db_utils import init_db, count_entries
+from utils.partitions import (ID_SPAN, TRIGGER_PARTITIONS, list_partitions, partition_name, partition_base_id,
+                              partition_source, apply_retention, ensure_partition)
+from utils.rollups import GRANULARITIES, init_rollups, update_rollups
+
+from conftest import DAYS, sample_rows
+
+# -----------------------------------
+
+# DEF: Every rollup table's rows, by granularity
+def rollup_rows(conn):
+    return {granularity: sorted(conn.execute(f"SELECT * FROM {table}")) for granularity, (table, _) in GRANULARITIES.items()}
+
+# DEF: In-memory rollup tables holding rollup_rows() output
+def rollup_copy(rows):
+    conn = sqlite3.connect(":memory:")
+    init_rollups(conn)
+    for granularity, (table, _) in GRANULARITIES.items():
+        conn.executemany(f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?)", rows[granularity])
+    return conn
+
+def test_rows_go_to_their_day(face_db):
+    conn = sqlite3.connect(face_db)
+    for day in DAYS:
+        name = partition_name(day)
+        ids, days = zip(*conn.execute(f"SELECT id, substr(timestamp, 1, 10) FROM {name} ORDER BY id"))
+        assert set(days) == {day}
+        # IDs start at the day's base ID and run on without gaps
+        assert ids == tuple(range(partition_base_id(name) + 1, partition_base_id(name) + len(ids) + 1))
+    conn.close()
+
+def test_list_partitions_by_range(face_db):
+    conn = sqlite3.connect(face_db)
+    names = [name for name, _, _ in list_partitions(conn, "2024-03-01T12:00:00", "2024-03-02T00:00:01")]
+    assert names == [partition_name(DAYS[0]), partition_name(DAYS[1])]
+    assert [name for name, _, _ in list_partitions(conn, end="2024-03-02", newest_first=True)] == [partition_name(DAYS[0])]
+    assert partition_source(conn) == "face_data"
+    assert partition_name(DAYS[2]) in partition_source(conn, start="2024-03-03")
+    conn.close()
+
+def test_view_insert_is_routed_by_trigger(face_db):
+    conn = sqlite3.connect(face_db)
+    name = partition_name(DAYS[1])
+    last_id = conn.execute(f"SELECT MAX(id) FROM {name}").fetchone()[0]
+    before = rollup_rows(conn)
+    with conn:
+        conn.execute(
+            "INSERT INTO face_data (timestamp, age, gender, race, cam_id) VALUES (?, ?, ?, ?, ?)",
+            ("2024-03-02T10:30:00.000000", 34, "Man", "asian", 1)
+        )
+    row = conn.execute(f"SELECT id, age, gender, race, cam_id FROM {name} WHERE id > ?", (last_id,)).fetchone()
+    assert row == (last_id + 1, 34, "Man", "asian", 1)
+    after = rollup_rows(conn)
+    conn.close()
+
+    # The trigger adds the row to the same buckets insert_rows() does
+    expected = rollup_copy(before)
+    with expected:
+        update_rollups(expected, [("2024-03-02T10:30:00.000000", 1, "Man", "asian", 34)])
+    assert rollup_rows(expected) == after
+
+def test_view_insert_without_partition_is_rejected(face_db):
+    conn = sqlite3.connect(face_db)
+    with pytest.raises(sqlite3.DatabaseError):
+        conn.execute("INSERT INTO face_data (timestamp, age) VALUES ('1999-01-01T00:00:00', 30)")
+    conn.close()
+    assert count_entries(db_path=face_db) == len(sample_rows())
+
+def test_trigger_routes_only_recent_partitions(face_db):
+    conn = sqlite3.connect(face_db)
+    with conn:
+        for day in range(1, 21):
+            ensure_partition(conn, f"2025-01-{day:02d}T00:00:00")
+    trigger = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'face_data_insert'").fetchone()[0]
+    # One INSERT per routed partition, however many days the database holds
+    assert trigger.count("INSERT INTO face_data_") == TRIGGER_PARTITIONS
+
+    # Older days are rejected by the trigger, insert_partitioned() still writes them
+    with pytest.raises(sqlite3.DatabaseError):
+        conn.execute("INSERT INTO face_data (timestamp, age) VALUES ('2025-01-02T10:00:00', 30)")
+    conn.close()
+
+def test_retention_drops_old_days(face_db):
+    dropped = apply_retention(face_db, 1, now=datetime(2024, 3, 3, 12))
+    # 2024-03-01 ends before the cutoff (2024-03-02T12:00), 2024-03-02 does not
+    assert dropped == [partition_name(DAYS[0])]
+
+    conn = sqlite3.connect(face_db)
+    names = [name for name, _, _ in list_partitions(conn)]
+    assert partition_name(DAYS[0]) not in names
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (partition_name(DAYS[0]),)).fetchone() is None
+    # The dropped day's rollup buckets go with it, the rest are untouched
+    for table, _ in GRANULARITIES.values():
+        assert conn.execute(f"SELECT COUNT(*) FROM {table} WHERE bucket LIKE '2024-03-01%'").fetchone()[0] == 0
+        assert conn.execute(f"SELECT SUM(count) FROM {table}").fetchone()[0] == 2 * len(sample_rows()) // 3
+    # Partitions for the retention pass's today and tomorrow exist
+    assert {partition_name("2024-03-03"), partition_name("2024-03-04")} <= set(names)
+    conn.close()
+    assert count_entries(db_path=face_db) == 2 * len(sample_rows()) // 3
+
+def test_legacy_table_is_migrated(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("CREATE TABLE face_data (id INTEGER PRIMARY KEY, timestamp TEXT, age INTEGER, gender TEXT, race TEXT, image_path TEXT)")
+        conn.executemany(
+            "INSERT INTO face_data (id, timestamp, age, gender, race) VALUES (?, ?, ?, ?, ?)",
+            [(5, "2024-03-02T09:00:00", 30, "Man", "white"), (9, "2024-03-01T08:00:00", 20, "Woman", "asian"),
+             (12, "2024-03-02T07:00:00", 40, None, None), (13, None, None, None, None)]
+        )
+    conn.close()
+
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'face_data'").fetchone()[0] == "view"
+    rows = conn.execute("SELECT id, timestamp, age FROM face_data ORDER BY id").fetchall()
+    id_map = dict(conn.execute("SELECT old_id, new_id FROM face_id_map"))
+    conn.close()
+
+    first, second = 20240301 * ID_SPAN, 20240302 * ID_SPAN
+    # Renumbered per day in the old ID order, the row without a timestamp goes to the oldest day
+    assert rows == [
+        (first + 1, "2024-03-01T08:00:00", 20),
+        (first + 2, None, None),
+        (second + 1, "2024-03-02T09:00:00", 30),
+        (second + 2, "2024-03-02T07:00:00", 40),
+    ]
+    # Old IDs stay resolvable
+    assert id_map == {9: first + 1, 13: first + 2, 5: second + 1, 12: second + 2}
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from utils.replay_bench import latency_stats, open_source, replay, synthetic_frames
+
+# -----------------------------------
+
+def test_synthetic_frames_are_deterministic():
+    first = list(synthetic_frames(3, width=320, height=240, seed=4))
+    again = list(synthetic_frames(3, width=320, height=240, seed=4))
+    other = list(synthetic_frames(3, width=320, height=240, seed=5))
+
+    assert len(first) == 3 and first[0].shape == (240, 320, 3)
+    assert all(np.array_equal(a, b) for a, b in zip(first, again))
+    assert not np.array_equal(first[0], other[0])
+
+def test_open_source_synthetic_count():
+    assert len(list(open_source("synthetic:4"))) == 4
+    assert len(list(open_source("synthetic", max_frames=2))) == 2
+
+def test_latency_stats():
+    stats = latency_stats([0.01 * i for i in range(1, 101)])
+    assert stats["count"] == 100
+    assert stats["mean"] == pytest.approx(0.505)
+    assert stats["p50"] == pytest.approx(0.51) and stats["max"] == pytest.approx(1.0)
+    assert latency_stats([]) == {"count": 0}
+
+def test_replay_counts_frames_per_camera_tick():
+    # Detection only: no attribute models are loaded
+    result = replay("hybrid", "synthetic:5", cameras=2, actions=())
+    assert (result["frames"], result["ticks"]) == (5, 3)
+    assert result["stages"]["tick"]["count"] == 3
+    assert result["stages"]["detect"]["count"] == 5
+    assert result["fps"] > 0
@@ -0,0 +1,100 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.result_cache import ResultCache, get_result_cache, count_cached
+from utils.image_hash import dhash, phash, hamming
+
+# DEF: Drawn face crop (BGR), seed varies the features
+def face_crop(seed=0, size=96):
+    rng = np.random.default_rng(seed)
+    crop = np.full((size, size, 3), 60, dtype=np.uint8)
+    cv2.ellipse(crop, (size // 2, size // 2), (size // 3, size * 2 // 5), 0, 0, 360, (150, 170, 200), -1)
+    for _ in range(6):
+        x, y = rng.integers(size // 4, size * 3 // 4, 2)
+        cv2.circle(crop, (int(x), int(y)), int(rng.integers(3, 9)), tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    return crop
+
+RESULT = {"age": 31, "dominant_gender": "Woman", "dominant_race": "asian", "cam_id": 0, "region": {"x": 1, "y": 1, "w": 9, "h": 9}}
+
+# -----------------------------------
+
+def test_hashes():
+    crop = face_crop()
+    assert hamming(dhash(crop), dhash(crop)) == 0
+    assert hamming(phash(crop), phash(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY))) == 0
+    assert hamming(dhash(crop), dhash(face_crop(1))) > 5
+    assert dhash(crop).bit_length() <= 64
+
+@pytest.mark.parametrize("method", ["dhash", "phash", "both"])
+def test_near_identical_crop_hits(method):
+    cache = ResultCache(method=method)
+    crop = face_crop()
+    result, key = cache.get(0, crop, (0, 0, 96, 96))
+    assert result is None
+    cache.put(key, RESULT)
+
+    # Brighter, slightly rescaled copy of the same face
+    similar = cv2.resize(cv2.convertScaleAbs(crop, alpha=1.1, beta=10), (100, 100))
+    result, _ = cache.get(0, similar, (5, 6, 100, 100))
+    assert result["age"] == 31
+    assert result["cached"] is True
+    # Face keys are the new face's, not the cached one's
+    assert result["cam_id"] == 0 and result["region"] == {"x": 5, "y": 6, "w": 100, "h": 100}
+    assert cache.hit_rate() == 0.5
+
+def test_other_faces_and_cameras_miss():
+    cache = ResultCache()
+    _, key = cache.get(0, face_crop(), (0, 0, 96, 96))
+    cache.put(key, RESULT)
+    assert cache.get(0, face_crop(1), (0, 0, 96, 96))[0] is None
+    assert cache.get(1, face_crop(), (0, 0, 96, 96))[0] is None
+
+def test_hits_are_copies():
+    cache = ResultCache()
+    _, key = cache.get(0, face_crop(), (0, 0, 96, 96))
+    cache.put(key, dict(RESULT, embedding=[0.5, 0.5]))
+    result, _ = cache.get(0, face_crop(), (0, 0, 96, 96))
+    result["embedding"].append(1.0)
+    assert cache.get(0, face_crop(), (0, 0, 96, 96))[0]["embedding"] == [0.5, 0.5]
+
+def test_entries_expire(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = ResultCache(ttl=10.0)
+    _, key = cache.get(0, face_crop(), (0, 0, 96, 96))
+    cache.put(key, RESULT)
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11.0)
+    assert cache.get(0, face_crop(), (0, 0, 96, 96))[0] is None
+    assert cache.expired == 1
+
+def test_least_recently_used_is_evicted():
+    cache = ResultCache(max_size=2)
+    keys = []
+    for seed in range(3):
+        _, key = cache.get(0, face_crop(seed), (0, 0, 96, 96))
+        cache.put(key, dict(RESULT, age=seed))
+        keys.append(key)
+        if seed == 1:
+            # Face 0 used again, face 1 is now the least recently used
+            assert cache.get(0, face_crop(0), (0, 0, 96, 96))[0]["age"] == 0
+    assert cache.evicted == 1
+    assert cache.get(0, face_crop(1), (0, 0, 96, 96))[0] is None
+    assert [result["age"] for result in (cache.get(0, face_crop(seed), (0, 0, 96, 96))[0] for seed in (0, 2))] == [0, 2]
+
+def test_get_result_cache():
+    assert get_result_cache(None) is None
+    assert get_result_cache(False) is None
+    cache = ResultCache()
+    assert get_result_cache(cache) is cache
+    assert get_result_cache(True) is get_result_cache(True)
+    assert get_result_cache({"ttl": 5.0}) is get_result_cache({"ttl": 5.0})
+    assert get_result_cache({"ttl": 5.0}) is not get_result_cache({"ttl": 6.0})
+    with pytest.raises(ValueError):
+        ResultCache(method="ahash")
+
+def test_count_cached():
+    assert count_cached([{"cached": True}, {}, {"cached": False}, {"cached": True}]) == 2
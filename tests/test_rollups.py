@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+
+from utils.rollups import plan_segments, is_aligned, query_rollup, rebuild_rollups, age_band, GRANULARITIES, NO_AGE
+
+from conftest import sample_rows
+
+# -----------------------------------
+
+# DEF: Counts of sample rows in a time range (end exclusive), grouped by gender
+def expected_counts(start=None, end=None):
+    counts = {}
+    for timestamp, _, gender, _, _, _, _ in sample_rows():
+        if (start is None or timestamp >= start) and (end is None or timestamp < end):
+            counts[gender] = counts.get(gender, 0) + 1
+    return counts
+
+def test_age_band():
+    assert age_band(None) == NO_AGE
+    assert age_band(0) == 0
+    assert age_band(29) == 20
+    assert age_band(30) == 30
+
+def test_is_aligned():
+    assert is_aligned(None, 10)
+    assert is_aligned("2024-03-01T00:00:00.000000", 10)
+    assert not is_aligned("2024-03-01T00:00:01.000000", 10)
+    assert is_aligned("2024-03-01T05:00:00.000000", 13)
+    assert not is_aligned("2024-03-01T05:30:00.000000", 13)
+    assert is_aligned("2024-03-01T05:30:00.000000", 16)
+
+@pytest.mark.parametrize("start, end, interval, segments", [
+    (None, None, None, [("day", None, None)]),
+    ("2024-03-01T00:00:00.000000", "2024-03-03T00:00:00.000000", None, [("day", "2024-03-01T00:00:00.000000", "2024-03-03T00:00:00.000000")]),
+    # Unaligned start: only the partial first day comes from the hour rollup
+    ("2024-03-01T06:00:00.000000", "2024-03-03T00:00:00.000000", None, [
+        ("hour", "2024-03-01T06:00:00.000000", "2024-03-02T00:00:00.000000"),
+        ("day", "2024-03-02T00:00:00.000000", "2024-03-03T00:00:00.000000"),
+    ]),
+    ("2024-03-01T06:15:00.000000", "2024-03-03T09:00:00.000000", None, [
+        ("minute", "2024-03-01T06:15:00.000000", "2024-03-01T07:00:00.000000"),
+        ("hour", "2024-03-01T07:00:00.000000", "2024-03-02T00:00:00.000000"),
+        ("day", "2024-03-02T00:00:00.000000", "2024-03-03T00:00:00.000000"),
+        ("hour", "2024-03-03T00:00:00.000000", "2024-03-03T09:00:00.000000"),
+    ]),
+    ("2024-03-01T00:00:00.000000", "2024-03-01T13:45:00.000000", None, [
+        ("hour", "2024-03-01T00:00:00.000000", "2024-03-01T13:00:00.000000"),
+        ("minute", "2024-03-01T13:00:00.000000", "2024-03-01T13:45:00.000000"),
+    ]),
+    (None, "2024-03-02T12:00:00.000000", None, [
+        ("day", None, "2024-03-02T00:00:00.000000"),
+        ("hour", "2024-03-02T00:00:00.000000", "2024-03-02T12:00:00.000000"),
+    ]),
+    ("2024-03-01T00:00:00.000000", "2024-03-03T00:00:00.000000", "hour", [("hour", "2024-03-01T00:00:00.000000", "2024-03-03T00:00:00.000000")]),
+    (None, None, "minute", [("minute", None, None)]),
+    ("2024-03-02T00:00:00.000000", "2024-03-01T00:00:00.000000", None, []),
+])
+def test_plan_segments(start, end, interval, segments):
+    assert plan_segments(start, end, interval) == segments
+
+@pytest.mark.parametrize("start, end", [
+    (None, None),
+    ("2024-03-02T00:00:00", None),
+    ("2024-03-01T06:00:00", "2024-03-02T00:00:00"),
+    ("2024-03-01T04:17:00", "2024-03-03T09:00:00"),
+    ("2024-03-02T02:30:00", "2024-03-02T03:00:00"),
+    ("2024-03-01T04:17:00", "2024-03-02T13:45:00"),
+    (None, "2024-03-02T12:00:00"),
+    ("2024-03-02T12:00:00", "2024-03-01T00:00:00"),
+])
+def test_totals_match_rows(face_db, start, end):
+    rows = query_rollup(start, end, group_by=("gender",), db_path=face_db)
+    assert {row["gender"]: row["count"] for row in rows} == expected_counts(start, end)
+
+def test_interval_buckets(face_db):
+    rows = query_rollup("2024-03-01", "2024-03-03", interval="day", db_path=face_db)
+    assert [row["bucket"] for row in rows] == ["2024-03-01", "2024-03-02"]
+    assert [row["count"] for row in rows] == [len(sample_rows()) // 3] * 2
+
+    # Hour buckets read from the hour rollup add up to the day
+    hours = query_rollup("2024-03-01", "2024-03-02", interval="hour", db_path=face_db)
+    assert all(row["bucket"].startswith("2024-03-01T") and len(row["bucket"]) == 13 for row in hours)
+    assert sum(row["count"] for row in hours) == rows[0]["count"]
+
+    # Partial days are read from finer rollups and merged into the day buckets
+    partial = query_rollup("2024-03-01T12:00:00", "2024-03-02T12:00:00", interval="day", db_path=face_db)
+    assert [row["bucket"] for row in partial] == ["2024-03-01", "2024-03-02"]
+    assert sum(row["count"] for row in partial) == sum(expected_counts("2024-03-01T12:00:00", "2024-03-02T12:00:00").values())
+
+def test_mean_age_ignores_unknown_ages(face_db):
+    rows = query_rollup(db_path=face_db)
+    ages = [row[1] for row in sample_rows() if row[1] is not None]
+    assert rows[0]["count"] == len(sample_rows())
+    assert rows[0]["mean_age"] == pytest.approx(sum(ages) / len(ages))
+
+def test_age_filters_use_bands(face_db):
+    rows = query_rollup(min_age=25, max_age=39, group_by=("age_band",), db_path=face_db)
+    assert [row["age_band"] for row in rows] == [20, 30]
+
+def test_rebuild_matches_incremental(face_db):
+    conn = sqlite3.connect(face_db)
+    tables = [table for table, _ in GRANULARITIES.values()]
+    incremental = {table: sorted(conn.execute(f"SELECT * FROM {table}")) for table in tables}
+    conn.close()
+
+    assert rebuild_rollups(face_db)
+    conn = sqlite3.connect(face_db)
+    assert {table: sorted(conn.execute(f"SELECT * FROM {table}")) for table in tables} == incremental
+    conn.close()
+
+def test_unknown_group_or_interval(face_db):
+    with pytest.raises(ValueError):
+        query_rollup(group_by=("image_path",), db_path=face_db)
+    with pytest.raises(ValueError):
+        query_rollup(interval="week", db_path=face_db)
@@ -0,0 +1,102 @@
+import os
+import signal
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from intellai_hybrid import HybridModel
+from utils.run_control import DisplayThrottle, RunConfig, RunLimits, install_stop_handlers
+
+# -----------------------------------
+
+def test_limits_report_the_reason_to_stop():
+    assert RunLimits().reached(10 ** 6, 10 ** 6) is None
+    assert RunLimits(max_frames=10).reached(9, 0) is None
+    assert RunLimits(max_frames=10).reached(10, 0) == "10 frames processed"
+    assert RunLimits(max_faces=3).reached(100, 3) == "3 faces analysed"
+    assert RunLimits(max_duration=0).reached(0, 0) == "0 seconds elapsed"
+
+def test_stop_event_wins_over_other_limits():
+    stop_event = threading.Event()
+    limits = RunLimits(max_frames=5, stop_event=stop_event)
+    assert limits.reached(0, 0) is None
+    stop_event.set()
+    assert limits.reached(10, 0) == "stop requested"
+
+def test_display_throttle():
+    # No fps: every loop refreshes
+    throttle = DisplayThrottle()
+    assert throttle.due(0.0) and throttle.due(0.0)
+
+    throttle = DisplayThrottle(fps=10)
+    assert throttle.due(1.0)
+    assert not throttle.due(1.05)
+    assert throttle.due(1.1)
+    assert not throttle.due(1.15)
+
+def test_config_replace_copies():
+    config = RunConfig(cam_ids=(0, 1), workers=2)
+    headless = config.replace(display=False, max_frames=100)
+    assert (headless.display, headless.max_frames, headless.workers, headless.cam_ids) == (False, 100, 2, [0, 1])
+    assert config.display is True and config.max_frames is None
+
+    with pytest.raises(TypeError, match="Unknown run option"):
+        config.replace(max_frame=100)
+
+def test_first_signal_sets_stop_event_and_restores_handlers():
+    previous = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        stop_event = install_stop_handlers()
+        assert not stop_event.is_set()
+        os.kill(os.getpid(), signal.SIGTERM)
+        assert stop_event.wait(5)
+        # A second signal gets the previous handler (force quit)
+        assert {sig: signal.getsignal(sig) for sig in previous} == previous
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+# -----------------------------------
+
+# CLASS: Stand-in for cv2.VideoCapture, delivers blank frames until released
+class BlankCamera:
+    def __init__(self):
+        self.released = False
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        time.sleep(0.005)
+        return True, np.zeros((120, 160, 3), np.uint8)
+
+    def release(self):
+        self.released = True
+
+# DEF: Headless run of the hybrid model on blank cameras, from tmp_path (the run creates db/ and logs/ there)
+# Returns the messages sent to the update callback and the cameras
+def headless_run(tmp_path, monkeypatch, **options):
+    monkeypatch.chdir(tmp_path)
+    cams = []
+    monkeypatch.setattr("utils.pipeline.open_cam", lambda cam_id: cams.append(BlankCamera()) or cams[-1])
+    messages = []
+    HybridModel().run_model(update_callback=messages.append, display=False, actions=(), frequency=1, **options)
+    return messages, cams
+
+def test_headless_run_stops_at_frame_limit(tmp_path, monkeypatch):
+    messages, cams = headless_run(tmp_path, monkeypatch, cam_ids=(0, 1), max_frames=6)
+    assert any(msg.startswith("Stopping analysis: ") and "frames processed" in msg for msg in messages)
+    assert cams and all(cam.released for cam in cams)
+
+def test_headless_run_stops_on_stop_event(tmp_path, monkeypatch):
+    stop_event = threading.Event()
+    timer = threading.Timer(0.5, stop_event.set)
+    timer.start()
+    try:
+        messages, cams = headless_run(tmp_path, monkeypatch, max_duration=30, stop_event=stop_event)
+    finally:
+        timer.cancel()
+    assert "Stopping analysis: stop requested." in messages
+    assert all(cam.released for cam in cams)
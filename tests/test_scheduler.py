@@ -0,0 +1,64 @@
+from utils.scheduler import AnalysisScheduler
+
+# -----------------------------------
+
+def test_min_interval():
+    scheduler = AnalysisScheduler([0, 1], min_interval=1.0)
+    assert scheduler.due([0, 1], now=0.0) == [0, 1]
+    scheduler.select([0], now=0.0)
+    assert scheduler.due([0, 1], now=0.5) == [1]
+    assert scheduler.due([0, 1], now=1.0) == [0, 1]
+
+def test_skip_uses_the_slot():
+    scheduler = AnalysisScheduler([0], min_interval=1.0)
+    scheduler.skip(0, now=0.0)
+    assert scheduler.due([0], now=0.5) == []
+    assert scheduler.selected[0] == 0
+
+def test_budget_limits_rate():
+    # 0.5 sec per frame, 80% of one analyser: 1.6 analyses per second
+    scheduler = AnalysisScheduler(list(range(4)), min_interval=0.0, budget=0.8)
+    scheduler.record(1.0, frames=2)
+    assert scheduler.rate() == 1.6
+
+    # The burst (one token per camera) goes first, then the budgeted rate
+    assert len(scheduler.select(list(range(4)), now=0.0)) == 4
+    chosen = sum(len(scheduler.select(list(range(4)), now=t / 10)) for t in range(1, 101))
+    assert chosen == 16
+    assert sum(scheduler.deferred.values()) > 0
+
+def test_no_rate_until_cost_is_measured():
+    scheduler = AnalysisScheduler([0, 1, 2], min_interval=0.0)
+    assert scheduler.rate() is None
+    for t in range(10):
+        assert len(scheduler.select([0, 1, 2], now=float(t))) == 3
+
+def test_max_latency_caps_a_tick():
+    scheduler = AnalysisScheduler(list(range(6)), min_interval=0.0, max_latency=1.0, capacity=2)
+    scheduler.record(0.5)
+    # 1 sec of latency at 0.5 sec per frame on two analysers
+    assert len(scheduler.select(list(range(6)), now=0.0)) == 4
+
+def test_longest_waiting_and_active_first():
+    scheduler = AnalysisScheduler([0, 1, 2], min_interval=0.0, priority_window=5.0, priority_boost=3.0)
+    scheduler.skip(0, now=0.0)
+    scheduler.skip(1, now=2.0)
+    scheduler.skip(2, now=4.0)
+    # Camera 0 waited longest
+    assert scheduler.select([0, 1, 2], now=5.0) == [0, 1, 2]
+
+    scheduler.skip(0, now=6.0)
+    scheduler.skip(1, now=7.0)
+    scheduler.skip(2, now=8.0)
+    # Recent faces weight camera 2 up (2 sec x 3 beats 4 sec)
+    scheduler.note_activity(2, now=8.0)
+    assert scheduler.select([0, 1, 2], now=10.0) == [2, 0, 1]
+
+def test_cost_is_smoothed():
+    scheduler = AnalysisScheduler([0], smoothing=0.5)
+    scheduler.record(1.0)
+    scheduler.record(3.0)
+    assert scheduler.cost == 2.0
+    # Nothing analysed, nothing recorded
+    scheduler.record(1.0, frames=0)
+    assert scheduler.cost == 2.0
@@ -0,0 +1,126 @@
+import pytest
+
+from utils.tracker import FaceTracker, iou, centroid_distance, result_confidence
+
+# DEF: Attribute result with a confidence for its dominant gender and race
+def result(gender="Woman", race="asian", age=30, confidence=90.0):
+    return {
+        "age": age,
+        "dominant_gender": gender,
+        "gender": {gender: confidence},
+        "dominant_race": race,
+        "race": {race: confidence},
+    }
+
+# -----------------------------------
+
+def test_box_measures():
+    assert iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert iou((0, 0, 10, 10), (20, 20, 10, 10)) == 0.0
+    assert iou((0, 0, 10, 10), (5, 0, 10, 10)) == pytest.approx(50 / 150)
+    assert centroid_distance((0, 0, 10, 10), (10, 0, 10, 10)) == 1.0
+    assert result_confidence(result(confidence=70.0)) == 70.0
+    assert result_confidence({}) == 0.0
+
+def test_update_matches_moving_faces():
+    tracker = FaceTracker()
+    first = tracker.update(0, [(0, 0, 50, 50), (200, 0, 50, 50)], 0.0)
+    # One face overlaps its old box, the other moved too far to overlap but stays within max_distance
+    second = tracker.update(0, [(210, 0, 50, 50), (5, 5, 50, 50)], 0.1)
+    assert [track.id for track in second] == [first[1].id, first[0].id]
+    assert second[0].hits == 2
+
+    # Same box on another camera is a different person
+    other = tracker.update(1, [(0, 0, 50, 50)], 0.1)
+    assert other[0].id not in {track.id for track in first}
+    assert tracker.created == 3
+
+def test_should_analyse_once_then_on_triggers():
+    tracker = FaceTracker(reanalyse_interval=10.0, target_confidence=80.0, retry_interval=1.0, growth_factor=1.5)
+    track = tracker.update(0, [(0, 0, 50, 50)], 0.0)[0]
+    assert tracker.should_analyse(track, 0.0)
+    tracker.add_result(track, result(confidence=95.0), 0.0)
+
+    assert not tracker.should_analyse(track, 5.0)
+    # Interval elapsed
+    assert tracker.should_analyse(track, 10.0)
+    tracker.add_result(track, result(confidence=95.0), 10.0)
+
+    # Face grew (moved closer)
+    tracker.update(0, [(0, 0, 62, 62)], 11.0)
+    assert tracker.should_analyse(track, 11.0)
+    assert (tracker.analyses, tracker.skipped) == (3, 1)
+
+def test_low_confidence_is_retried():
+    tracker = FaceTracker(target_confidence=80.0, retry_interval=1.0)
+    track = tracker.update(0, [(0, 0, 50, 50)], 0.0)[0]
+    tracker.add_result(track, result(confidence=40.0), 0.0)
+    assert not tracker.should_analyse(track, 0.5)
+    assert tracker.should_analyse(track, 1.0)
+
+def test_pending_analysis_gates_track():
+    tracker = FaceTracker(max_missed=1)
+    track = tracker.update(0, [(0, 0, 50, 50)], 0.0)[0]
+    assert tracker.should_analyse(track, 0.0)
+    # Sent to a worker: no second analysis, and the track outlives its misses until the result is back
+    track.pending += 1
+    assert not tracker.should_analyse(track, 0.5)
+    tracker.update(0, [], 1.0)
+    assert tracker.expire(1.0) == []
+    assert track.id in tracker.tracks
+
+    track.pending -= 1
+    tracker.add_result(track, result(), 1.0)
+    records = tracker.expire(1.0)
+    assert [record["track_id"] for record in records] == [track.id]
+    assert tracker.tracks == {}
+
+def test_expire_counts_missed_observations():
+    tracker = FaceTracker(max_missed=2, max_age=30.0)
+    track = tracker.update(0, [(0, 0, 50, 50)], 0.0)[0]
+    other = tracker.update(1, [(0, 0, 50, 50)], 0.0)[0]
+
+    # Camera 0 is only observed every 10 s (scheduler interval): time alone never finishes the track
+    tracker.update(0, [], 10.0)
+    assert tracker.expire(10.0) == []
+    tracker.update(0, [(2, 2, 50, 50)], 20.0)
+    tracker.update(0, [], 30.0)
+    assert track.id in tracker.tracks and track.missed == 1
+
+    # Observing camera 0 does not count against camera 1's track
+    tracker.update(0, [], 40.0)
+    tracker.expire(40.0)
+    assert track.id not in tracker.tracks
+    assert other.missed == 0
+
+def test_keep_alive_holds_unobserved_cameras():
+    tracker = FaceTracker(max_age=2.0)
+    track = tracker.update(0, [(0, 0, 50, 50)], 0.0)[0]
+    other = tracker.update(1, [(0, 0, 50, 50)], 0.0)[0]
+    # Camera 0 keeps delivering frames but is deferred, camera 1 stopped sending
+    tracker.keep_alive(0, 5.0)
+    tracker.expire(6.0)
+    assert track.id in tracker.tracks
+    assert other.id not in tracker.tracks
+    # Held, not seen: last_seen stays at the last detection, and keep_alive never moves backwards
+    assert track.last_seen == 0.0
+    tracker.keep_alive(0, 1.0)
+    assert track.alive_at == 5.0
+
+def test_record_aggregates_results():
+    tracker = FaceTracker()
+    track = tracker.update(0, [(1, 2, 30, 40)], 0.0)[0]
+    tracker.add_result(track, dict(result("Man", "white", 20, 60.0), embedding=[0.0]), 0.0)
+    tracker.add_result(track, dict(result("Woman", "white", 30, 90.0), embedding=[1.0]), 1.0)
+    tracker.add_result(track, dict(result("Man", "asian", 40, 50.0), embedding=[2.0]), 2.0)
+
+    record = tracker.flush()[0]
+    assert record["region"] == {"x": 1, "y": 2, "w": 30, "h": 40}
+    assert record["age"] == 30
+    # Confidence-weighted votes, Man (60 + 50) outweighs Woman (90)
+    assert record["dominant_gender"] == "Man"
+    assert record["dominant_race"] == "white"
+    assert record["embedding"] == [1.0]
+    assert record["confidence"] == 90.0
+    assert record["samples"] == 3
+    assert tracker.tracks == {}
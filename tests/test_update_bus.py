@@ -0,0 +1,43 @@
+import threading
+
+from utils.update_bus import UpdateBus
+
+# -----------------------------------
+
+def test_drain_returns_messages_oldest_first():
+    bus = UpdateBus()
+    bus.publish("a")
+    bus.publish("b")
+    assert bus.drain() == ["a", "b"]
+    assert bus.drain() == []
+    assert bus.coalesced() == 0
+
+def test_overflow_keeps_latest_messages():
+    bus = UpdateBus(capacity=3)
+    for i in range(10):
+        bus.publish(i)
+    assert bus.coalesced() == 7
+    assert bus.drain() == [7, 8, 9]
+    assert (bus.published, bus.delivered, bus.coalesced()) == (10, 3, 7)
+
+def test_publish_from_many_threads():
+    bus = UpdateBus(capacity=10000)
+
+    # DEF: Model thread publishing its own numbered messages
+    def publisher(name):
+        for i in range(500):
+            bus.publish((name, i))
+    threads = [threading.Thread(target=publisher, args=(name,)) for name in range(4)]
+    for thread in threads:
+        thread.start()
+    drained = []
+    while any(thread.is_alive() for thread in threads):
+        drained += bus.drain()
+    for thread in threads:
+        thread.join()
+    drained += bus.drain()
+
+    assert len(drained) == 2000 and bus.coalesced() == 0
+    # Each thread's messages arrive in the order it published them
+    for name in range(4):
+        assert [i for sender, i in drained if sender == name] == list(range(500))
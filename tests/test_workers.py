@@ -0,0 +1,162 @@
+import queue
+import time
+
+import pytest
+
+from utils.workers import InferencePool, split_cpus, worker_main
+
+# CLASS: Stand-in for a worker process, alive until killed
+class FakeProcess:
+    def __init__(self):
+        self.alive = True
+        self.exitcode = None
+
+    def is_alive(self):
+        return self.alive
+
+    def kill(self):
+        self.alive = False
+        self.exitcode = -9
+
+# DEF: Pool whose workers are FakeProcess objects and whose queues are in-process
+# Tests play the workers' part by putting their messages on the result queue
+def make_pool(workers=2, queue_size=4, **options):
+    pool = InferencePool("single", workers=workers, **options)
+    pool.task_queue = queue.Queue(maxsize=queue_size)
+    pool.result_queue = queue.Queue()
+    pool._start_worker = lambda worker_id: FakeProcess()
+    pool.processes = [pool._start_worker(worker_id) for worker_id in range(workers)]
+    return pool
+
+# DEF: Put a finished task's result on the result queue, as worker_main does
+def finish(pool, task_id, worker_id=0, results=None, cost=0.1):
+    pool.result_queue.put(("started", worker_id, task_id))
+    pool.result_queue.put((task_id, worker_id, results if results is not None else [task_id], cost))
+
+# -----------------------------------
+
+def test_results_come_back_in_submission_order():
+    pool = make_pool()
+    ids = [pool.submit([("frame", i)]) for i in range(3)]
+    assert ids == [0, 1, 2]
+
+    finish(pool, 2)
+    finish(pool, 0)
+    assert [task_id for task_id, _, _ in pool.collect()] == [0]
+    # Task 2 waits in the reorder buffer for task 1
+    assert pool.in_flight() == 2
+
+    finish(pool, 1)
+    assert pool.collect() == [(1, [1], 0.1), (2, [2], 0.1)]
+    assert pool.completed == 3
+
+def test_full_queue_skips_tick():
+    pool = make_pool(queue_size=1)
+    assert pool.submit(["a"]) == 0
+    assert pool.submit(["b"]) is None
+    assert pool.skipped == 1
+    assert "Skipped ticks (queue full): 1" in pool.summary()
+
+def test_dead_worker_is_restarted_and_its_task_given_up():
+    pool = make_pool(max_restarts=3)
+    pool.submit(["a"])
+    pool.submit(["b"])
+    pool.result_queue.put(("started", 0, 0))
+    pool.collect()
+
+    # Worker 0 dies while running task 0
+    dead = pool.processes[0]
+    dead.kill()
+    finish(pool, 1, worker_id=1)
+    results = pool.collect()
+
+    # Task 0 is skipped, task 1 is not held back by it
+    assert [task_id for task_id, _, _ in results] == [1]
+    assert pool.processes[0] is not dead and pool.processes[0].is_alive()
+    assert pool.restarts == 1
+    assert pool.lost_count == 1
+    assert pool.in_flight() == 0
+
+def test_workers_not_restarted_past_limit():
+    pool = make_pool(workers=1, max_restarts=1)
+    pool.processes[0].kill()
+    pool.collect()
+    assert pool.restarts == 1
+
+    pool.processes[0].kill()
+    pool.collect()
+    assert pool.processes == [None]
+    # No worker left: ticks are skipped rather than queued for nobody
+    assert pool.submit(["a"]) is None
+    assert "Worker restarts: 1" in pool.summary()
+
+def test_timed_out_task_is_given_up_and_late_result_dropped():
+    pool = make_pool(task_timeout=0.05)
+    pool.submit(["a"])
+    pool.submit(["b"])
+    finish(pool, 1)
+    time.sleep(0.1)
+
+    # Task 0 timed out: task 1's result is released straight away
+    assert [task_id for task_id, _, _ in pool.collect()] == [1]
+    assert pool.lost_count == 1
+
+    # Task 0's result arrives too late to keep its place
+    finish(pool, 0)
+    assert pool.collect() == []
+    assert pool.in_flight() == 0
+
+def test_drain_waits_for_in_flight_tasks():
+    pool = make_pool()
+    pool.submit(["a"])
+    finish(pool, 0)
+    assert [task_id for task_id, _, _ in pool.drain(timeout=1)] == [0]
+    assert pool.in_flight() == 0
+
+def test_start_fails_when_a_worker_exits_while_warming_up():
+    pool = make_pool(workers=2)
+    pool.processes = []
+
+    # DEF: Worker that exits before reporting ready
+    def exited_worker(worker_id):
+        process = FakeProcess()
+        process.kill()
+        return process
+    pool._start_worker = exited_worker
+    with pytest.raises(RuntimeError, match="exited while warming up"):
+        pool.start(timeout=5)
+
+def test_split_cpus():
+    cpus = split_cpus(2)
+    assert len(cpus) == 2
+    assert all(cpus)
+
+def test_worker_reports_failed_task(monkeypatch):
+    # CLASS: Model whose analysis fails on one frame
+    class FlakyModel:
+        def warm_up(self):
+            pass
+
+        def process(self, frames):
+            if any(frame == "bad" for _, frame in frames):
+                raise RuntimeError("analysis failed")
+            return [{"cam_id": cam_id} for cam_id, _ in frames]
+
+    # Runs in the test process: keep its Ctrl+C handler and thread settings
+    monkeypatch.setattr("utils.workers.signal.signal", lambda *args: None)
+    monkeypatch.setattr("utils.workers.configure_worker", lambda *args: None)
+    monkeypatch.setattr("utils.workers.build_model", lambda model_type: FlakyModel())
+    task_queue, result_queue = queue.Queue(), queue.Queue()
+    task_queue.put((0, "process", [(0, "bad")], {}))
+    task_queue.put((1, "process", [(1, "ok")], {}))
+    task_queue.put(None)
+
+    worker_main(0, "single", {}, task_queue, result_queue, 1, 1, None)
+    messages = []
+    while not result_queue.empty():
+        messages.append(result_queue.get())
+
+    assert messages[0] == ("ready", 0, None)
+    finished = [message for message in messages if message[0] in (0, 1)]
+    # The failed task still reports back (no results), so the pool never waits on it
+    assert [(task_id, results) for task_id, _, results, _ in finished] == [(0, []), (1, [{"cam_id": 1}])]
@@ -0,0 +1,157 @@
+import threading
+
+import cv2
+import numpy as np
+
+from utils.model_utils import get_cam_setting
+
+ACTIONS = ('age', 'gender', 'race')
+# Actions that are not DeepFace attributes (do not need the 224x224 attribute batch)
+EXTRA_ACTIONS = ('embedding',)
+
+# DeepFace facial attribute model names and output labels (same order as the model outputs)
+ACTION_MODELS = {'age': 'Age', 'gender': 'Gender', 'race': 'Race'}
+GENDER_LABELS = ["Woman", "Man"]
+RACE_LABELS = ["asian", "indian", "black", "white", "middle eastern", "latino hispanic"]
+
+TARGET_SIZE = (224, 224)
+
+_models = {}
+_models_lock = threading.Lock()
+
+# DEF: Get the Keras model behind a DeepFace attribute action
+# Each model is built once per process, the first time an action needs it, and reused
+def get_attribute_model(action):
+    model = _models.get(action)
+    if model is None:
+        with _models_lock:
+            model = _models.get(action)
+            if model is None:
+                # Imported here, so the detection side (and tools that only use it) load without TensorFlow
+                from deepface import DeepFace
+                client = DeepFace.build_model(model_name=ACTION_MODELS[action], task="facial_attribute")
+                model = client.model
+                _models[action] = model
+    return model
+
+# DEF: Prepare a BGR face crop for the attribute models
+# Resizes keeping aspect ratio, pads to target_size (224x224) and scales to [0, 1] (matches DeepFace preprocessing)
+def prepare_face(face_img, target_size=TARGET_SIZE):
+    h, w = face_img.shape[:2]
+    factor = min(target_size[0] / h, target_size[1] / w)
+    new_w, new_h = max(1, int(w * factor)), max(1, int(h * factor))
+    resized = cv2.resize(face_img, (new_w, new_h))
+
+    padded = np.zeros((target_size[0], target_size[1], 3), dtype=np.float32)
+    top = (target_size[0] - new_h) // 2
+    left = (target_size[1] - new_w) // 2
+    padded[top:top + new_h, left:left + new_w] = resized
+    return padded / 255.0
+
+# DEF: Run a model over a batch in chunks of batch_size
+# Calls the model directly, avoiding Keras predict() setup cost on every call
+def predict_batch(model, batch, batch_size=32):
+    outputs = [model(batch[i:i + batch_size], training=False).numpy() for i in range(0, len(batch), batch_size)]
+    return np.concatenate(outputs, axis=0)
+
+# DEF: Check a list of analysis actions
+# Returns tuple of the actions in a fixed order, raises ValueError on unknown actions
+def check_actions(actions):
+    unknown = set(actions) - set(ACTIONS + EXTRA_ACTIONS)
+    if unknown:
+        raise ValueError(f"Unknown analysis actions: {', '.join(sorted(unknown))}")
+    return tuple(action for action in ACTIONS + EXTRA_ACTIONS if action in actions)
+
+# DEF: Resolve the analysis actions of every camera
+# actions: default actions, per-camera overrides under cam_settings[cam_id]["actions"]
+# embed: add 'embedding' to every camera's actions
+# Returns dict of camera ID to tuple of actions
+def build_cam_actions(cam_ids, actions=ACTIONS, cam_settings=None, embed=False):
+    cam_actions = {}
+    for cam_id in cam_ids:
+        cam_action_list = list(get_cam_setting(cam_settings, cam_id, "actions", actions))
+        if embed:
+            cam_action_list.append('embedding')
+        cam_actions[cam_id] = check_actions(cam_action_list)
+    return cam_actions
+
+# DEF: Analyse a list of BGR face crops for facial attributes
+# Runs one batched forward pass per action instead of one DeepFace.analyze call per crop
+# Only the models of the requested actions are loaded and run, results only have the requested keys
+# actions may also include 'embedding' to add a face embedding to each result
+# Returns list of results (same order as face_imgs) with DeepFace.analyze-style keys
+def analyse_faces(face_imgs, actions=ACTIONS, batch_size=32):
+    if not face_imgs:
+        return []
+
+    results = [{} for _ in face_imgs]
+    if any(action in ACTIONS for action in actions):
+        batch = np.stack([prepare_face(face_img) for face_img in face_imgs])
+
+    if 'age' in actions:
+        predictions = predict_batch(get_attribute_model('age'), batch, batch_size)
+        ages = predictions @ np.arange(predictions.shape[1])
+        for result, age in zip(results, ages):
+            result["age"] = int(age)
+
+    if 'gender' in actions:
+        predictions = predict_batch(get_attribute_model('gender'), batch, batch_size)
+        for result, pred in zip(results, predictions):
+            result["gender"] = {label: float(100 * p) for label, p in zip(GENDER_LABELS, pred)}
+            result["dominant_gender"] = GENDER_LABELS[int(np.argmax(pred))]
+
+    if 'race' in actions:
+        predictions = predict_batch(get_attribute_model('race'), batch, batch_size)
+        for result, pred in zip(results, predictions):
+            total = float(np.sum(pred)) or 1.0
+            result["race"] = {label: float(100 * p / total) for label, p in zip(RACE_LABELS, pred)}
+            result["dominant_race"] = RACE_LABELS[int(np.argmax(pred))]
+
+    # Face embedding for re-identification (see utils/embeddings.py), not a DeepFace attribute
+    if 'embedding' in actions:
+        from utils.embeddings import embed_faces
+        for result, embedding in zip(results, embed_faces(face_imgs, batch_size=batch_size)):
+            result["embedding"] = embedding
+
+    return results
+
+# DEF: Build the attribute models and run one dummy batch through them
+# Moves model build and first-call graph tracing out of the first analysed frame
+def warm_up_attributes(actions=ACTIONS):
+    dummy = np.zeros((TARGET_SIZE[0], TARGET_SIZE[1], 3), dtype=np.uint8)
+    analyse_faces([dummy], actions)
+
+# -----------------------------------
+
+# CLASS: Collects face crops from every camera in a sampling tick for batched analysis
+# Each result keeps the camera ID and face region of its crop
+class FaceBatch:
+    def __init__(self):
+        self.faces = []
+
+    def __len__(self):
+        return len(self.faces)
+
+    # DEF: Add a face crop with its camera ID and face coords (x, y, w, h)
+    def add(self, cam_id, face_img, coords):
+        self.faces.append((cam_id, face_img, coords))
+
+    # DEF: Analyse all collected faces in one batch
+    # cam_actions: optional dict of camera ID to actions, faces are batched per distinct set of actions
+    # Returns list of results tagged with "cam_id" and "region"
+    def analyse(self, actions=ACTIONS, batch_size=32, cam_actions=None):
+        groups = {}
+        for i, (cam_id, _, _) in enumerate(self.faces):
+            group_actions = tuple(cam_actions.get(cam_id, actions)) if cam_actions else tuple(actions)
+            groups.setdefault(group_actions, []).append(i)
+
+        analysis = [None] * len(self.faces)
+        for group_actions, indexes in groups.items():
+            group = analyse_faces([self.faces[i][1] for i in indexes], group_actions, batch_size)
+            for i, result in zip(indexes, group):
+                analysis[i] = result
+
+        for result, (cam_id, _, (x, y, w, h)) in zip(analysis, self.faces):
+            result["cam_id"] = cam_id
+            result["region"] = {"x": int(x), "y": int(y), "w": int(w), "h": int(h)}
+        return analysis
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import cv2
+
+from utils.metrics import METRICS, stage_histogram
+
+# -----------------------------------
+
+# CLASS: Reads a camera on its own thread into a one-slot "latest frame wins" buffer
+# Each frame is stored with a sequence number and capture timestamp
+# Frames overwritten before being read are counted as dropped
+class CameraStream:
+    def __init__(self, cam_id, cam, frame_ready=None, max_failures=50):
+        self.cam_id = cam_id
+        self.cam = cam
+        self.frame_ready = frame_ready
+        self.max_failures = max_failures
+
+        self.lock = threading.Lock()
+        self.frame = None
+        self.seq = 0
+        self.timestamp = None
+        self.read_seq = 0
+        self.dropped = 0
+        self.ended = False
+
+        self.read_time = stage_histogram("capture", cam=cam_id)
+        self.captured_count = METRICS.counter("frames_captured_total", cam=cam_id)
+        self.dropped_count = METRICS.counter("frames_dropped_total", cam=cam_id)
+
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"capture-{cam_id}", daemon=True)
+
+    # DEF: Start the capture thread
+    def start(self):
+        # Keep the driver buffer short so reads return the newest frame
+        self.cam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.thread.start()
+
+    # DEF: Capture loop, overwrites the buffer with every frame read
+    # Stops after max_failures consecutive failed reads (camera unplugged, end of video file)
+    def _run(self):
+        failures = 0
+        while not self.stopped.is_set():
+            read_start = time.perf_counter()
+            ret, frame = self.cam.read()
+            if not ret:
+                failures += 1
+                if failures == 1:
+                    print(f"Capture Error: Could not read frame from camera {self.cam_id}.")
+                if failures >= self.max_failures:
+                    break
+                time.sleep(0.01)
+                continue
+            failures = 0
+            self.read_time.record(time.perf_counter() - read_start)
+            self.captured_count.inc()
+
+            with self.lock:
+                if self.seq > self.read_seq:
+                    self.dropped += 1
+                    self.dropped_count.inc()
+                self.frame = frame
+                self.seq += 1
+                self.timestamp = time.time()
+            if self.frame_ready:
+                self.frame_ready.set()
+
+        self.ended = True
+        if self.frame_ready:
+            self.frame_ready.set()
+
+    # DEF: Get the latest frame if it is newer than the last one read
+    # Returns (seq, timestamp, frame) or None if there is no new frame
+    def read(self):
+        with self.lock:
+            if self.frame is None or self.seq == self.read_seq:
+                return None
+            self.read_seq = self.seq
+            return self.seq, self.timestamp, self.frame
+
+    # DEF: Stop the capture thread and release the camera
+    def stop(self, timeout=1.0):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+        self.cam.release()
+
+# CLASS: One capture thread per camera, with a shared signal for new frames
+class CaptureGroup:
+    def __init__(self, cams):
+        self.frame_ready = threading.Event()
+        self.streams = [CameraStream(cam_id, cam, self.frame_ready) for cam_id, cam in cams.items()]
+
+    # DEF: Start all capture threads
+    def start(self):
+        for stream in self.streams:
+            stream.start()
+
+    # DEF: Get the freshest frame from every camera that has a new one
+    # Waits up to timeout seconds for any camera to deliver a frame
+    # Returns list of (cam ID, seq, timestamp, frame)
+    def read_latest(self, timeout=0.1):
+        self.frame_ready.wait(timeout)
+        self.frame_ready.clear()
+
+        latest = []
+        for stream in self.streams:
+            frame = stream.read()
+            if frame is not None:
+                latest.append((stream.cam_id, *frame))
+        return latest
+
+    # DEF: Check whether every camera has stopped delivering frames
+    def ended(self):
+        return all(stream.ended for stream in self.streams)
+
+    # DEF: Total frames overwritten before the analysis loop read them
+    def dropped(self):
+        return sum(stream.dropped for stream in self.streams)
+
+    # DEF: Frames in the form sent to inference workers (pickled as they are)
+    def shareable(self, frames):
+        return frames
+
+    # DEF: Nothing to release, the workers get their own copies (see SharedCaptureGroup.release)
+    def release(self, shared):
+        pass
+
+    # DEF: Frames read here are never overwritten (each read returns a new array), results pass through
+    def drop_overwritten(self, results):
+        return results
+
+    # DEF: Stop all capture threads and release all cameras
+    def stop(self):
+        for stream in self.streams:
+            stream.stop()
+
+    # DEF: Nothing to release after stop() (see SharedCaptureGroup.close)
+    def close(self):
+        pass
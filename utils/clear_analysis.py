@@ -1,10 +1,22 @@
 import os
 from pathlib import Path
 
-# DEF: Clear specified file, or all JSON files in a specified folder
+from utils.jsonl_log import log_files
+
+# Analysis logs: JSON Lines (active + rotated/compressed segments) and legacy JSON arrays
+ANALYSIS_PATTERNS = ('*.json', '*.jsonl', '*.jsonl.gz')
+
+# DEF: Clear specified file, or all analysis files in a specified folder
+# Clearing a JSON Lines log also clears its rotated segments
 def clear_analysis(analysis_file=None, analysis_folder='./analysis'):
     if analysis_file:
         analysis_path = os.path.join(analysis_folder, analysis_file)
+        files = log_files(analysis_path) if analysis_path.endswith('.jsonl') else []
+        if files:
+            for file_path in files:
+                os.remove(file_path)
+                print(f"Cleared analysis file: {file_path}")
+            return True
         if os.path.exists(analysis_path):
             os.remove(analysis_path)
             print(f"Cleared analysis file: {analysis_path}")
@@ -16,7 +28,8 @@ def clear_analysis(analysis_file=None, analysis_folder='./analysis'):
         if not os.listdir(analysis_folder):
             print(f"Analysis folder is empty: {analysis_folder}")
             return True
-        for json_file in Path(analysis_folder).glob('*.json'):
+        analysis_files = [f for pattern in ANALYSIS_PATTERNS for f in Path(analysis_folder).glob(pattern)]
+        for json_file in analysis_files:
             try:
                 os.remove(json_file)
                 print(f"Cleared analysis file: {json_file}")
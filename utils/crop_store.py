@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from utils.image_hash import dhash, hamming
+
+CROPS_DIR = 'crops'
+
+# -----------------------------------
+
+# CLASS: Asynchronous, content-addressed store of face crops
+# save() returns the crop's path straight away, encoding (JPEG/WebP) and writing happen on a background thread pool
+# - Paths are <root>/<ab>/<cd>/<hash>.<format>, from a hash of the crop's pixels (identical crops share a file)
+# - A crop within dedupe_distance bits (dHash) of a crop stored in the last dedupe_seconds for the same track (or the same
+#   camera when there is no tracker) reuses that crop's file, a different person's record never points at someone else's crop
+# - Total size is kept under max_bytes by deleting the least recently used crops (rows keep their path, the file is gone)
+# - When more than max_pending crops wait to be written, new crops are dropped (no path) instead of queueing without bound
+class CropStore:
+    def __init__(self, root=CROPS_DIR, max_bytes=1024 * 1024 * 1024, image_format='jpg', quality=90, workers=2,
+                 max_pending=256, dedupe_distance=3, dedupe_window=64, dedupe_seconds=10.0):
+        if image_format not in ('jpg', 'webp'):
+            raise ValueError(f"Unsupported crop format: {image_format}")
+        self.root = root
+        self.max_bytes = max_bytes
+        self.image_format = image_format
+        flag = cv2.IMWRITE_JPEG_QUALITY if image_format == 'jpg' else cv2.IMWRITE_WEBP_QUALITY
+        self.encode_params = [flag, quality]
+        self.max_pending = max_pending
+        self.dedupe_distance = dedupe_distance
+        self.dedupe_window = dedupe_window
+        self.dedupe_seconds = dedupe_seconds
+
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crop-store")
+        self.pending = 0
+        self.recent = {}
+        self.last_sweep = time.monotonic()
+
+        self.saved = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.errors = 0
+
+        self.files, self.total_bytes = self._scan()
+
+    # DEF: Index the crops already on disk, least recently written first
+    # Returns OrderedDict of path to size and the total size
+    def _scan(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename.endswith(".tmp"):
+                    # Left over from an interrupted write
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        return OrderedDict((path, size) for _, path, size in entries), sum(size for _, _, size in entries)
+
+    # DEF: Path of a crop from a hash of its pixels
+    def _path(self, crop):
+        digest = hashlib.blake2b(crop.tobytes(), digest_size=16)
+        digest.update(str(crop.shape).encode())
+        name = digest.hexdigest()
+        return os.path.join(self.root, name[:2], name[2:4], f"{name}.{self.image_format}")
+
+    # DEF: Forget recent crops older than dedupe_seconds, and the tracks left with none (called with the lock held)
+    def _expire_recent(self, now):
+        for key in list(self.recent):
+            recent = self.recent[key]
+            while recent and now - recent[0][2] > self.dedupe_seconds:
+                recent.popleft()
+            if not recent:
+                del self.recent[key]
+        self.last_sweep = now
+
+    # DEF: Store a face crop
+    # track_id: the face's track (FaceTracker), near-duplicates are only looked for among the same track's crops
+    # Returns the crop's path (a near-duplicate's path if one was stored recently), or None if dropped
+    def save(self, crop, cam_id=None, track_id=None):
+        if crop is None or crop.size == 0:
+            return None
+
+        crop_hash = dhash(crop)
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_sweep > self.dedupe_seconds:
+                self._expire_recent(now)
+            recent = self.recent.setdefault((cam_id, track_id), deque(maxlen=self.dedupe_window))
+            while recent and now - recent[0][2] > self.dedupe_seconds:
+                recent.popleft()
+
+            for other_hash, other_path, _ in reversed(recent):
+                if hamming(crop_hash, other_hash) <= self.dedupe_distance and other_path in self.files:
+                    self.files.move_to_end(other_path)
+                    self.duplicates += 1
+                    return other_path
+
+            path = self._path(crop)
+            if path in self.files:
+                self.files.move_to_end(path)
+                self.duplicates += 1
+                recent.append((crop_hash, path, now))
+                return path
+
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return None
+            self.pending += 1
+            # Reserve the path now, its size is filled in once written
+            self.files[path] = 0
+            recent.append((crop_hash, path, now))
+
+        self.pool.submit(self._write, crop.copy(), path)
+        return path
+
+    # DEF: Encode and write one crop (pool thread), then evict down to the budget
+    def _write(self, crop, path):
+        try:
+            ok, encoded = cv2.imencode(f".{self.image_format}", crop, self.encode_params)
+            if not ok:
+                raise RuntimeError("encoding failed")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(encoded.tobytes())
+            os.replace(temp_path, path)
+            size = len(encoded)
+        except Exception as e:
+            print(f"Crop Store Error ({path}):", e)
+            with self.lock:
+                self.files.pop(path, None)
+                self.pending -= 1
+                self.errors += 1
+            return
+
+        with self.lock:
+            self.pending -= 1
+            self.saved += 1
+            evict = []
+            if path in self.files:
+                self.files[path] = size
+                self.total_bytes += size
+            else:
+                # Evicted while waiting to be written
+                evict.append(path)
+            while self.total_bytes > self.max_bytes and len(self.files) > 1:
+                old_path, old_size = self.files.popitem(last=False)
+                self.total_bytes -= old_size
+                evict.append(old_path)
+            self.evicted += len(evict)
+
+        for old_path in evict:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    # DEF: Wait for every pending crop to be written and stop the pool
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    # DEF: Summary of the store's activity
+    def summary(self):
+        output = "\n== Crop Store Summary\n"
+        output += f"Crops written: {self.saved}\n"
+        output += f"Duplicates skipped: {self.duplicates}\n"
+        if self.dropped:
+            output += f"Dropped (writer busy): {self.dropped}\n"
+        if self.errors:
+            output += f"Failed writes: {self.errors}\n"
+        output += f"Evicted: {self.evicted}\n"
+        output += f"Disk usage: {self.total_bytes / (1024 * 1024):.1f} / {self.max_bytes / (1024 * 1024):.0f} MB\n"
+        return output.strip()
@@ -1,10 +1,18 @@
+import heapq
 import sqlite3
 import os
 from datetime import datetime
 
+from utils.rollups import init_rollups, update_rollups, clear_rollups
+from utils.partitions import ID_SPAN, VIEW_CHUNK, init_partitions, partition_base_id, insert_partitioned, drop_partitions, list_partitions, partition_source, full_vacuum
+
 DB_PATH = 'db/faces.db'
 
+# Columns entries can be sorted by
+SORT_COLUMNS = ("id", "age", "gender", "race", "timestamp")
+
 # DEF: Initialize the database and create the table if it doesn't exist
+# face_data is a view over one table per day (see utils/partitions.py), databases with a single face_data table are migrated
 def init_db(db_path='db/faces.db'):
     if not os.path.exists(db_path):
         try:
@@ -20,22 +28,23 @@ def init_db(db_path='db/faces.db'):
         print("Database Connection Error:", e)
         return
 
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS face_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            age INTEGER,
-            gender TEXT,
-            race TEXT,
-            image_path TEXT
-        )
-    ''')
+    # Only takes effect on a new (empty) database, older ones switch with a full VACUUM after migrating
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    # Day partitions behind the face_data view
+    migrated = init_partitions(cursor)
+
+    # Pre-aggregated counts for dashboards (see utils/rollups.py)
+    init_rollups(cursor)
 
     conn.commit()
     conn.close()
 
+    if migrated:
+        full_vacuum(db_path)
+
 # DEF: Clear the database by deleting all entries
-# Only clears entires, DB file remains and IDs are not reset
+# Only clears entires (drops every partition), DB file remains
 def clear_db(db_path='db/faces.db'):
     try:
         conn = sqlite3.connect(db_path)
@@ -44,7 +53,8 @@ def clear_db(db_path='db/faces.db'):
         print("Database Connection Error:", e)
         return
 
-    cursor.execute('DELETE FROM face_data')
+    drop_partitions(cursor, [name for name, _, _ in list_partitions(cursor)])
+    clear_rollups(cursor)
     conn.commit()
     conn.close()
 
@@ -65,8 +75,27 @@ def reset_db(db_path=DB_PATH):
 if __name__ == "__main__":
     reset_db()
 
+# DEF: Build a face_data row from an analysis result
+# Timestamped at the time of the call
+def analysis_row(attributes, image_path=None):
+    return (
+        str(datetime.now().isoformat()),
+        attributes.get("age"),
+        attributes.get("dominant_gender"),
+        attributes.get("dominant_race"),
+        image_path,
+        attributes.get("cam_id"),
+        attributes.get("embedding_id")
+    )
+
+# DEF: Insert face_data rows into their day partitions and add them to the rollups, in the caller's transaction
+def insert_rows(cursor, rows):
+    insert_partitioned(cursor, rows)
+    update_rollups(cursor, [(timestamp, cam_id, gender, race, age) for timestamp, age, gender, race, _, cam_id, _ in rows])
+
 # DEF: Save analysis results to the database
-# An entry includes its own ID, the camera's ID, age, gender, race, timestamp, and an image path (if available)
+# An entry includes its own ID, the camera's ID, age, gender, race, timestamp, an image path and an embedding ID (if available)
+# Opens a connection and commits per result, use DBWriter (utils/db_writer.py) for continuous writes
 def save_analysis_db(attributes, image_path=None, db_path=DB_PATH):
     try:
         conn = sqlite3.connect(db_path)
@@ -75,19 +104,8 @@ def save_analysis_db(attributes, image_path=None, db_path=DB_PATH):
         print("Database Connection Error:", e)
         return
 
-    timestamp = str(datetime.now().isoformat())
-
     try:
-        cursor.execute('''
-            INSERT INTO face_data (timestamp, age, gender, race, image_path)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            timestamp,
-            attributes.get("age"),
-            attributes.get("dominant_gender"),
-            attributes.get("dominant_race"),
-            image_path
-        ))
+        insert_rows(cursor, [analysis_row(attributes, image_path)])
         print("Database Insertion Success.")
     except sqlite3.Error as e:
         print("Database Insert Error:", e)
@@ -109,31 +127,52 @@ def get_all_entries(db_path=DB_PATH):
         print("Database error:", e)
         return []
 
-# DEF: Filter database entries by specified attribute
-def filter_entries(gender=None, race=None, min_age=None, max_age=None, db_path=DB_PATH):
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+# DEF: Build the WHERE clause for the attribute filters
+# start / end: optional time range (ISO strings, end exclusive)
+# order_by: sort column of the query, range filters on other columns are kept off the indexes ("+age"),
+# so SQLite walks the sort column's index instead of sorting the rows in a temporary B-tree
+# Returns list of SQL conditions and list of params
+def build_filters(gender=None, race=None, min_age=None, max_age=None, start=None, end=None, order_by=None):
+    filters = []
+    params = []
+    age = "+age" if order_by not in (None, "age") else "age"
+    timestamp = "+timestamp" if order_by not in (None, "timestamp") else "timestamp"
 
-        query = "SELECT id, age, gender, race, timestamp FROM face_data"
-        filters = []
-        params = []
+    if gender and gender.lower() != "all":
+        filters.append("gender = ?")
+        params.append(gender)
 
-        if gender and gender.lower() != "all":
-            filters.append("gender = ?")
-            params.append(gender)
+    if race and race.lower() != "all":
+        filters.append("race = ?")
+        params.append(race)
 
-        if race and race.lower() != "all":
-            filters.append("race = ?")
-            params.append(race)
+    if min_age is not None:
+        filters.append(f"{age} >= ?")
+        params.append(min_age)
 
-        if min_age is not None:
-            filters.append("age >= ?")
-            params.append(min_age)
+    if max_age is not None:
+        filters.append(f"{age} <= ?")
+        params.append(max_age)
 
-        if max_age is not None:
-            filters.append("age <= ?")
-            params.append(max_age)
+    if start is not None:
+        filters.append(f"{timestamp} >= ?")
+        params.append(start)
+
+    if end is not None:
+        filters.append(f"{timestamp} < ?")
+        params.append(end)
+
+    return filters, params
+
+# DEF: Filter database entries by specified attribute
+# start / end: optional time range, only the partitions it overlaps are read
+def filter_entries(gender=None, race=None, min_age=None, max_age=None, start=None, end=None, db_path=DB_PATH):
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        query = f"SELECT id, age, gender, race, timestamp FROM {partition_source(cursor, start, end)}"
+        filters, params = build_filters(gender, race, min_age, max_age, start, end, "timestamp")
 
         if filters:
             query += " WHERE " + " AND ".join(filters)
@@ -150,3 +189,160 @@ def filter_entries(gender=None, race=None, min_age=None, max_age=None, db_path=D
         print("Database error:", e)
         return []
 
+# DEF: Build the keyset conditions that continue a sort order after a given row
+# after: (sort value, id) of the last row of the previous page, None for the first page
+# NULLs sort first ascending and last descending, as in SQLite. A condition mixing NULLs and values cannot be an index range,
+# so the rest of the order is split into segments (read in turn): the values' range, and the NULLs
+# nullable: False when the filters already exclude NULLs of the sort column (a range filter on it), no NULL segments then
+# Returns list of (condition or None, params), in sort order
+def keyset_segments(order_by, descending, after, nullable=True):
+    if after is None:
+        return [(None, [])]
+    value, row_id = after
+    if order_by == "id":
+        return [("id < ?" if descending else "id > ?", [row_id])]
+
+    if descending:
+        if value is None:
+            return [(f"{order_by} IS NULL AND id < ?", [row_id])]
+        segments = [(f"{order_by} <= ? AND ({order_by} < ? OR id < ?)", [value, value, row_id])]
+        return segments + [(f"{order_by} IS NULL", [])] if nullable else segments
+
+    if value is None:
+        return [(f"{order_by} IS NULL AND id > ?", [row_id]), (f"{order_by} IS NOT NULL", [])] if nullable else [(None, [])]
+    return [(f"{order_by} >= ? AND ({order_by} > ? OR id > ?)", [value, value, row_id])]
+
+# DEF: Sort key of a row (id, age, gender, race, timestamp) in SQLite's order for a sort column
+# NULLs first (ascending), as SQLite sorts them
+def sort_key(row, order_by):
+    value = row[SORT_COLUMNS.index(order_by)]
+    return (value is not None, value, row[0])
+
+# DEF: Sort key of a page cursor (sort value, id), comparable with sort_key()
+def cursor_key(after):
+    value, row_id = after
+    return (value is not None, value, row_id)
+
+# DEF: Get one page of filtered entries using keyset pagination
+# Sorting happens in SQL, and each page continues from the last row of the previous one instead of an OFFSET
+# Sorted by ID or timestamp, the day partitions are read one at a time in sort order until the page is full
+# Sorted by another column, each partition's rows come sorted from its own index and are merged (never sorted as a whole)
+# start / end: optional time range, only the partitions it overlaps are read
+# Returns list of rows (id, age, gender, race, timestamp) and the cursor for the next page (None on the last page)
+def query_page(gender=None, race=None, min_age=None, max_age=None, order_by="timestamp", descending=True, after=None, limit=200, start=None, end=None, db_path=DB_PATH):
+    if order_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by: {order_by}")
+
+    # Sorted by a column the filters hold to one value, the rows are in ID order (and walk the filter's index by ID)
+    key = order_by
+    if (order_by == "gender" and gender and gender.lower() != "all") or (order_by == "race" and race and race.lower() != "all"):
+        key = "id"
+
+    filters, params = build_filters(gender, race, min_age, max_age, start, end, key)
+    direction = "DESC" if descending else "ASC"
+    if key == "id":
+        order = f" ORDER BY id {direction} LIMIT ?"
+    else:
+        order = f" ORDER BY {order_by} {direction}, id {direction} LIMIT ?"
+
+    try:
+        conn = sqlite3.connect(db_path)
+        names = [name for name, _, _ in list_partitions(conn, start, end, newest_first=descending)]
+        rows = []
+        nullable = not ((key == "age" and (min_age is not None or max_age is not None)) or (key == "timestamp" and (start or end)))
+        for condition, condition_params in keyset_segments(key, descending, after, nullable):
+            conditions = filters + ([condition] if condition else [])
+            select = "SELECT id, age, gender, race, timestamp FROM {source}"
+            if conditions:
+                select += " WHERE " + " AND ".join(conditions)
+            segment_params = params + condition_params
+
+            if key in ("id", "timestamp"):
+                # Partitions hold consecutive days (and ID ranges), so their rows never interleave
+                for name in names:
+                    rows += conn.execute(select.format(source=name) + order, segment_params + [limit - len(rows)]).fetchall()
+                    if len(rows) >= limit:
+                        break
+            else:
+                # One compound SELECT per chunk of partitions (SQLite merges the sorted arms), chunks merged here
+                chunks = []
+                for i in range(0, len(names), VIEW_CHUNK):
+                    chunk = names[i:i + VIEW_CHUNK]
+                    compound = " UNION ALL ".join(select.format(source=name) for name in chunk)
+                    chunks.append(conn.execute(compound + order, segment_params * len(chunk) + [limit - len(rows)]).fetchall())
+                merged = heapq.merge(*chunks, key=lambda row: sort_key(row, order_by), reverse=descending)
+                rows += list(merged)[:limit - len(rows)]
+            if len(rows) >= limit:
+                break
+        conn.close()
+    except sqlite3.Error as e:
+        print("Database error:", e)
+        return [], None
+
+    if len(rows) < limit:
+        return rows, None
+    last = rows[-1]
+    return rows, (last[SORT_COLUMNS.index(order_by)], last[0])
+
+# DEF: Count filtered entries
+# Stops counting at max_count if given (cheap "10000+" style counts on large tables)
+# start / end: optional time range, only the partitions it overlaps are read
+def count_entries(gender=None, race=None, min_age=None, max_age=None, max_count=None, start=None, end=None, db_path=DB_PATH):
+    filters, params = build_filters(gender, race, min_age, max_age, start, end)
+    where = " WHERE " + " AND ".join(filters) if filters else ""
+
+    try:
+        conn = sqlite3.connect(db_path)
+        source = partition_source(conn, start, end)
+        if max_count is None:
+            query = f"SELECT COUNT(*) FROM {source}{where}"
+        else:
+            query = f"SELECT COUNT(*) FROM (SELECT 1 FROM {source}{where} LIMIT ?)"
+            params.append(max_count)
+        count = conn.execute(query, params).fetchone()[0]
+        conn.close()
+        return count
+    except sqlite3.Error as e:
+        print("Database error:", e)
+        return 0
+
+# DEF: Get the highest entry ID (0 if the table is empty)
+# Read from the newest non-empty partition (IDs grow across partitions)
+def last_entry_id(db_path=DB_PATH):
+    try:
+        conn = sqlite3.connect(db_path)
+        last_id = None
+        for name, _, _ in list_partitions(conn, newest_first=True):
+            last_id = conn.execute(f"SELECT MAX(id) FROM {name}").fetchone()[0]
+            if last_id is not None:
+                break
+        conn.close()
+        return last_id or 0
+    except sqlite3.Error as e:
+        print("Database error:", e)
+        return 0
+
+# DEF: Get filtered entries added after a given entry ID, oldest first
+# Walks the primary key from after_id, only in the partitions that can hold larger IDs (IDs grow across partitions),
+# so the cost depends on the number of new rows, not the table size
+# Returns list of rows (id, age, gender, race, timestamp), at most limit
+def query_new(gender=None, race=None, min_age=None, max_age=None, after_id=0, limit=1000, db_path=DB_PATH):
+    filters, params = build_filters(gender, race, min_age, max_age, order_by="id")
+    filters.insert(0, "id > ?")
+    params.insert(0, after_id)
+    query = "SELECT id, age, gender, race, timestamp FROM {source} WHERE " + " AND ".join(filters) + " ORDER BY id LIMIT ?"
+
+    try:
+        conn = sqlite3.connect(db_path)
+        rows = []
+        for name, _, _ in list_partitions(conn):
+            if partition_base_id(name) + ID_SPAN <= after_id:
+                continue
+            rows += conn.execute(query.format(source=name), params + [limit - len(rows)]).fetchall()
+            if len(rows) >= limit:
+                break
+        conn.close()
+        return rows
+    except sqlite3.Error as e:
+        print("Database error:", e)
+        return []
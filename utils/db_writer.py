@@ -0,0 +1,185 @@
+import queue
+import sqlite3
+import threading
+import time
+
+from utils.db_utils import DB_PATH, analysis_row, init_db, insert_rows
+from utils.metrics import METRICS, stage_histogram
+
+# Pragmas for the writer connection
+# WAL lets readers (GUI, exports) run alongside the writer, NORMAL sync only fsyncs at checkpoints
+WRITER_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA busy_timeout=5000",
+)
+
+# -----------------------------------
+
+# CLASS: Background database writer
+# Holds one connection on its own thread, takes results through a queue and commits them in batches
+# A batch is committed when it reaches batch_size rows or flush_interval seconds, whichever comes first
+# Never blocks the caller: rows that do not fit in the queue, or arrive after the writer died, are dropped and counted
+class DBWriter:
+    def __init__(self, db_path=DB_PATH, batch_size=200, flush_interval=1.0, queue_size=10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.stopping = threading.Event()
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+
+        self.commit_time = stage_histogram("db_commit")
+        self.written_count = METRICS.counter("db_rows_written_total")
+        self.dropped_count = METRICS.counter("db_rows_dropped_total")
+
+    # DEF: Start the writer thread
+    def start(self):
+        init_db(self.db_path)
+        METRICS.gauge("queue_depth", fn=self.queue.qsize, queue="db_writer")
+        self.thread.start()
+        return self
+
+    # DEF: Queue an analysis result for writing
+    # The row is timestamped now, not when the batch is committed
+    # Returns False if the row was dropped (queue full or writer not running)
+    def write(self, attributes, image_path=None):
+        if not self.thread.is_alive() or self.stopping.is_set():
+            self._drop(1)
+            return False
+        try:
+            self.queue.put_nowait(analysis_row(attributes, image_path))
+        except queue.Full:
+            self._drop(1)
+            return False
+        return True
+
+    # DEF: Block until every queued row has been committed, or the writer thread has died
+    # Returns True if the queue was fully processed
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                if not self.thread.is_alive():
+                    return False
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                self.queue.all_tasks_done.wait(0.1)
+        return True
+
+    # DEF: Commit remaining rows and stop the writer thread
+    # Waits up to timeout seconds in total, rows still queued after that are dropped and reported
+    def stop(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        if self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self.thread.join(max(0.0, deadline - time.monotonic()))
+        # A writer that did not finish in time stops after its current batch, whatever it has not taken is dropped
+        self.stopping.set()
+        unwritten = self._drain()
+        if unwritten:
+            print(f"DB Writer Error: {unwritten} row(s) not committed at shutdown")
+        METRICS.remove("queue_depth", queue="db_writer")
+
+    # DEF: Count rows that were not written
+    def _drop(self, count):
+        self.dropped += count
+        self.dropped_count.inc(count)
+
+    # DEF: Remove every row still queued, counting them as dropped
+    # Returns the number of rows removed
+    def _drain(self):
+        count = 0
+        while True:
+            try:
+                row = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not None:
+                count += 1
+            self.queue.task_done()
+        if count:
+            self._drop(count)
+        return count
+
+    # DEF: Writer loop
+    # Any failure ends the loop, the rows left in the queue are dropped so flush() and stop() never wait on them
+    def _run(self):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            for pragma in WRITER_PRAGMAS:
+                conn.execute(pragma)
+
+            stopping = False
+            while not stopping:
+                batch = []
+                deadline = None
+                while len(batch) < self.batch_size:
+                    if self.stopping.is_set():
+                        stopping = True
+                        break
+                    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    try:
+                        # Bounded wait, so a stop() that could not queue its marker is still noticed
+                        row = self.queue.get(timeout=0.5 if timeout is None else timeout)
+                    except queue.Empty:
+                        if deadline is None:
+                            continue
+                        break
+                    if row is None:
+                        self.queue.task_done()
+                        stopping = True
+                        break
+                    batch.append(row)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                if batch:
+                    try:
+                        self._commit(conn, batch)
+                    finally:
+                        for _ in batch:
+                            self.queue.task_done()
+        except Exception as e:
+            print("DB Writer Error:", e)
+        finally:
+            if conn is not None:
+                conn.close()
+            unwritten = self._drain()
+            if unwritten:
+                print(f"DB Writer Error: {unwritten} row(s) dropped, the writer stopped")
+
+    # DEF: Insert and commit one batch of rows in a single transaction
+    # The rollup tables are updated in the same transaction
+    def _commit(self, conn, batch):
+        try:
+            with self.commit_time.time(), conn:
+                insert_rows(conn, batch)
+            self.written += len(batch)
+            self.written_count.inc(len(batch))
+            self.batches += 1
+        except Exception as e:
+            self.errors += len(batch)
+            print("DB Writer Insert Error:", e)
+
+    # DEF: Summary of the writer's activity
+    def summary(self):
+        output = "\n== DB Writer Summary\n"
+        output += f"Rows written: {self.written}\n"
+        output += f"Batches: {self.batches}\n"
+        if self.errors:
+            output += f"Failed rows: {self.errors}\n"
+        if self.dropped:
+            output += f"Dropped rows: {self.dropped}\n"
+        return output.strip()
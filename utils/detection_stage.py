@@ -0,0 +1,140 @@
+import math
+
+import cv2
+import numpy as np
+
+from utils.model_utils import get_cam_setting
+
+# Typical chin-to-crown height of an adult face (metres)
+FACE_HEIGHT = 0.22
+
+# -----------------------------------
+
+# DEF: Expected face size range (pixels) from camera geometry
+# frame_height: frame height in pixels, vertical_fov: vertical field of view (degrees)
+# min_distance / max_distance: closest and furthest distance (metres) people are from the camera
+# Returns (min_face, max_face)
+def face_size_range(frame_height, vertical_fov, min_distance, max_distance, face_height=FACE_HEIGHT):
+    focal = (frame_height / 2) / math.tan(math.radians(vertical_fov) / 2)
+    return int(focal * face_height / max_distance), int(math.ceil(focal * face_height / min_distance))
+
+# CLASS: Resolution stage in front of a face detector
+# - roi: polygons of [(x, y), ...] points (pixels, or 0-1 fractions of the frame), e.g. a doorway or counter
+#   Detection runs on the polygons' bounding box only, with the pixels outside the polygons blanked out
+# - detect_width: the region is downscaled to at most this width before detection
+# - min_face / max_face: face size bounds in full-resolution pixels, or geometry={"vertical_fov", "min_distance", "max_distance"}
+# The downscale never shrinks the smallest expected face below what the detector can find
+# Detections are mapped back to full-resolution coordinates, so crops for analysis keep full quality
+class DetectionStage:
+    def __init__(self, detect_width=640, min_face=None, max_face=None, geometry=None, roi=None):
+        self.detect_width = detect_width
+        self.min_face = min_face
+        self.max_face = max_face
+        self.geometry = geometry
+        self.roi = roi
+        self.layouts = {}
+
+    # Layouts are cached per frame size and rebuilt on the other side when sent to a worker process
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["layouts"] = {}
+        return state
+
+    # DEF: Work out the crop box, scale, mask and size bounds for a frame size
+    def _layout(self, w, h, detector_min_face):
+        key = (w, h, detector_min_face)
+        layout = self.layouts.get(key)
+        if layout is not None:
+            return layout
+
+        polygons = []
+        for polygon in self.roi or []:
+            points = np.array(polygon, dtype=np.float64)
+            if points.max() <= 1.0:
+                points = points * (w, h)
+            polygons.append(points)
+
+        if polygons:
+            bx, by, bw, bh = cv2.boundingRect(np.concatenate(polygons).astype(np.int32))
+            x0, y0 = max(0, bx), max(0, by)
+            x1, y1 = min(w, bx + bw), min(h, by + bh)
+        else:
+            x0, y0, x1, y1 = 0, 0, w, h
+
+        min_face, max_face = self.min_face, self.max_face
+        if self.geometry:
+            geo_min, geo_max = face_size_range(h, **self.geometry)
+            min_face = min_face or geo_min
+            max_face = max_face or geo_max
+
+        scale = 1.0
+        if self.detect_width and x1 - x0 > self.detect_width:
+            scale = self.detect_width / (x1 - x0)
+        if min_face and detector_min_face:
+            scale = max(scale, min(1.0, detector_min_face / min_face))
+
+        size = (max(1, round((x1 - x0) * scale)), max(1, round((y1 - y0) * scale)))
+        mask = None
+        if polygons:
+            mask = np.zeros((size[1], size[0]), dtype=np.uint8)
+            shifted = [np.round((points - (x0, y0)) * scale).astype(np.int32) for points in polygons]
+            cv2.fillPoly(mask, shifted, 255)
+
+        layout = {
+            "box": (x0, y0, x1, y1),
+            "scale": scale,
+            "size": size,
+            "mask": mask,
+            "min_size": max(1, int(min_face * scale)) if min_face else None,
+            "max_size": int(math.ceil(max_face * scale)) if max_face else None,
+        }
+        self.layouts[key] = layout
+        return layout
+
+    # DEF: Run a detector through the stage
+    # detect_fn(image, min_size, max_size) returns face coords in the image it is given
+    # Returns list of face coords (x, y, w, h) in the full-resolution frame, faces centred outside the ROI are dropped
+    def detect(self, frame, detect_fn, detector_min_face=None):
+        h, w = frame.shape[:2]
+        layout = self._layout(w, h, detector_min_face)
+        x0, y0, x1, y1 = layout["box"]
+        scale = layout["scale"]
+        mask = layout["mask"]
+
+        image = frame[y0:y1, x0:x1]
+        if scale < 1.0:
+            image = cv2.resize(image, layout["size"], interpolation=cv2.INTER_AREA)
+        if mask is not None:
+            image = cv2.bitwise_and(image, image, mask=mask)
+
+        faces = []
+        for fx, fy, fw, fh in detect_fn(image, layout["min_size"], layout["max_size"]):
+            if mask is not None:
+                cx = min(mask.shape[1] - 1, int(fx + fw / 2))
+                cy = min(mask.shape[0] - 1, int(fy + fh / 2))
+                if not mask[cy, cx]:
+                    continue
+            x = max(0, x0 + int(fx / scale))
+            y = max(0, y0 + int(fy / scale))
+            fw = min(w - x, int(round(fw / scale)))
+            fh = min(h - y, int(round(fh / scale)))
+            if fw > 0 and fh > 0:
+                faces.append((x, y, fw, fh))
+        return faces
+
+# DEF: Build one detection stage per camera
+# detection: default stage options (True or a dict), None/False detects on the full frame
+# cam_settings: per-camera overrides under the "detection" key, e.g. {0: {"detection": {"roi": [[(0.3, 0), (0.7, 0), (0.7, 1), (0.3, 1)]]}}},
+#   False disables a camera's stage
+# Returns dict of cam ID to DetectionStage (cameras without a stage detect on the full frame)
+def build_detection_stages(cam_ids, detection=None, cam_settings=None):
+    stages = {}
+    for cam_id in cam_ids:
+        override = get_cam_setting(cam_settings, cam_id, "detection")
+        if override is False or (override is None and not detection):
+            continue
+        options = dict(detection) if isinstance(detection, dict) else {}
+        if isinstance(override, dict):
+            options.update(override)
+        stages[cam_id] = DetectionStage(**options)
+    return stages
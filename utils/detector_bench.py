@@ -0,0 +1,99 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import cv2
+
+from utils.detectors import DETECTORS, get_detector
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# DEF: Load all images in a folder as BGR frames
+def load_images(folder):
+    images = []
+    for path in sorted(Path(folder).iterdir()):
+        if path.suffix.lower() in IMAGE_EXTENSIONS:
+            image = cv2.imread(str(path))
+            if image is not None:
+                images.append(image)
+    return images
+
+# DEF: Compare detector backends on throughput and recall
+# face_folder: images that each contain at least one face (recall = share of images with a detection)
+# empty_folder: optional images with no faces (false positive rate = share of images with a detection)
+# Returns list of result dicts, one per backend
+def compare_detectors(face_folder, empty_folder=None, backends=None, repeat=1):
+    face_images = load_images(face_folder)
+    empty_images = load_images(empty_folder) if empty_folder else []
+    if not face_images:
+        print(f"No images found in: {face_folder}")
+        return []
+
+    results = []
+    for name in backends or DETECTORS:
+        try:
+            load_start = time.perf_counter()
+            detector = get_detector(name)
+            load_time = time.perf_counter() - load_start
+        except Exception as e:
+            print(f"Skipping detector {name}: {e}")
+            continue
+
+        hits = 0
+        detect_time = 0.0
+        for _ in range(repeat):
+            for image in face_images:
+                start = time.perf_counter()
+                faces = detector.detect(image)
+                detect_time += time.perf_counter() - start
+                hits += 1 if faces else 0
+
+        false_hits = sum(1 for image in empty_images if detector.detect(image))
+
+        frames = len(face_images) * repeat
+        results.append({
+            "detector": name,
+            "load_time": load_time,
+            "fps": frames / detect_time if detect_time > 0 else 0.0,
+            "mean_ms": detect_time / frames * 1000,
+            "recall": hits / frames,
+            "false_positive_rate": false_hits / len(empty_images) if empty_images else None,
+        })
+    return results
+
+# DEF: Print a comparison table, cheapest detector first
+def print_comparison(results, recall_target=None):
+    print(f"{'Detector':<8} {'Load (s)':>9} {'FPS':>8} {'Mean (ms)':>10} {'Recall':>7} {'FPR':>6}")
+    for r in sorted(results, key=lambda r: r["mean_ms"]):
+        fpr = f"{r['false_positive_rate']:.2f}" if r["false_positive_rate"] is not None else "-"
+        print(f"{r['detector']:<8} {r['load_time']:>9.3f} {r['fps']:>8.1f} {r['mean_ms']:>10.2f} {r['recall']:>7.2f} {fpr:>6}")
+
+    if recall_target is not None:
+        meeting = [r for r in results if r["recall"] >= recall_target]
+        if meeting:
+            best = min(meeting, key=lambda r: r["mean_ms"])
+            print(f"\nCheapest detector meeting recall {recall_target:.2f}: {best['detector']}")
+        else:
+            print(f"\nNo detector meets recall {recall_target:.2f}")
+
+# Main
+def main():
+    parser = argparse.ArgumentParser(description="Compare face detector backends on throughput and recall")
+    parser.add_argument("face_folder", help="Folder of images that each contain at least one face")
+    parser.add_argument("--empty-folder", help="Folder of images that contain no faces")
+    parser.add_argument("--backends", nargs="+", choices=list(DETECTORS), help="Backends to compare (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the face images")
+    parser.add_argument("--recall-target", type=float, help="Report the cheapest backend meeting this recall")
+    parser.add_argument("--output", help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    results = compare_detectors(args.face_folder, args.empty_folder, args.backends, args.repeat)
+    print_comparison(results, args.recall_target)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
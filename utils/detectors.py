@@ -0,0 +1,145 @@
+import os
+import threading
+
+import cv2
+
+# Model files live in the repo's models folder, whatever the working directory
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+# -----------------------------------
+
+# DEF: Keep faces within a size range (pixels, by width)
+def filter_sizes(faces, min_size=None, max_size=None):
+    return [face for face in faces
+            if (not min_size or face[2] >= min_size) and (not max_size or face[2] <= max_size)]
+
+# CLASS: Haar cascade face detector (OpenCV frontal face cascade)
+# Cheapest to load, slowest multi-scale scan and lowest recall on non-frontal faces
+class HaarDetector:
+    name = 'haar'
+    # Smallest face the detector can find (cascade window, pixels)
+    min_face = 24
+
+    def __init__(self, model_path=None):
+        if model_path is None:
+            model_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        self.cascade = cv2.CascadeClassifier(model_path)
+        if self.cascade.empty():
+            raise RuntimeError(f"Could not load cascade: {model_path}")
+
+    # DEF: Detect faces in a BGR frame
+    # min_size / max_size bound the scan itself, so fewer scales are searched
+    # Returns list of face coords (x, y, w, h)
+    def detect(self, frame, min_size=None, max_size=None):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = self.cascade.detectMultiScale(
+            gray,
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(min_size, min_size) if min_size else (0, 0),
+            maxSize=(max_size, max_size) if max_size else (0, 0)
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+# CLASS: LBP cascade face detector
+# Integer features make the scan several times faster than Haar, at some cost in recall
+class LBPDetector(HaarDetector):
+    name = 'lbp'
+
+    def __init__(self, model_path=None):
+        if model_path is None:
+            model_path = os.path.join(MODELS_DIR, "lbpcascade_frontalface_improved.xml")
+        super().__init__(model_path)
+
+# CLASS: OpenCV DNN res10 SSD face detector (Caffe)
+# Single forward pass at 300x300, robust to pose and lighting
+class SSDDetector:
+    name = 'ssd'
+    # Frames are resized to 300x300 for the network, so there is no fixed minimum in frame pixels
+    min_face = None
+
+    def __init__(self, prototxt_path=None, model_path=None, confidence=0.5):
+        if prototxt_path is None:
+            prototxt_path = os.path.join(MODELS_DIR, "deploy.prototxt")
+        if model_path is None:
+            model_path = os.path.join(MODELS_DIR, "res10_300x300_ssd_iter_140000.caffemodel")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+        self.confidence = confidence
+
+    # DEF: Detect faces in a BGR frame
+    # Returns list of face coords (x, y, w, h) within min_size / max_size
+    def detect(self, frame, min_size=None, max_size=None):
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()
+
+        faces = []
+        for i in range(detections.shape[2]):
+            if detections[0, 0, i, 2] < self.confidence:
+                continue
+            x1 = max(0, int(detections[0, 0, i, 3] * w))
+            y1 = max(0, int(detections[0, 0, i, 4] * h))
+            x2 = min(w, int(detections[0, 0, i, 5] * w))
+            y2 = min(h, int(detections[0, 0, i, 6] * h))
+            if x2 > x1 and y2 > y1:
+                faces.append((x1, y1, x2 - x1, y2 - y1))
+        return filter_sizes(faces, min_size, max_size)
+
+# CLASS: YuNet face detector (cv2.FaceDetectorYN, ONNX)
+# Lightweight CNN, best recall per CPU cycle of the bundled backends
+class YuNetDetector:
+    name = 'yunet'
+    min_face = 10
+
+    def __init__(self, model_path=None, score_threshold=0.9, nms_threshold=0.3):
+        if model_path is None:
+            model_path = os.path.join(MODELS_DIR, "face_detection_yunet_2023mar.onnx")
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold, nms_threshold)
+        self.input_size = (320, 320)
+
+    # DEF: Detect faces in a BGR frame
+    # Returns list of face coords (x, y, w, h) within min_size / max_size
+    def detect(self, frame, min_size=None, max_size=None):
+        h, w = frame.shape[:2]
+        if self.input_size != (w, h):
+            self.detector.setInputSize((w, h))
+            self.input_size = (w, h)
+
+        _, detections = self.detector.detect(frame)
+        if detections is None:
+            return []
+
+        faces = []
+        for det in detections:
+            x, y = max(0, int(det[0])), max(0, int(det[1]))
+            fw, fh = min(w - x, int(det[2])), min(h - y, int(det[3]))
+            if fw > 0 and fh > 0:
+                faces.append((x, y, fw, fh))
+        return filter_sizes(faces, min_size, max_size)
+
+# -----------------------------------
+
+DETECTORS = {
+    'haar': HaarDetector,
+    'lbp': LBPDetector,
+    'ssd': SSDDetector,
+    'yunet': YuNetDetector,
+}
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+# DEF: Get a detector backend by name
+# Each backend is loaded once per process and reused for every frame
+def get_detector(name='haar'):
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector backend: {name}. Available: {', '.join(DETECTORS)}")
+    detector = _loaded.get(name)
+    if detector is None:
+        with _load_lock:
+            detector = _loaded.get(name)
+            if detector is None:
+                detector = DETECTORS[name]()
+                _loaded[name] = detector
+    return detector
@@ -0,0 +1,331 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+import cv2
+import numpy as np
+
+from utils.db_utils import DB_PATH
+
+EMBEDDINGS_DIR = 'db/embeddings'
+EMBEDDING_MODEL = 'Facenet'
+
+# Cosine similarity at which two embeddings are taken to be the same person (DeepFace's Facenet cosine threshold is 0.40 distance)
+MATCH_THRESHOLD = 0.60
+
+# Rows scored per step when scanning the store (bounds memory use of a search)
+SEARCH_CHUNK = 65536
+
+_models = {}
+_models_lock = threading.Lock()
+
+# -----------------------------------
+
+# DEF: Get a DeepFace facial recognition model (client with .model and .input_shape)
+# Each model is built once per process and reused
+def get_embedding_model(model_name=EMBEDDING_MODEL):
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(model_name)
+            if model is None:
+                from deepface import DeepFace
+                model = DeepFace.build_model(model_name=model_name, task="facial_recognition")
+                _models[model_name] = model
+    return model
+
+# DEF: Embed a list of BGR face crops in batched forward passes
+# Preprocessing matches DeepFace.represent (scaled to [0, 1], RGB, letterboxed to the model's input size)
+# Returns float32 array (faces, dim) of L2-normalised embeddings
+def embed_faces(face_imgs, model_name=EMBEDDING_MODEL, batch_size=32):
+    from utils.attributes import prepare_face, predict_batch
+
+    client = get_embedding_model(model_name)
+    batch = np.stack([prepare_face(face_img, client.input_shape)[:, :, ::-1] for face_img in face_imgs])
+    return normalise(predict_batch(client.model, batch, batch_size))
+
+# DEF: L2-normalise rows (cosine similarity becomes a dot product)
+def normalise(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+# DEF: Merge candidate matches into the running top k per query
+# Returns (ids, scores), each (queries, k)
+def merge_top_k(ids, scores, new_ids, new_scores, k):
+    ids = np.concatenate([ids, new_ids], axis=1)
+    scores = np.concatenate([scores, new_scores], axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        ids = np.take_along_axis(ids, keep, axis=1)
+        scores = np.take_along_axis(scores, keep, axis=1)
+    return ids, scores
+
+# DEF: Score a set of store rows against the queries in chunks and keep the top k
+# rows: memmap of the store, row_ids: None (rows start..stop) or sorted array of row IDs
+def scan_rows(rows, queries, k, start=0, stop=None, row_ids=None):
+    ids = np.full((len(queries), 0), -1, dtype=np.int64)
+    scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    total = len(row_ids) if row_ids is not None else (stop - start)
+    for offset in range(0, total, SEARCH_CHUNK):
+        if row_ids is not None:
+            chunk_ids = row_ids[offset:offset + SEARCH_CHUNK]
+            block = rows[chunk_ids]
+        else:
+            chunk_ids = np.arange(start + offset, min(stop, start + offset + SEARCH_CHUNK), dtype=np.int64)
+            block = rows[chunk_ids[0]:chunk_ids[-1] + 1]
+        chunk_scores = queries @ block.astype(np.float32).T
+        ids, scores = merge_top_k(ids, scores, np.broadcast_to(chunk_ids, chunk_scores.shape), chunk_scores, k)
+    return ids, scores
+
+# DEF: Sort each query's matches best first
+def sort_matches(ids, scores):
+    order = np.argsort(-scores, axis=1)
+    return np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+# -----------------------------------
+
+# CLASS: Append-only, memory-mapped store of float16 face embeddings
+# Rows live in one flat file (<path>/embeddings.f16), a row's index is its embedding ID (stored in face_data.embedding_id)
+# Readers map the file and only see whole rows, so searching while the pipeline appends is safe
+# Searches scan the map in chunks, the store is never loaded into RAM as a whole
+class EmbeddingStore:
+    def __init__(self, path=EMBEDDINGS_DIR, model_name=EMBEDDING_MODEL, dim=None):
+        self.path = path
+        self.data_path = os.path.join(path, "embeddings.f16")
+        self.meta_path = os.path.join(path, "meta.json")
+        self.lock = threading.Lock()
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.model_name = meta["model"]
+            self.dim = meta["dim"]
+        else:
+            self.model_name = model_name
+            self.dim = dim
+
+    # DEF: Number of embeddings in the store
+    def count(self):
+        if not self.dim or not os.path.exists(self.data_path):
+            return 0
+        return os.path.getsize(self.data_path) // (self.dim * 2)
+
+    # DEF: Read-only memory map of the stored rows (None if empty)
+    def rows(self):
+        count = self.count()
+        if count == 0:
+            return None
+        return np.memmap(self.data_path, dtype=np.float16, mode="r", shape=(count, self.dim))
+
+    # DEF: Append embeddings to the store
+    # Returns list of their embedding IDs
+    def append(self, vectors):
+        vectors = normalise(vectors)
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match the store ({self.dim})")
+            if not os.path.exists(self.meta_path):
+                os.makedirs(self.path, exist_ok=True)
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+
+            with open(self.data_path, "ab") as f:
+                # A partial row left by a crash is cut off, so new rows stay aligned
+                size = f.tell()
+                row_bytes = self.dim * 2
+                if size % row_bytes:
+                    f.truncate(size - size % row_bytes)
+                    f.seek(0, os.SEEK_END)
+                first = f.tell() // row_bytes
+                f.write(vectors.astype(np.float16).tobytes())
+        return list(range(first, first + len(vectors)))
+
+    # DEF: Store the "embedding" of each analysis result and replace it with its "embedding_id"
+    def add_results(self, results):
+        with_embedding = [result for result in results if result.get("embedding") is not None]
+        if not with_embedding:
+            return
+        ids = self.append([result.pop("embedding") for result in with_embedding])
+        for result, embedding_id in zip(with_embedding, ids):
+            result["embedding_id"] = embedding_id
+
+    # DEF: Find the k most similar stored embeddings for each query (exact cosine search)
+    # Uses the IVF index when one has been built and index=True, rows added since the build are always scanned
+    # Returns (ids, scores), each (queries, k), best match first, -1 / -inf pad missing matches
+    def search(self, queries, k=5, index=True, nprobe=8):
+        queries = normalise(queries)
+        rows = self.rows()
+        if rows is None:
+            return np.full((len(queries), k), -1, dtype=np.int64), np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        ivf = IVFIndex.load(self.path) if index else None
+        if ivf is None:
+            ids, scores = scan_rows(rows, queries, k, 0, len(rows))
+        else:
+            ids, scores = ivf.search(rows, queries, k, nprobe)
+
+        if ids.shape[1] < k:
+            pad = k - ids.shape[1]
+            ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+            scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+        return sort_matches(ids, scores)
+
+# -----------------------------------
+
+# CLASS: Coarse-quantised (IVF) index over an embedding store
+# Rows are clustered around nlist centroids (spherical k-means), a search scores only the rows in the nprobe closest lists
+# Stored as .npy files next to the store and memory-mapped on load
+class IVFIndex:
+    def __init__(self, centroids, offsets, ids, count):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+        self.count = count
+
+    # DEF: Load the index of a store (None if it has not been built)
+    @classmethod
+    def load(cls, path):
+        meta_path = os.path.join(path, "ivf.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            np.load(os.path.join(path, "ivf_centroids.npy")),
+            np.load(os.path.join(path, "ivf_offsets.npy")),
+            np.load(os.path.join(path, "ivf_ids.npy"), mmap_mode="r"),
+            meta["count"]
+        )
+
+    # DEF: Build (or rebuild) the index of a store
+    # nlist: number of clusters (default ~sqrt(rows)), sample: rows used to train the centroids
+    @classmethod
+    def build(cls, store, nlist=None, sample=100000, iterations=10, seed=0):
+        rows = store.rows()
+        if rows is None:
+            print("IVF Build Error: The embedding store is empty.")
+            return None
+        count = len(rows)
+        nlist = nlist or max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(seed)
+
+        # Train centroids on a sample of rows
+        sample_ids = np.sort(rng.choice(count, size=min(count, max(sample, nlist)), replace=False))
+        training = rows[sample_ids].astype(np.float32)
+        centroids = training[rng.choice(len(training), size=nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(training @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, training)
+            sizes = np.bincount(assign, minlength=nlist)
+            empty = sizes == 0
+            # Empty clusters restart from random training rows
+            sums[empty] = training[rng.choice(len(training), size=int(empty.sum()))]
+            centroids = normalise(sums)
+
+        # Assign every row, chunk by chunk
+        assign = np.empty(count, dtype=np.int32)
+        for start in range(0, count, SEARCH_CHUNK):
+            block = rows[start:start + SEARCH_CHUNK].astype(np.float32)
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        ids = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+
+        np.save(os.path.join(store.path, "ivf_centroids.npy"), centroids)
+        np.save(os.path.join(store.path, "ivf_offsets.npy"), offsets)
+        np.save(os.path.join(store.path, "ivf_ids.npy"), ids)
+        with open(os.path.join(store.path, "ivf.json"), "w", encoding="utf-8") as f:
+            json.dump({"count": count, "nlist": nlist}, f)
+        print(f"IVF index built: {count} embeddings in {nlist} lists")
+        return cls(centroids, offsets, ids, count)
+
+    # DEF: Approximate top-k search, rows appended after the build are scanned exactly
+    # Returns (ids, scores), each (queries, k)
+    def search(self, rows, queries, k=5, nprobe=8):
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        all_ids, all_scores = [], []
+        for query, lists in zip(queries, probes):
+            row_ids = np.sort(np.concatenate([self.ids[self.offsets[l]:self.offsets[l + 1]] for l in lists]))
+            ids, scores = scan_rows(rows, query[None, :], k, row_ids=row_ids)
+            if len(rows) > self.count:
+                tail_ids, tail_scores = scan_rows(rows, query[None, :], k, self.count, len(rows))
+                ids, scores = merge_top_k(ids, scores, tail_ids, tail_scores, k)
+            all_ids.append(ids)
+            all_scores.append(scores)
+
+        width = max(ids.shape[1] for ids in all_ids)
+        pad = lambda a, value: np.pad(a, ((0, 0), (0, width - a.shape[1])), constant_values=value)
+        return (np.concatenate([pad(ids, -1) for ids in all_ids]),
+                np.concatenate([pad(scores, -np.inf) for scores in all_scores]))
+
+# -----------------------------------
+
+# DEF: Find where a face has been seen before
+# query: one embedding, matches below threshold (cosine similarity) are dropped
+# Returns list of dicts (embedding_id, score, id, cam_id, timestamp, age, gender, race), best match first
+def find_sightings(store, query, k=20, threshold=MATCH_THRESHOLD, db_path=DB_PATH, index=True):
+    ids, scores = store.search(query, k=k, index=index)
+    matches = {int(i): float(s) for i, s in zip(ids[0], scores[0]) if i >= 0 and s >= threshold}
+    if not matches:
+        return []
+
+    try:
+        conn = sqlite3.connect(db_path)
+        placeholders = ",".join("?" * len(matches))
+        rows = conn.execute(
+            f"SELECT embedding_id, id, cam_id, timestamp, age, gender, race FROM face_data WHERE embedding_id IN ({placeholders})",
+            list(matches)
+        ).fetchall()
+        conn.close()
+    except sqlite3.Error as e:
+        print("Database error:", e)
+        return []
+
+    sightings = [
+        {"embedding_id": row[0], "score": matches[row[0]], "id": row[1], "cam_id": row[2],
+         "timestamp": row[3], "age": row[4], "gender": row[5], "race": row[6]}
+        for row in rows
+    ]
+    return sorted(sightings, key=lambda s: s["score"], reverse=True)
+
+# Main
+# build-index: (re)build the IVF index, search <face image>: list where that face has been seen
+def main():
+    parser = argparse.ArgumentParser(description="Face embedding store tools")
+    parser.add_argument("--path", default=EMBEDDINGS_DIR, help="Embedding store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build-index", help="Build the IVF index for large stores")
+    build.add_argument("--nlist", type=int, help="Number of lists (default sqrt of the store size)")
+
+    search = commands.add_parser("search", help="Find sightings of the face in an image (a face crop)")
+    search.add_argument("image")
+    search.add_argument("-k", type=int, default=20)
+    search.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    search.add_argument("--exact", action="store_true", help="Ignore the IVF index")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.path)
+    if args.command == "build-index":
+        IVFIndex.build(store, nlist=args.nlist)
+        return
+
+    image = cv2.imread(args.image)
+    if image is None:
+        print(f"Could not read image: {args.image}")
+        return
+    sightings = find_sightings(store, embed_faces([image], store.model_name), args.k, args.threshold, index=not args.exact)
+    if not sightings:
+        print("No matching faces found.")
+    for s in sightings:
+        print(f"{s['score']:.3f}  Cam {s['cam_id']}  {s['timestamp']}  (ID {s['id']}: {s['age']}, {s['gender']}, {s['race']})")
+
+if __name__ == "__main__":
+    main()
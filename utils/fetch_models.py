@@ -0,0 +1,75 @@
+import hashlib
+import os
+import urllib.request
+
+from utils.detectors import MODELS_DIR
+
+# Model files used by the non-Haar detector backends (utils/detectors.py)
+# The cascade and prototxt are small and committed under models/, the weights are downloaded
+MODEL_URLS = {
+    "lbpcascade_frontalface_improved.xml":
+        "https://raw.githubusercontent.com/opencv/opencv/4.9.0/data/lbpcascades/lbpcascade_frontalface_improved.xml",
+    "deploy.prototxt":
+        "https://raw.githubusercontent.com/opencv/opencv/4.9.0/samples/dnn/face_detector/deploy.prototxt",
+    "res10_300x300_ssd_iter_140000.caffemodel":
+        "https://raw.githubusercontent.com/opencv/opencv_3rdparty/dnn_samples_face_detector_20170830/res10_300x300_ssd_iter_140000.caffemodel",
+    "face_detection_yunet_2023mar.onnx":
+        "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx",
+}
+
+# SHA-256 of each model file, checked after download and on files already present
+# None: no verified copy to pin against yet, the hash is printed on download so it can be pinned here
+MODEL_SHA256 = {
+    "lbpcascade_frontalface_improved.xml": "7c31331d494f20e216b397ad99d824d92ab91ebb15db3bcda6a2f8e684d238d3",
+    "deploy.prototxt": "dcd661dc48fc9de0a341db1f666a2164ea63a67265c7f779bc12d6b3f2fa67e9",
+    "res10_300x300_ssd_iter_140000.caffemodel": "2a56a11a57a4a295956b0660b4a3d76bbdca2206c4961cea8efe7d95c7cb2f2d",
+    "face_detection_yunet_2023mar.onnx": None,
+}
+
+# DEF: SHA-256 of a file, read in chunks
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# DEF: Check a model file against its pinned checksum
+# Returns True if it matches or no checksum is pinned
+def verify_model(path, filename):
+    expected = MODEL_SHA256.get(filename)
+    actual = file_sha256(path)
+    if expected is None:
+        print(f"No checksum pinned for {filename}, sha256: {actual}")
+        return True
+    if actual != expected:
+        print(f"Checksum mismatch for {path}: expected {expected}, got {actual}")
+        return False
+    return True
+
+# DEF: Download detector model files into the models folder
+# Files already present are verified instead of downloaded, downloads that fail the checksum are deleted
+def fetch_models(models_dir=MODELS_DIR):
+    os.makedirs(models_dir, exist_ok=True)
+    for filename, url in MODEL_URLS.items():
+        path = os.path.join(models_dir, filename)
+        if os.path.exists(path):
+            if verify_model(path, filename):
+                print(f"Model already present: {path}")
+            continue
+        try:
+            urllib.request.urlretrieve(url, path)
+        except Exception as e:
+            print(f"Error downloading {filename}: {e}")
+            continue
+        if verify_model(path, filename):
+            print(f"Downloaded model: {path}")
+        else:
+            os.remove(path)
+
+# Main
+def main():
+    fetch_models()
+
+if __name__ == "__main__":
+    main()
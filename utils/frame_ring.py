@@ -0,0 +1,198 @@
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Ring control fields (int64)
+LATEST_SEQ, LATEST_SLOT, READ_SEQ, CAPTURED, DROPPED, ENDED = range(6)
+CONTROL_FIELDS = 8
+
+# Everything a process needs to attach to a ring
+RingSpec = namedtuple("RingSpec", ["name", "slots", "shape"])
+
+# Reference to one frame in a ring, sent between processes instead of the frame itself
+SharedFrame = namedtuple("SharedFrame", ["ring", "slot", "seq"])
+
+_rings = {}
+
+# -----------------------------------
+
+# CLASS: Fixed-size ring of frame slots in shared memory, one writer (a capture process) and any number of readers
+# Layout: control fields, then a sequence number, timestamp and pin count per slot, then the frames themselves
+# Readers get NumPy views of the slots (no copy). A slot's sequence number is negative while it is being written,
+# and changes when the slot is reused, so readers check it again after using a frame to detect overwrites
+# The writer never reuses the slot of the frame the main reader last took (READ_SEQ), nor a slot pinned by the main reader
+# (frames sent to inference workers stay pinned until their results are collected). With every slot taken, new frames are dropped
+class FrameRing:
+    def __init__(self, spec, create=False):
+        self.spec = spec
+        slots, shape = spec.slots, tuple(spec.shape)
+        frame_bytes = int(np.prod(shape))
+        header_bytes = CONTROL_FIELDS * 8 + slots * 24
+        size = header_bytes + slots * frame_bytes
+
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.spec = spec = RingSpec(self.shm.name, slots, shape)
+        else:
+            self.shm = shared_memory.SharedMemory(name=spec.name)
+
+        buf = self.shm.buf
+        self.control = np.ndarray((CONTROL_FIELDS,), dtype=np.int64, buffer=buf)
+        self.slot_seqs = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=CONTROL_FIELDS * 8)
+        self.slot_times = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=CONTROL_FIELDS * 8 + slots * 8)
+        self.slot_pins = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=CONTROL_FIELDS * 8 + slots * 16)
+        self.frames = np.ndarray((slots, *shape), dtype=np.uint8, buffer=buf, offset=header_bytes)
+        if create:
+            self.control[:] = 0
+            self.slot_seqs[:] = 0
+            self.slot_pins[:] = 0
+
+    # DEF: Create a new ring for frames of a given shape
+    @classmethod
+    def create(cls, shape, slots=8):
+        return cls(RingSpec(None, slots, tuple(shape)), create=True)
+
+    # DEF: Write a frame into the next free slot (writer only)
+    # Frames of a different shape are rejected (the slots are sized for the camera's first frame)
+    # Returns the frame's sequence number, 0 if every slot is taken (the frame is dropped), or None if rejected
+    def write(self, frame, timestamp):
+        if frame.shape != self.frames.shape[1:]:
+            return None
+
+        # READ_SEQ before the pins: the reader pins a frame before it moves READ_SEQ on, so a frame is always covered by one of them
+        read_seq = int(self.control[READ_SEQ])
+        latest_slot = int(self.control[LATEST_SLOT])
+        slot = None
+        for step in range(1, self.spec.slots + 1):
+            candidate = (latest_slot + step) % self.spec.slots
+            if self.slot_pins[candidate] > 0:
+                continue
+            if self.spec.slots > 1 and read_seq and self.slot_seqs[candidate] == read_seq:
+                continue
+            slot = candidate
+            break
+        if slot is None:
+            self.control[DROPPED] += 1
+            return 0
+
+        seq = int(self.control[LATEST_SEQ]) + 1
+        self.slot_seqs[slot] = -seq
+        np.copyto(self.frames[slot], frame)
+        self.slot_times[slot] = timestamp
+        self.slot_seqs[slot] = seq
+
+        if self.control[LATEST_SEQ] > self.control[READ_SEQ]:
+            self.control[DROPPED] += 1
+        self.control[LATEST_SLOT] = slot
+        self.control[LATEST_SEQ] = seq
+        self.control[CAPTURED] += 1
+        return seq
+
+    # DEF: Take the newest frame if it is newer than the last one taken (main reader only)
+    # Returns (seq, timestamp, frame view, SharedFrame) or None
+    def read_latest(self):
+        for _ in range(3):
+            seq = int(self.control[LATEST_SEQ])
+            if seq == 0 or seq == self.control[READ_SEQ]:
+                return None
+            slot = int(self.control[LATEST_SLOT])
+            self.control[READ_SEQ] = seq
+            if self.slot_seqs[slot] == seq:
+                return seq, float(self.slot_times[slot]), self.frames[slot], SharedFrame(self.spec, slot, seq)
+            # The writer moved on between the two reads, try the newer frame
+        return None
+
+    # DEF: View of a referenced frame, None if its slot has been reused
+    def view(self, frame_ref):
+        if self.slot_seqs[frame_ref.slot] != frame_ref.seq:
+            return None
+        return self.frames[frame_ref.slot]
+
+    # DEF: Keep a referenced frame's slot from being reused until unpin() (main reader only)
+    # Returns False if the slot has already been reused
+    def pin(self, frame_ref):
+        self.slot_pins[frame_ref.slot] += 1
+        if self.slot_seqs[frame_ref.slot] != frame_ref.seq:
+            self.slot_pins[frame_ref.slot] -= 1
+            return False
+        return True
+
+    # DEF: Release a pin taken with pin()
+    def unpin(self, frame_ref):
+        if self.slot_pins[frame_ref.slot] > 0:
+            self.slot_pins[frame_ref.slot] -= 1
+
+    # DEF: Check a referenced frame is still in its slot (call after using a view)
+    def valid(self, frame_ref):
+        return self.slot_seqs[frame_ref.slot] == frame_ref.seq
+
+    # DEF: Mark the ring's camera as ended (writer only)
+    def end(self):
+        self.control[ENDED] = 1
+
+    def ended(self):
+        return bool(self.control[ENDED])
+
+    def captured(self):
+        return int(self.control[CAPTURED])
+
+    def dropped(self):
+        return int(self.control[DROPPED])
+
+    # DEF: Detach from the ring, and remove it if unlink (the owner, once every process is done with it)
+    def close(self, unlink=False):
+        # Views must go before the buffer can be released
+        self.control = self.slot_seqs = self.slot_times = self.slot_pins = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A view is still referenced somewhere, the mapping goes with the process
+            pass
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+# -----------------------------------
+
+# DEF: Get a ring by spec, attaching to it once per process
+def attach_ring(spec):
+    ring = _rings.get(spec.name)
+    if ring is None:
+        ring = FrameRing(spec)
+        _rings[spec.name] = ring
+    return ring
+
+# DEF: Replace SharedFrame references in a list of (cam ID, frame) with views of the frames
+# Frames already overwritten (or in rings that are gone) are left out
+# Returns the resolved frames and a dict of cam ID to reference, to check with drop_overwritten() after use
+def resolve_frames(frames):
+    resolved, refs = [], {}
+    for cam_id, frame in frames:
+        if isinstance(frame, SharedFrame):
+            try:
+                view = attach_ring(frame.ring).view(frame)
+            except FileNotFoundError:
+                view = None
+            if view is None:
+                continue
+            refs[cam_id] = frame
+            frame = view
+        resolved.append((cam_id, frame))
+    return resolved, refs
+
+# DEF: Remove results taken from frames that were overwritten while they were being used
+# Returns the remaining results and the number of overwritten frames
+def drop_overwritten(results, refs):
+    stale = {cam_id for cam_id, ref in refs.items() if not attach_ring(ref.ring).valid(ref)}
+    if not stale:
+        return results, 0
+    return [result for result in results if result.get("cam_id") not in stale], len(stale)
+
+# DEF: Detach from a ring attached with attach_ring(), and remove it if unlink
+def release_ring(spec, unlink=False):
+    ring = _rings.pop(spec.name, None)
+    if ring is not None:
+        ring.close(unlink)
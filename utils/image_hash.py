@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+
+# -----------------------------------
+
+# DEF: Difference hash (dHash) of a BGR or grayscale image
+# Compares neighbouring pixels of a (size+1) x size grayscale thumbnail, robust to scaling, compression and small shifts in light
+# Returns a size*size bit integer (64 bits by default)
+def dhash(image, size=8):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+# DEF: Perceptual hash (pHash) of a BGR or grayscale image
+# Compares the lowest size x size DCT frequencies of a (size*scale)^2 grayscale thumbnail with their median,
+# more tolerant of blur, noise and lighting than dHash, and a little slower
+# Returns a size*size bit integer (64 bits by default)
+def phash(image, size=8, scale=4):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (size * scale, size * scale), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:size, :size].flatten()
+    # The DC term is the mean brightness, left out of the median
+    bits = np.packbits(low > np.median(low[1:]))
+    return int.from_bytes(bits.tobytes(), "big")
+
+# DEF: Number of differing bits between two hashes
+def hamming(a, b):
+    return bin(a ^ b).count("1")
@@ -0,0 +1,151 @@
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# -----------------------------------
+
+# CLASS: Append-only JSON Lines writer with buffered writes and rotation
+# The active file is rotated when it passes max_bytes or is older than max_age seconds
+# Rotated segments are renamed <name>.<YYYYmmdd-HHMMSS-micro>.jsonl and optionally gzip-compressed
+class JsonlWriter:
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, max_age=None, compress=True, buffer_size=64 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.buffer_size = buffer_size
+
+        self.lock = threading.Lock()
+        self.file = None
+        self.size = 0
+        self.opened_at = None
+
+    # DEF: Open the active file for appending
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "a", buffering=self.buffer_size, encoding="utf-8")
+        self.size = self.file.tell()
+        self.opened_at = time.time()
+
+    # DEF: Append one record as a single JSON line
+    def write(self, record):
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            if self.file is None:
+                self._open()
+            if self._should_rotate(len(line)):
+                self._rotate()
+            self.file.write(line)
+            self.size += len(line)
+
+    # DEF: Check size and age limits before a write
+    def _should_rotate(self, next_size):
+        if self.size == 0:
+            return False
+        if self.max_bytes and self.size + next_size > self.max_bytes:
+            return True
+        if self.max_age and time.time() - self.opened_at > self.max_age:
+            return True
+        return False
+
+    # DEF: Close the active file, move it to a timestamped segment and start a new one
+    def _rotate(self):
+        self.file.close()
+        # Segment names sort in write order
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        segment = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        os.replace(self.path, segment)
+
+        if self.compress:
+            threading.Thread(target=compress_segment, args=(segment,), daemon=True).start()
+        self._open()
+
+    # DEF: Flush buffered lines to disk
+    def flush(self):
+        with self.lock:
+            if self.file:
+                self.file.flush()
+
+    # DEF: Flush and close the active file
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+# DEF: Gzip a rotated segment and remove the uncompressed file
+def compress_segment(segment):
+    try:
+        with open(segment, "rb") as src, gzip.open(str(segment) + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(segment)
+    except Exception as e:
+        print(f"Compress Segment Error ({segment}):", e)
+
+# -----------------------------------
+
+# DEF: List the files of a log in write order: rotated segments (oldest first), then the active file
+def log_files(path):
+    path = Path(path)
+    segments = [p for p in path.parent.glob(f"{path.stem}.*{path.suffix}*") if p != path]
+    # A segment may exist both compressed and uncompressed while it is being compressed
+    names = {p.name for p in segments}
+    segments = [p for p in segments if not (p.suffix == ".gz" and p.name[:-3] in names)]
+    segments.sort(key=lambda p: p.name)
+    if path.exists():
+        segments.append(path)
+    return segments
+
+# DEF: Lazily yield every record in a log, including rotated and compressed segments
+def iter_records(path, include_rotated=True):
+    files = log_files(path) if include_rotated else [Path(path)]
+    for file_path in files:
+        opener = gzip.open if file_path.suffix == ".gz" else open
+        try:
+            with opener(file_path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # A partially written last line (crash mid-write) is skipped
+                        continue
+        except FileNotFoundError:
+            continue
+
+# DEF: Convert a JSON array analysis file into a JSON Lines file in one pass
+# Writes next to the original (same name, .jsonl) unless jsonl_path is given
+# Returns the new file path or None if error
+def convert_json_array(json_path, jsonl_path=None, remove_original=False):
+    json_path = Path(json_path)
+    jsonl_path = Path(jsonl_path) if jsonl_path else json_path.with_suffix(".jsonl")
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        with open(jsonl_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    except Exception as e:
+        print(f"Convert Error ({json_path}):", e)
+        return None
+
+    if remove_original:
+        os.remove(json_path)
+    print(f"Converted {len(records)} records: {json_path} -> {jsonl_path}")
+    return jsonl_path
+
+# Main
+# Converts every JSON array file in the analysis folder to JSON Lines
+def main():
+    for json_file in Path('./analysis').glob('*.json'):
+        convert_json_array(json_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Quantiles reported for every histogram
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# -----------------------------------
+
+# CLASS: Fixed-memory histogram with log-spaced buckets
+# Bucket bounds grow by `growth` from min_value to max_value, so memory does not depend on the number of samples
+# Percentiles are accurate to about half a bucket width (~4% with the default growth)
+class Histogram:
+    def __init__(self, min_value=1e-6, max_value=1e3, growth=2 ** 0.125):
+        self.min_value = min_value
+        self.growth = growth
+        self.log_growth = math.log(growth)
+        # Bucket 0 holds values below min_value, the last bucket values above max_value
+        self.size = int(math.ceil(math.log(max_value / min_value) / self.log_growth)) + 2
+        self.lock = threading.Lock()
+        self.reset()
+
+    # DEF: Clear all samples
+    def reset(self):
+        with self.lock:
+            self.buckets = [0] * self.size
+            self.count = 0
+            self.sum = 0.0
+            self.min = None
+            self.max = None
+
+    # DEF: Bucket index for a value
+    def _index(self, value):
+        if value < self.min_value:
+            return 0
+        return min(self.size - 1, 1 + int(math.log(value / self.min_value) / self.log_growth))
+
+    # DEF: Record one value
+    def record(self, value):
+        index = self._index(value)
+        with self.lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    # DEF: Time a block of code into the histogram (seconds)
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    # DEF: Estimate the value at quantile q (0-1), None if empty
+    def percentile(self, q):
+        with self.lock:
+            if self.count == 0:
+                return None
+            rank = max(1, math.ceil(q * self.count))
+            seen = 0
+            for index, bucket in enumerate(self.buckets):
+                seen += bucket
+                if seen >= rank:
+                    break
+            low, high = self.min, self.max
+        # The outer buckets are open-ended, the observed extremes are the best estimate there
+        if index == 0:
+            return low
+        if index == self.size - 1:
+            return high
+        # Geometric midpoint of the bucket, kept within the observed range
+        value = self.min_value * self.growth ** (index - 0.5)
+        return min(max(value, low), high)
+
+    # DEF: Summary statistics and percentiles as a dict
+    def snapshot(self):
+        stats = {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+        }
+        for q in QUANTILES:
+            stats[f"p{q * 100:g}"] = self.percentile(q)
+        return stats
+
+# CLASS: Monotonic counter
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    # DEF: Add to the counter
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+# CLASS: Gauge, either set directly or read from a function when sampled (e.g. a queue's size)
+class Gauge:
+    def __init__(self, fn=None):
+        self.fn = fn
+        self.current = 0
+
+    # DEF: Set the gauge's value
+    def set(self, value):
+        self.current = value
+
+    # DEF: Current value of the gauge
+    def value(self):
+        if self.fn is None:
+            return self.current
+        try:
+            return self.fn()
+        except Exception:
+            return None
+
+# -----------------------------------
+
+# CLASS: Named, labelled collection of histograms, counters and gauges
+# Metrics are created on first use, e.g. metrics.histogram("stage_seconds", stage="detect").record(0.012)
+class MetricsRegistry:
+    def __init__(self, prefix="intellai"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    # DEF: Get or create a metric of the given class
+    def _get(self, cls, name, labels, **kwargs):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = self.metrics[key] = cls(**kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {type(metric).__name__}")
+        return metric
+
+    # DEF: Get or create a histogram
+    def histogram(self, name, **labels):
+        return self._get(Histogram, name, labels)
+
+    # DEF: Get or create a counter
+    def counter(self, name, **labels):
+        return self._get(Counter, name, labels)
+
+    # DEF: Get or create a gauge, fn (optional) is called to read its value
+    def gauge(self, name, fn=None, **labels):
+        gauge = self._get(Gauge, name, labels)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    # DEF: Time a block of code into a histogram (seconds)
+    def timed(self, name, **labels):
+        return self.histogram(name, **labels).time()
+
+    # DEF: Remove one metric, e.g. a gauge reading an object that is going away
+    def remove(self, name, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            self.metrics.pop(key, None)
+
+    # DEF: Clear every metric
+    def clear(self):
+        with self.lock:
+            self.metrics = {}
+
+    # DEF: Point-in-time view of every metric as a JSON-serialisable dict
+    def snapshot(self):
+        with self.lock:
+            items = sorted(self.metrics.items(), key=lambda item: item[0])
+        snapshot = {"timestamp": time.time(), "counters": [], "gauges": [], "histograms": []}
+        for (name, labels), metric in items:
+            entry = {"name": name, "labels": dict(labels)}
+            if isinstance(metric, Histogram):
+                entry.update(metric.snapshot())
+                snapshot["histograms"].append(entry)
+            elif isinstance(metric, Counter):
+                entry["value"] = metric.value
+                snapshot["counters"].append(entry)
+            else:
+                entry["value"] = metric.value()
+                snapshot["gauges"].append(entry)
+        return snapshot
+
+    # DEF: Write the snapshot to a JSON file
+    def write_snapshot(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    # DEF: Every metric in Prometheus text exposition format
+    # Histograms are exported as summaries (quantiles, _sum and _count)
+    def prometheus(self):
+        with self.lock:
+            items = sorted(self.metrics.items(), key=lambda item: item[0])
+
+        lines = []
+        typed = set()
+        for (name, labels), metric in items:
+            full_name = f"{self.prefix}_{name}" if self.prefix else name
+            kind = "summary" if isinstance(metric, Histogram) else "counter" if isinstance(metric, Counter) else "gauge"
+            if full_name not in typed:
+                lines.append(f"# TYPE {full_name} {kind}")
+                typed.add(full_name)
+
+            if isinstance(metric, Histogram):
+                for q in QUANTILES:
+                    value = metric.percentile(q)
+                    lines.append(f"{full_name}{format_labels(labels, quantile=q)} {format_value(value)}")
+                lines.append(f"{full_name}_sum{format_labels(labels)} {format_value(metric.sum)}")
+                lines.append(f"{full_name}_count{format_labels(labels)} {metric.count}")
+            elif isinstance(metric, Counter):
+                lines.append(f"{full_name}{format_labels(labels)} {format_value(metric.value)}")
+            else:
+                lines.append(f"{full_name}{format_labels(labels)} {format_value(metric.value())}")
+        return "\n".join(lines) + "\n"
+
+# DEF: Prometheus label set, e.g. {cam="0",quantile="0.99"}
+def format_labels(labels, **extra):
+    pairs = list(labels) + [(k, str(v)) for k, v in extra.items()]
+    if not pairs:
+        return ""
+    escape = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+# DEF: Prometheus sample value
+def format_value(value):
+    if value is None:
+        return "NaN"
+    return repr(float(value))
+
+# -----------------------------------
+
+# CLASS: Local HTTP endpoint for a metrics registry, served on a daemon thread
+# GET /metrics returns Prometheus text, GET /metrics.json returns the JSON snapshot
+class MetricsServer:
+    def __init__(self, registry, host="127.0.0.1", port=9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    # DEF: Start serving
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = registry.prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # Keep scrapes out of the console
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        print(f"Metrics available at http://{self.host}:{self.port}/metrics")
+        return self
+
+    # DEF: Stop serving
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+# -----------------------------------
+
+# Process-wide registry used by the models, capture threads and writers
+METRICS = MetricsRegistry()
+
+# DEF: Histogram for one stage of the pipeline (capture, motion, detect, analyse, persist, display)
+def stage_histogram(stage, **labels):
+    return METRICS.histogram("stage_seconds", stage=stage, **labels)
+
+# DEF: Time a block of code as one stage of the pipeline
+def timed_stage(stage, **labels):
+    return stage_histogram(stage, **labels).time()
+
+# DEF: Summary of the stage latency histograms
+def stage_summary():
+    output = "\n== Stage Latency Summary (ms)\n"
+    for entry in METRICS.snapshot()["histograms"]:
+        if entry["name"] != "stage_seconds" or not entry["count"]:
+            continue
+        labels = ", ".join(f"{k}={v}" for k, v in entry["labels"].items())
+        output += (f"{labels}: n={entry['count']}, mean={entry['mean'] * 1000:.1f}, p50={entry['p50'] * 1000:.1f}, "
+                   f"p95={entry['p95'] * 1000:.1f}, p99={entry['p99'] * 1000:.1f}, max={entry['max'] * 1000:.1f}\n")
+    return output.strip()
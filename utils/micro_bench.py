@@ -0,0 +1,434 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import cycle
+
+from utils.timer import Timer
+from utils.replay_bench import synthetic_frames
+
+# Baseline results committed with the repo, compare fails when a case is slower than this by more than its tolerance
+BASELINE_PATH = 'benchmarks/baseline.json'
+
+# Allowed slowdown per case before compare fails (0.25 = 25%)
+# Wider for the cases that measure the disk more than the code (fsync per commit, appends) and for sub-microsecond calls
+TOLERANCES = {
+    "timer": 0.5,
+    "extract": 0.25,
+    "save_analysis": 0.5,
+    "read_log": 0.25,
+    "save_analysis_db": 0.5,
+    "filter_entries": 0.3,
+    "query_page": 0.3,
+}
+DEFAULT_TOLERANCE = 0.25
+
+# Each round runs at least this long (calls are batched until it does), the median round is kept
+MIN_ROUND_SECONDS = 0.2
+
+# Generated inputs (databases, logs) are cached here between runs
+DATA_DIR = 'bench_data'
+
+# Database sizes for the SQLite cases, the full suite adds 1M and 10M rows (built once, then cached)
+DEFAULT_SIZES = (10_000,)
+FULL_SIZES = (10_000, 1_000_000, 10_000_000)
+
+# Records in the generated JSON Lines log
+LOG_RECORDS = 200_000
+
+# Generated databases hold rows spread over this many days, ending on a fixed date (deterministic)
+DB_DAYS = 30
+DB_END = datetime(2025, 1, 31)
+
+GENDERS = ("Man", "Woman")
+RACES = ("white", "black", "asian", "latino hispanic", "middle eastern", "indian")
+
+# -----------------------------------
+
+# DEF: Discard prints from the measured functions (save_analysis, save_analysis_db print per call)
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+# DEF: Time func in batches of calls
+# A batch is number calls, or a multiple of it if that would take less than min_time
+# (below it, timer resolution and scheduling noise dominate)
+# Returns list of seconds per call, one per round, and the batch size
+def measure(func, number, repeat, min_time=MIN_ROUND_SECONDS):
+    start = time.perf_counter()
+    func()
+    once = time.perf_counter() - start
+    if once > 0:
+        number *= max(1, math.ceil(min_time / (once * number)))
+
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return rounds, number
+
+# DEF: Median of a list of numbers
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+# DEF: Short label for a row count (10k, 1M, 10M)
+def size_label(size):
+    if size >= 1_000_000:
+        return f"{size // 1_000_000}M"
+    if size >= 1_000:
+        return f"{size // 1_000}k"
+    return str(size)
+
+# -----------------------------------
+
+# DEF: Build a face_data database with rows spread over DB_DAYS days (seeded, so every build is identical)
+# Cached in DATA_DIR, only built if missing
+# Returns the database path
+def synthetic_db(rows, data_dir=DATA_DIR, seed=0):
+    from utils.db_utils import init_db, insert_rows
+
+    path = os.path.join(data_dir, f"faces_{size_label(rows)}.db")
+    if os.path.exists(path):
+        return path
+
+    print(f"Building {path} ({rows} rows)...")
+    temp_path = path + ".part"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    with quiet():
+        init_db(temp_path)
+
+    rng = random.Random(seed)
+    start = DB_END - timedelta(days=DB_DAYS)
+    step = DB_DAYS * 86400 / rows
+    conn = sqlite3.connect(temp_path)
+    conn.execute("PRAGMA synchronous = OFF")
+    for chunk_start in range(0, rows, 100_000):
+        chunk = [(
+            (start + timedelta(seconds=i * step)).isoformat(),
+            rng.randint(5, 80),
+            rng.choice(GENDERS),
+            rng.choice(RACES),
+            None,
+            rng.randint(0, 3),
+            None
+        ) for i in range(chunk_start, min(rows, chunk_start + 100_000))]
+        insert_rows(conn, chunk)
+        conn.commit()
+    conn.close()
+    os.replace(temp_path, path)
+    return path
+
+# DEF: Write a JSON Lines analysis log of seeded records (cached in DATA_DIR)
+# Returns the log path
+def synthetic_log(records=LOG_RECORDS, data_dir=DATA_DIR, seed=0):
+    path = os.path.join(data_dir, f"analysis_{size_label(records)}.jsonl")
+    if os.path.exists(path):
+        return path
+
+    print(f"Building {path} ({records} records)...")
+    rng = random.Random(seed)
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        for i in range(records):
+            f.write(json.dumps({
+                "timestamp": (DB_END + timedelta(seconds=i)).isoformat(),
+                "age": rng.randint(5, 80),
+                "gender": rng.choice(GENDERS),
+                "race": rng.choice(RACES),
+                "cam_id": rng.randint(0, 3),
+                "region": {"x": rng.randint(0, 1000), "y": rng.randint(0, 600), "w": 120, "h": 120}
+            }) + "\n")
+    os.replace(path + ".part", path)
+    return path
+
+# DEF: Seeded analysis result, as passed to save_analysis / save_analysis_db
+def synthetic_result(rng):
+    return {
+        "age": rng.randint(5, 80),
+        "dominant_gender": rng.choice(GENDERS),
+        "dominant_race": rng.choice(RACES),
+        "cam_id": rng.randint(0, 3),
+        "region": {"x": rng.randint(0, 1000), "y": rng.randint(0, 600), "w": 120, "h": 120}
+    }
+
+# -----------------------------------
+# Cases: each yields (case name, function to time, calls per round (at least), database rows or None)
+
+# CASE: Timer start() + stop() overhead
+def case_timer(options):
+    timer = Timer(label="bench", verbose=False)
+
+    # DEF: One timed (empty) run
+    def run():
+        timer.start()
+        timer.stop()
+
+    yield "timer", run, 10_000, None
+
+# CASE: HybridModel.extract (Haar) on 1280x720 frames with drawn faces
+def case_extract(options):
+    from intellai_hybrid import HybridModel
+
+    model = HybridModel()
+    # Rounds are a whole number of passes over the frames, so every round times the same frames
+    frames = cycle(list(synthetic_frames(5, faces_per_frame=2, face_folder=options["face_folder"])))
+    yield "extract", lambda: model.extract(next(frames)), 5, None
+
+# CASE: save_analysis appending to a large JSON Lines log (a copy of the generated one)
+def case_save_analysis(options):
+    from utils.model_utils import save_analysis, get_analysis_log, close_analysis_logs
+
+    log_path = os.path.join(options["work_dir"], "save_analysis.jsonl")
+    shutil.copyfile(synthetic_log(data_dir=options["data_dir"]), log_path)
+    rng = random.Random(0)
+    results = cycle([synthetic_result(rng) for _ in range(100)])
+    # Rotation would start a new (small) file part way through
+    get_analysis_log(log_path).max_bytes = None
+
+    yield "save_analysis", lambda: save_analysis(next(results), log_path), 2_000, None
+    close_analysis_logs()
+    os.remove(log_path)
+
+# CASE: Reading every record of a large JSON Lines log
+def case_read_log(options):
+    from utils.jsonl_log import iter_records
+
+    log_path = synthetic_log(data_dir=options["data_dir"])
+
+    # DEF: One pass over the log
+    def run():
+        for _ in iter_records(log_path, include_rotated=False):
+            pass
+
+    yield f"read_log[{size_label(LOG_RECORDS)}]", run, 1, None
+
+# CASE: save_analysis_db (one connection and commit per result) into databases of each size
+# Writes into a copy, so the cached databases stay as generated
+def case_save_analysis_db(options):
+    from utils.db_utils import save_analysis_db
+
+    rng = random.Random(0)
+    results = cycle([synthetic_result(rng) for _ in range(100)])
+    for size in options["sizes"]:
+        db_path = os.path.join(options["work_dir"], f"save_{size_label(size)}.db")
+        source = sqlite3.connect(synthetic_db(size, options["data_dir"]))
+        target = sqlite3.connect(db_path)
+        source.backup(target)
+        source.close()
+        target.close()
+        yield f"save_analysis_db[{size_label(size)}]", lambda: save_analysis_db(next(results), db_path=db_path), 100, size
+        os.remove(db_path)
+
+# CASE: filter_entries (one day, one gender, an age range) on databases of each size
+def case_filter_entries(options):
+    from utils.db_utils import filter_entries
+
+    for size in options["sizes"]:
+        db_path = synthetic_db(size, options["data_dir"])
+        days = cycle(range(1, DB_DAYS))
+
+        # DEF: Filter one day (a different one each call)
+        def run():
+            start = DB_END - timedelta(days=next(days))
+            filter_entries("Woman", None, 20, 40, start.isoformat(), (start + timedelta(days=1)).isoformat(), db_path=db_path)
+
+        yield f"filter_entries[{size_label(size)}]", run, 5, size
+
+# CASE: query_page (first page of the database viewer, newest first, gender filter) on databases of each size
+def case_query_page(options):
+    from utils.db_utils import query_page
+
+    for size in options["sizes"]:
+        db_path = synthetic_db(size, options["data_dir"])
+        yield f"query_page[{size_label(size)}]", lambda: query_page(gender="Man", db_path=db_path), 20, size
+
+CASES = {
+    "timer": case_timer,
+    "extract": case_extract,
+    "save_analysis": case_save_analysis,
+    "read_log": case_read_log,
+    "save_analysis_db": case_save_analysis_db,
+    "filter_entries": case_filter_entries,
+    "query_page": case_query_page,
+}
+
+# -----------------------------------
+
+# DEF: Run benchmark cases
+# Each case is timed in repeat rounds of batched calls and the median round is kept
+# A case that raises is recorded with its error (compare fails on it), e.g. extract without OpenCV's Haar cascades
+# Returns dict of case name to {"case", "size", "seconds": median seconds per call, "rounds", "number", "tolerance"} or {"case", "error"}
+def run_cases(cases=None, sizes=DEFAULT_SIZES, repeat=7, data_dir=DATA_DIR, face_folder=None):
+    os.makedirs(data_dir, exist_ok=True)
+    work_dir = os.path.join(data_dir, "work")
+    os.makedirs(work_dir, exist_ok=True)
+    options = {"sizes": sizes, "data_dir": data_dir, "work_dir": work_dir, "face_folder": face_folder}
+
+    results = {}
+    for case in cases or CASES:
+        try:
+            for name, func, number, size in CASES[case](options):
+                with quiet():
+                    func()
+                    rounds, number = measure(func, number, repeat)
+                results[name] = {
+                    "case": case,
+                    "size": size,
+                    "seconds": median(rounds),
+                    "rounds": rounds,
+                    "number": number,
+                    "tolerance": TOLERANCES.get(case, DEFAULT_TOLERANCE),
+                }
+                print(f"{name:<28} {results[name]['seconds'] * 1000:>10.4f} ms")
+        except Exception as e:
+            print(f"Case {case} failed: {e}")
+            results[case] = {"case": case, "error": f"{type(e).__name__}: {e}"}
+    return results
+
+# DEF: Describe the machine results were taken on (baselines only compare well on the same kind of machine)
+def environment():
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+    }
+
+# DEF: Baseline cases a run of the given cases and sizes should cover (None = every case / size)
+def expected_cases(baseline, cases=None, sizes=None):
+    return {
+        name for name, entry in baseline.items()
+        if (cases is None or entry.get("case") in cases) and (sizes is None or entry.get("size") is None or entry["size"] in sizes)
+    }
+
+# DEF: Compare results against a baseline
+# Each case may be slower than its baseline by its own tolerance (stored with the baseline), threshold overrides them all
+# A case that crashed, or a baseline case the run should have covered but did not, fails
+# Returns list of (case, baseline seconds, current seconds, change, tolerance, status) and whether anything failed
+def compare(baseline, results, threshold=None, cases=None, sizes=None):
+    expected = expected_cases(baseline, cases, sizes)
+    rows = []
+    failed = False
+    for name in sorted(expected | set(results)):
+        entry = baseline.get(name, {})
+        result = results.get(name)
+        before = entry.get("seconds")
+        tolerance = threshold if threshold is not None else entry.get("tolerance", TOLERANCES.get(entry.get("case"), DEFAULT_TOLERANCE))
+        if result is None:
+            rows.append((name, before, None, None, tolerance, "NOT RUN"))
+            failed = True
+            continue
+        if "error" in result:
+            rows.append((name, before, None, None, tolerance, f"CRASHED ({result['error']})"))
+            failed = True
+            continue
+        after = result["seconds"]
+        if before is None:
+            rows.append((name, None, after, None, tolerance, "new"))
+            continue
+        change = after / before - 1
+        if change > tolerance:
+            status = "REGRESSED"
+            failed = True
+        elif change < -tolerance:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, before, after, change, tolerance, status))
+    return rows, failed
+
+# DEF: Print a comparison table
+def print_comparison(rows):
+    print(f"{'Case':<28} {'Baseline (ms)':>14} {'Current (ms)':>13} {'Change':>8} {'Allowed':>8}  Status")
+    for name, before, after, change, tolerance, status in rows:
+        before = f"{before * 1000:.4f}" if before is not None else "-"
+        after = f"{after * 1000:.4f}" if after is not None else "-"
+        change = f"{change * 100:+.1f}%" if change is not None else "-"
+        print(f"{name:<28} {before:>14} {after:>13} {change:>8} {tolerance * 100:>7.0f}%  {status}")
+
+# Main
+# run: run the cases (and optionally save them as the baseline), compare: run (or load) results and compare with the baseline,
+# exits with status 1 if any case regressed beyond its tolerance, crashed, or was in the baseline but not run
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the hot stages on synthetic, deterministic inputs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command in ("run", "compare"):
+        sub = commands.add_parser(command)
+        sub.add_argument("--cases", nargs="+", choices=list(CASES), help="Cases to run (default: all)")
+        sub.add_argument("--sizes", nargs="+", type=int, help=f"Database rows for the SQLite cases (default: run {size_label(DEFAULT_SIZES[0])}, compare the baseline's)")
+        sub.add_argument("--full", action="store_true", help=f"Use every database size ({', '.join(size_label(s) for s in FULL_SIZES)})")
+        sub.add_argument("--repeat", type=int, default=7, help="Rounds per case (the median is kept)")
+        sub.add_argument("--data-dir", default=DATA_DIR, help="Cache for generated databases and logs")
+        sub.add_argument("--face-folder", help="Face images to paste into the extract frames instead of drawn faces")
+        sub.add_argument("--baseline", default=BASELINE_PATH)
+    commands.choices["run"].add_argument("--output", help="Write results to a JSON file")
+    commands.choices["run"].add_argument("--save-baseline", action="store_true", help="Write results to the baseline file")
+    commands.choices["compare"].add_argument("--results", help="Compare a results file instead of running the cases")
+    commands.choices["compare"].add_argument("--threshold", type=float, help="Allowed slowdown for every case (0.25 = 25%%), instead of the per-case tolerances")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.command == "compare":
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"No baseline at {args.baseline} (create one with: python -m utils.micro_bench run --full --save-baseline)")
+            sys.exit(2)
+
+    if args.full:
+        sizes = FULL_SIZES
+    elif args.sizes:
+        sizes = tuple(args.sizes)
+    elif baseline:
+        sizes = tuple(baseline.get("sizes", DEFAULT_SIZES))
+    else:
+        sizes = DEFAULT_SIZES
+
+    if args.command == "compare" and args.results:
+        with open(args.results) as f:
+            report = json.load(f)
+        results = report["results"]
+        sizes = tuple(report.get("sizes", sizes))
+    else:
+        results = run_cases(args.cases, sizes, args.repeat, args.data_dir, args.face_folder)
+
+    if args.command == "run":
+        crashed = [name for name, result in results.items() if "error" in result]
+        report = {"environment": environment(), "sizes": list(sizes), "results": results}
+        for path in [args.output] + ([args.baseline] if args.save_baseline and not crashed else []):
+            if path:
+                if os.path.dirname(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as f:
+                    json.dump(report, f, indent=2)
+                print(f"Results written to {path}")
+        if crashed:
+            print(f"Failed cases: {', '.join(crashed)}" + (" (baseline not saved)" if args.save_baseline else ""))
+            sys.exit(1)
+        return
+
+    rows, failed = compare(baseline["results"], results, args.threshold, args.cases, sizes)
+    print()
+    print_comparison(rows)
+    if failed:
+        print("Failed: at least one case regressed beyond its tolerance, crashed or was not run")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
+import atexit
+import threading
 import cv2
-import os
 from datetime import datetime
-import json
+
+from utils.jsonl_log import JsonlWriter
+
+_analysis_logs = {}
+_analysis_logs_lock = threading.Lock()
 
 # DEF: Open a given camera using OpenCV
 # Default camera ID: 0
@@ -17,31 +22,60 @@ def open_cam(cam_id=0):
         return None
     return cam
 
-# DEF: Save an analysis result to a JSON file
-# Creates JSON file if it doesn't exist, otherwise appends
-def save_analysis(result, output_file='./analysis/generic_analysis.json'):
+# DEF: Get a per-camera setting
+# cam_settings maps camera ID to a dict of settings, e.g. {0: {"detector": "yunet"}}
+# Returns default if the camera or setting is not configured
+def get_cam_setting(cam_settings, cam_id, key, default=None):
+    if not cam_settings:
+        return default
+    return cam_settings.get(cam_id, {}).get(key, default)
+
+# DEF: Get the JSON Lines writer for an analysis log
+# One writer per file, kept open for the life of the process (shared by the capture / inference threads)
+def get_analysis_log(output_file):
+    with _analysis_logs_lock:
+        writer = _analysis_logs.get(output_file)
+        if writer is None:
+            writer = JsonlWriter(output_file)
+            _analysis_logs[output_file] = writer
+        return writer
+
+# DEF: Flush and close all open analysis logs
+def close_analysis_logs():
+    with _analysis_logs_lock:
+        writers = list(_analysis_logs.values())
+        _analysis_logs.clear()
+    for writer in writers:
+        writer.close()
+
+atexit.register(close_analysis_logs)
+
+# Saved attribute fields and the result keys they come from
+ATTRIBUTE_FIELDS = (("age", "age"), ("gender", "dominant_gender"), ("race", "dominant_race"))
+
+# DEF: Save an analysis result to a JSON Lines file
+# Appends one line per result (buffered), the file is rotated and compressed as it grows
+# Attributes that were not analysed (see the models' actions) are left out of the line
+def save_analysis(result, output_file='./analysis/generic_analysis.jsonl'):
     # Save selected fields + timestamp
-    if not os.path.exists(output_file):
-        # Create the directory if it doesn't exist
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        # Create an empty JSON file
-        with open(output_file, "w") as f:
-            f.write("[]\n")
-
-    trimmed_analysis = {
-        "timestamp": datetime.now().isoformat(), 
-        "age": result.get("age", "Unknown"), 
-        "gender": result.get("dominant_gender", "Unknown"), 
-        "race": result.get("dominant_race", "Unknown")
-    }
+    trimmed_analysis = {"timestamp": datetime.now().isoformat()}
+    for field, key in ATTRIBUTE_FIELDS:
+        if key in result:
+            trimmed_analysis[field] = result[key]
+    trimmed_analysis["cam_id"] = result.get("cam_id")
+    trimmed_analysis["region"] = result.get("region")
+    if result.get("embedding_id") is not None:
+        trimmed_analysis["embedding_id"] = result["embedding_id"]
+    if result.get("image_path"):
+        trimmed_analysis["image_path"] = result["image_path"]
 
     try:
-        with open(output_file, "r+") as f:
-            data = json.load(f)
-            data.append(trimmed_analysis)
-            f.seek(0)
-            json.dump(data, f, indent=2)
-            f.truncate()
+        get_analysis_log(output_file).write(trimmed_analysis)
         print("Analysis Saved:", trimmed_analysis)
     except Exception as e:
-        print("Save Analysis Error:", e)
\ No newline at end of file
+        print("Save Analysis Error:", e)
+
+# DEF: Describe the analysed attributes of a result (for status updates)
+def describe_result(result):
+    parts = [f"{field.capitalize()} - {result[key]}" for field, key in ATTRIBUTE_FIELDS if key in result]
+    return ", ".join(parts) if parts else "No attributes analysed"
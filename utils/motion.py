@@ -0,0 +1,108 @@
+import time
+
+import cv2
+
+from utils.model_utils import get_cam_setting
+
+# -----------------------------------
+
+# CLASS: Cheap per-camera motion detector used to gate face detection
+# Works on a downscaled grayscale copy of every frame, using MOG2 background subtraction or frame differencing
+# A frame counts as motion when the changed share of the (optional) region passes min_area
+class MotionGate:
+    def __init__(self, method='mog2', width=320, min_area=0.005, threshold=25, history=500, var_threshold=16,
+                 hold_time=2.0, region=None):
+        self.method = method
+        self.width = width
+        self.min_area = min_area
+        self.threshold = threshold
+        self.hold_time = hold_time
+        self.region = region
+
+        if method == 'mog2':
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(history=history, varThreshold=var_threshold, detectShadows=False)
+        elif method == 'diff':
+            self.subtractor = None
+            self.previous = None
+        else:
+            raise ValueError(f"Unknown motion method: {method}")
+
+        self.last_motion = None
+        self.frames = 0
+        self.motion_frames = 0
+        self.triggered = 0
+        self.skipped = 0
+
+    # DEF: Downscale a frame to gray at the gate's working width
+    # Returns the small frame and the scale applied
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.width / w)
+        small = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0), scale
+
+    # DEF: Update the gate with a new frame (call on every frame)
+    # Returns True if the frame has motion
+    def update(self, frame, timestamp=None):
+        timestamp = timestamp if timestamp is not None else time.time()
+        gray, scale = self._prepare(frame)
+        self.frames += 1
+
+        if self.subtractor is not None:
+            mask = self.subtractor.apply(gray)
+        else:
+            if self.previous is None or self.previous.shape != gray.shape:
+                self.previous = gray
+                return False
+            diff = cv2.absdiff(self.previous, gray)
+            self.previous = gray
+            _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+
+        if self.region is not None:
+            x, y, w, h = (int(v * scale) for v in self.region)
+            mask = mask[y:y+h, x:x+w]
+
+        moving = mask.size > 0 and cv2.countNonZero(mask) >= self.min_area * mask.size
+        if moving:
+            self.motion_frames += 1
+            self.last_motion = timestamp
+        return moving
+
+    # DEF: Check whether the camera had motion within hold_time seconds
+    # Counts the decision as a triggered or skipped analysis
+    def should_analyse(self, timestamp=None):
+        timestamp = timestamp if timestamp is not None else time.time()
+        active = self.last_motion is not None and timestamp - self.last_motion <= self.hold_time
+        if active:
+            self.triggered += 1
+        else:
+            self.skipped += 1
+        return active
+
+    # DEF: Summary line of the gate's counters
+    def summary(self):
+        return f"Frames: {self.frames}, Motion frames: {self.motion_frames}, Triggered: {self.triggered}, Skipped: {self.skipped}"
+
+# DEF: Build one motion gate per camera
+# motion: default gate options (True or a dict), None/False disables gating
+# cam_settings: per-camera overrides under the "motion" key, e.g. {0: {"motion": {"min_area": 0.02}}}, False disables a camera's gate
+# Returns dict of cam ID to MotionGate (cameras without a gate are always analysed)
+def build_motion_gates(cam_ids, motion=None, cam_settings=None):
+    gates = {}
+    for cam_id in cam_ids:
+        override = get_cam_setting(cam_settings, cam_id, "motion")
+        if override is False or (override is None and not motion):
+            continue
+        options = dict(motion) if isinstance(motion, dict) else {}
+        if isinstance(override, dict):
+            options.update(override)
+        gates[cam_id] = MotionGate(**options)
+    return gates
+
+# DEF: Summary of all motion gates
+def motion_summary(gates):
+    output = "\n== Motion Gate Summary\n"
+    for cam_id, gate in gates.items():
+        output += f"Cam {cam_id}: {gate.summary()}\n"
+    return output.strip()
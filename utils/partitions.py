@@ -0,0 +1,398 @@
+import argparse
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from utils.rollups import drop_rollup_days, rollup_trigger_statements
+
+# face_data is a view over one table per day (face_data_YYYYMMDD), listed in the catalogue table
+# Inserts into the view are routed to their day's partition by an INSTEAD OF trigger
+VIEW = "face_data"
+PARTITION_PREFIX = "face_data_"
+CATALOGUE = "face_partitions"
+INSERT_TRIGGER = "face_data_insert"
+# Old -> new row IDs of a migrated pre-partitioning table
+ID_MAP = "face_id_map"
+
+# The insert trigger routes to the newest this many partitions (today, tomorrow and the days before),
+# so it stays the same size however many days the database holds. Older days are written with insert_partitioned()
+TRIGGER_PARTITIONS = 7
+
+# Row IDs of a day's partition start at YYYYMMDD * ID_SPAN, so IDs keep growing across partitions
+ID_SPAN = 10 ** 8
+
+# SQLite allows at most 500 terms per compound SELECT, the view unions partitions in chunks of this many
+VIEW_CHUNK = 400
+
+COLUMNS = ("id", "timestamp", "age", "gender", "race", "image_path", "cam_id", "embedding_id")
+
+# Indexes for the viewer filters and sort orders, created on every partition
+# One per sort column (keyset pagination walks "ORDER BY column, id"), led by the equality filters it can serve:
+# gender and/or race filters, sorted by timestamp, age, gender, race or id
+INDEXES = {
+    "timestamp_id": "timestamp, id",
+    "gender_timestamp_id": "gender, timestamp, id",
+    "race_timestamp_id": "race, timestamp, id",
+    "gender_race_timestamp_id": "gender, race, timestamp, id",
+    "age_id": "age, id",
+    "gender_age_id": "gender, age, id",
+    "race_age_id": "race, age, id",
+    "gender_race_age_id": "gender, race, age, id",
+    "gender_id": "gender, id",
+    "race_id": "race, id",
+    "gender_race_id": "gender, race, id",
+    "race_gender_id": "race, gender, id",
+    "embedding": "embedding_id",
+}
+
+# Indexes of earlier versions (not led by the sort column or without the id tie-break), dropped on init
+OBSOLETE_INDEXES = ("timestamp", "gender", "gender_race", "race", "age")
+
+# -----------------------------------
+
+# DEF: Name of the partition holding a timestamp (ISO string)
+def partition_name(timestamp):
+    return PARTITION_PREFIX + timestamp[:10].replace("-", "")
+
+# DEF: ISO date (YYYY-MM-DD) of a partition
+def partition_day(name):
+    day = name[len(PARTITION_PREFIX):]
+    return f"{day[:4]}-{day[4:6]}-{day[6:]}"
+
+# DEF: Time range of a partition, as ISO strings (start inclusive, end exclusive)
+def partition_bounds(name):
+    day = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d")
+    return day.isoformat(), (day + timedelta(days=1)).isoformat()
+
+# DEF: First row ID of a partition
+def partition_base_id(name):
+    return int(name[len(PARTITION_PREFIX):]) * ID_SPAN
+
+# DEF: Create the partition catalogue and the face_data view
+# Databases from before partitioning have a face_data table, its rows are moved into partitions
+# Returns True if a legacy table was migrated
+def init_partitions(cursor):
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {CATALOGUE} (
+            name TEXT PRIMARY KEY,
+            start TEXT NOT NULL,
+            end TEXT NOT NULL
+        )
+    ''')
+
+    row = cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (VIEW,)).fetchone()
+    migrated = bool(row and row[0] == "table")
+    if migrated:
+        migrate_legacy(cursor)
+    elif row is None or cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (INSERT_TRIGGER,)).fetchone() is None:
+        rebuild_view(cursor)
+    # Partitions of earlier versions get the current indexes (a no-op once they have them)
+    for name, _, _ in list_partitions(cursor):
+        create_indexes(cursor, name)
+    ensure_current_partitions(cursor)
+    return migrated
+
+# DEF: Create a partition table with its indexes
+def create_partition(cursor, name):
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT,
+            age INTEGER,
+            gender TEXT,
+            race TEXT,
+            image_path TEXT,
+            cam_id INTEGER,
+            embedding_id INTEGER
+        )
+    ''')
+    create_indexes(cursor, name)
+    start, end = partition_bounds(name)
+    cursor.execute(f"INSERT OR IGNORE INTO {CATALOGUE} (name, start, end) VALUES (?, ?, ?)", (name, start, end))
+
+# DEF: Create a partition's indexes, replacing those of earlier versions
+def create_indexes(cursor, name):
+    for suffix in OBSOLETE_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{name}_{suffix}")
+    for suffix, columns in INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_{suffix} ON {name} ({columns})")
+
+# DEF: Get the partition for a timestamp, creating it (and adding it to the view) if needed
+# Returns the partition name
+def ensure_partition(cursor, timestamp):
+    name = partition_name(timestamp)
+    if cursor.execute(f"SELECT 1 FROM {CATALOGUE} WHERE name = ?", (name,)).fetchone() is None:
+        create_partition(cursor, name)
+        rebuild_view(cursor)
+    return name
+
+# DEF: Create today's and tomorrow's partitions if needed
+# Plain INSERTs into face_data (other tools, the sqlite3 shell) need their day's partition to exist already,
+# this runs on init_db() and with every retention pass
+def ensure_current_partitions(cursor, now=None):
+    now = now or datetime.now()
+    for day in (now, now + timedelta(days=1)):
+        ensure_partition(cursor, day.isoformat())
+
+# DEF: Recreate the face_data view over every partition in the catalogue, and its insert trigger
+# Runs when a partition is created or dropped, not per insert
+def rebuild_view(cursor):
+    names = [row[0] for row in cursor.execute(f"SELECT name FROM {CATALOGUE} ORDER BY start")]
+    columns = ", ".join(COLUMNS)
+    if not names:
+        # Same columns, no rows
+        select = "SELECT " + ", ".join(f"NULL AS {column}" for column in COLUMNS) + " LIMIT 0"
+    else:
+        chunks = []
+        for i in range(0, len(names), VIEW_CHUNK):
+            chunk = " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in names[i:i + VIEW_CHUNK])
+            chunks.append(f"SELECT * FROM ({chunk})" if len(names) > VIEW_CHUNK else chunk)
+        select = " UNION ALL ".join(chunks)
+    cursor.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    cursor.execute(f"CREATE VIEW {VIEW} AS {select}")
+    create_insert_trigger(cursor, names[-TRIGGER_PARTITIONS:])
+
+# DEF: Create the INSTEAD OF INSERT trigger that routes rows inserted into the face_data view to their day's partition
+# For ad-hoc inserts (other tools, the sqlite3 shell), the writer inserts into the partitions directly (insert_partitioned())
+# names: the partitions to route to, a row for any other day is rejected. The day is the timestamp's first 10 characters
+# (as partition_name()). Rows without an ID get the partition's next ID, and every row is added to the rollups
+def create_insert_trigger(cursor, names):
+    values = ", ".join(f"NEW.{column}" for column in COLUMNS[1:])
+    days = ", ".join(f"'{partition_day(name)}'" for name in names)
+    statements = [f'''
+        SELECT RAISE(ABORT, 'face_data: no recent partition for this timestamp, run init_db() or use insert_partitioned()')
+        WHERE NEW.timestamp IS NULL OR substr(NEW.timestamp, 1, 10) NOT IN ({days or 'NULL'});''']
+    for name in names:
+        statements.append(f'''
+        INSERT INTO {name} ({', '.join(COLUMNS)})
+        SELECT COALESCE(NEW.id, (SELECT COALESCE(MAX(id), {partition_base_id(name)}) + 1 FROM {name})), {values}
+        WHERE substr(NEW.timestamp, 1, 10) = '{partition_day(name)}';''')
+    statements += rollup_trigger_statements()
+    cursor.execute(f"DROP TRIGGER IF EXISTS {INSERT_TRIGGER}")
+    cursor.execute(f"CREATE TRIGGER {INSERT_TRIGGER} INSTEAD OF INSERT ON {VIEW} BEGIN{''.join(statements)}\n    END")
+
+# DEF: List the partitions overlapping a time range (ISO strings, end exclusive, None = open)
+# Returns list of (name, start, end), oldest first unless newest_first
+def list_partitions(cursor, start=None, end=None, newest_first=False):
+    query = f"SELECT name, start, end FROM {CATALOGUE}"
+    filters, params = [], []
+    if start is not None:
+        filters.append("end > ?")
+        params.append(start)
+    if end is not None:
+        filters.append("start < ?")
+        params.append(end)
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    query += " ORDER BY start DESC" if newest_first else " ORDER BY start"
+    return cursor.execute(query, params).fetchall()
+
+# DEF: FROM source for a query over a time range
+# Returns the face_data view when the range is open, otherwise a union of only the overlapping partitions
+def partition_source(cursor, start=None, end=None):
+    if start is None and end is None:
+        return VIEW
+    names = [name for name, _, _ in list_partitions(cursor, start, end)]
+    if not names:
+        return f"(SELECT * FROM {VIEW} LIMIT 0)"
+    if len(names) > VIEW_CHUNK:
+        # Too many for one compound SELECT, the view covers them
+        return VIEW
+    columns = ", ".join(COLUMNS)
+    return "(" + " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in names) + ")"
+
+# DEF: Insert face_data rows into their partitions, in the caller's transaction
+# rows: tuples of (timestamp, age, gender, race, image_path, cam_id, embedding_id), each goes to its timestamp's partition
+def insert_partitioned(cursor, rows):
+    partitions = {}
+    for row in rows:
+        partitions.setdefault(partition_name(row[0]), []).append(row)
+
+    for name, partition_rows in partitions.items():
+        ensure_partition(cursor, partition_rows[0][0])
+        # IDs continue from the partition's last row, or start at its base ID
+        cursor.executemany(f'''
+            INSERT INTO {name} (id, timestamp, age, gender, race, image_path, cam_id, embedding_id)
+            VALUES ((SELECT COALESCE(MAX(id), {partition_base_id(name)}) + 1 FROM {name}), ?, ?, ?, ?, ?, ?, ?)
+        ''', partition_rows)
+
+# DEF: Drop partitions and remove them from the view
+# Their days' rollup buckets go with them (a partition holds every row of its day, so the buckets held exactly its rows)
+def drop_partitions(cursor, names):
+    for name in names:
+        cursor.execute(f"DROP TABLE IF EXISTS {name}")
+        cursor.execute(f"DELETE FROM {CATALOGUE} WHERE name = ?", (name,))
+    drop_rollup_days(cursor, [partition_day(name) for name in names])
+    rebuild_view(cursor)
+
+# DEF: Move the rows of a pre-partitioning face_data table into day partitions
+# Rows are renumbered from their partition's base ID (in their old ID order), so IDs keep growing across partitions
+# and new rows of a migrated day continue after them. Rows without a timestamp go to the oldest partition
+# Every old ID is kept in the face_id_map table (old_id -> new_id), for anything that stored the old IDs
+def migrate_legacy(cursor):
+    legacy = "face_data_legacy"
+    cursor.execute(f"ALTER TABLE {VIEW} RENAME TO {legacy}")
+
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({legacy})")]
+    selected = ", ".join(column if column in columns else f"NULL AS {column}" for column in COLUMNS[1:])
+    days = [row[0] for row in cursor.execute(f"SELECT DISTINCT substr(timestamp, 1, 10) FROM {legacy} WHERE timestamp IS NOT NULL ORDER BY 1")]
+    total = cursor.execute(f"SELECT COUNT(*) FROM {legacy}").fetchone()[0]
+    if total and not days:
+        # Only rows without a timestamp, they go to today's partition
+        days = [datetime.now().strftime("%Y-%m-%d")]
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {ID_MAP} (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL UNIQUE)")
+    for i, day in enumerate(days):
+        name = partition_name(day)
+        create_partition(cursor, name)
+        next_day = (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        # Date range on the prefix (any time format within the day), so the legacy timestamp index finds each day's rows
+        condition = "(timestamp >= ? AND timestamp < ?)" + (" OR timestamp IS NULL" if i == 0 else "")
+        cursor.execute(f'''
+            INSERT INTO {ID_MAP} (old_id, new_id)
+            SELECT id, {partition_base_id(name)} + ROW_NUMBER() OVER (ORDER BY id) FROM {legacy} WHERE {condition}
+        ''', (day, next_day))
+        cursor.execute(f'''
+            INSERT INTO {name} ({', '.join(COLUMNS)})
+            SELECT {ID_MAP}.new_id, {selected} FROM {legacy} JOIN {ID_MAP} ON {ID_MAP}.old_id = {legacy}.id
+            WHERE {condition}
+        ''', (day, next_day))
+
+    cursor.execute(f"DROP TABLE {legacy}")
+    rebuild_view(cursor)
+    print(f"Migrated {total} rows into {len(days)} partitions (renumbered from each day's base ID, old IDs in {ID_MAP})")
+
+# -----------------------------------
+
+# DEF: Drop every partition whose whole day is older than max_age_days
+# DDL only, so the write lock is held for milliseconds however many rows the partitions held
+# Returns list of dropped partition names
+def apply_retention(db_path, max_age_days, now=None):
+    cutoff = ((now or datetime.now()) - timedelta(days=max_age_days)).isoformat()
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        with conn:
+            names = [name for name, _, end in list_partitions(conn, end=cutoff) if end <= cutoff]
+            if names:
+                drop_partitions(conn, names)
+            ensure_current_partitions(conn, now)
+        conn.close()
+    except sqlite3.Error as e:
+        print("Retention Error:", e)
+        return []
+    for name in names:
+        print(f"Retention: dropped {name}")
+    return names
+
+# DEF: Return free pages to the file system a few at a time (needs auto_vacuum=INCREMENTAL)
+# Each step is its own short transaction, so writers only wait for one step at a time
+# Returns the number of pages freed
+def incremental_vacuum(db_path, step_pages=256, max_steps=None, pause=0.01):
+    freed = 0
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("Vacuum Error: auto_vacuum is not INCREMENTAL (run: python -m utils.partitions vacuum --full)")
+            conn.close()
+            return 0
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free == 0:
+                break
+            # executescript steps the pragma to completion (execute() frees a single page)
+            conn.executescript(f"PRAGMA incremental_vacuum({int(step_pages)});")
+            step_freed = free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if step_freed <= 0:
+                break
+            freed += step_freed
+            steps += 1
+            time.sleep(pause)
+        conn.close()
+    except sqlite3.Error as e:
+        print("Vacuum Error:", e)
+    return freed
+
+# DEF: Rebuild the file with auto_vacuum=INCREMENTAL (one-off, locks the database while it runs)
+def full_vacuum(db_path):
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.close()
+        return True
+    except sqlite3.Error as e:
+        print("Vacuum Error:", e)
+        return False
+
+# CLASS: Background retention for a live database
+# Every interval seconds, drops the partitions older than max_age_days and vacuums the freed pages in small steps
+class RetentionWorker:
+    def __init__(self, db_path, max_age_days, interval=3600, step_pages=256):
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        self.interval = interval
+        self.step_pages = step_pages
+
+        self.dropped = 0
+        self.freed_pages = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="retention", daemon=True)
+
+    # DEF: Start the retention thread (runs once straight away)
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.dropped += len(apply_retention(self.db_path, self.max_age_days))
+            self.freed_pages += incremental_vacuum(self.db_path, self.step_pages)
+            self.stopped.wait(self.interval)
+
+    # DEF: Stop the retention thread
+    def stop(self, timeout=5):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+
+    # DEF: Summary of the retention activity
+    def summary(self):
+        output = "\n== Retention Summary\n"
+        output += f"Max age: {self.max_age_days} days\n"
+        output += f"Partitions dropped: {self.dropped}\n"
+        output += f"Pages freed: {self.freed_pages}\n"
+        return output.strip()
+
+# Main
+# list: show the partitions, retention: drop old partitions, vacuum: free unused pages
+def main():
+    parser = argparse.ArgumentParser(description="face_data partitions, retention and vacuum")
+    parser.add_argument("--db", default='db/faces.db')
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the partitions and their row counts")
+    retention = commands.add_parser("retention", help="Drop partitions older than --days")
+    retention.add_argument("--days", type=int, required=True)
+    vacuum = commands.add_parser("vacuum", help="Free unused pages (incrementally)")
+    vacuum.add_argument("--full", action="store_true", help="Full VACUUM, switches older databases to incremental vacuum")
+    args = parser.parse_args()
+
+    from utils.db_utils import init_db
+    init_db(args.db)
+
+    if args.command == "list":
+        conn = sqlite3.connect(args.db)
+        for name, start, end in list_partitions(conn):
+            count = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            print(f"{name}  {start} - {end}  {count} rows")
+        conn.close()
+    elif args.command == "retention":
+        dropped = apply_retention(args.db, args.days)
+        print(f"{len(dropped)} partitions dropped, {incremental_vacuum(args.db)} pages freed")
+    elif args.full:
+        print("Vacuumed" if full_vacuum(args.db) else "Vacuum failed")
+    else:
+        print(f"{incremental_vacuum(args.db)} pages freed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+import time
+from collections import namedtuple
+
+import cv2
+
+from utils.model_utils import open_cam, save_analysis, describe_result, close_analysis_logs
+from utils.timer import Timer
+from utils.capture import CaptureGroup
+from utils.shared_capture import SharedCaptureGroup
+from utils.db_utils import DB_PATH, init_db, save_analysis_db
+from utils.db_writer import DBWriter
+from utils.attributes import FaceBatch, build_cam_actions
+from utils.workers import InferencePool
+from utils.tracker import FaceTracker
+from utils.motion import build_motion_gates, motion_summary
+from utils.scheduler import AnalysisScheduler
+from utils.metrics import METRICS, MetricsServer, timed_stage, stage_summary
+from utils.run_control import RunConfig, RunLimits, DisplayThrottle
+from utils.detection_stage import build_detection_stages
+from utils.embeddings import EmbeddingStore
+from utils.crop_store import CropStore
+from utils.partitions import RetentionWorker
+from utils.result_cache import ResultCache, count_cached, get_result_cache
+
+# -----------------------------------
+
+# A task submitted to the inference workers: shared frames to release once it is done, tracks waiting for its results
+# (by cam ID and face coords), items sent (frames or faces), frames it covers and the time detection took in this process
+WorkerTask = namedtuple("WorkerTask", ["shared", "tracks", "items", "frames", "detect_time"])
+
+# DEF: Finish a worker task (its results are in, or it was given up on)
+# Releases its shared frames and its tracks' pending analyses
+# Returns the WorkerTask, or None if unknown
+def finish_task(capture, tasks, task_id):
+    task = tasks.pop(task_id, None)
+    if task is not None:
+        capture.release(task.shared)
+        for track in task.tracks.values():
+            track.pending -= 1
+    return task
+
+# DEF: Finish the worker tasks the pool has given up on (every task if pool is None)
+def finish_lost_tasks(capture, pool, tasks):
+    for task_id in [task_id for task_id in tasks if pool is None or task_id < pool.next_result_id]:
+        finish_task(capture, tasks, task_id)
+
+# DEF: Add worker results to the tracks they were analysed for
+def add_track_results(tracker, task, results, timestamp):
+    for result in results:
+        region = result["region"]
+        track = task.tracks.get((result["cam_id"], region["x"], region["y"], region["w"], region["h"])) if task else None
+        if track is not None:
+            tracker.add_result(track, result, timestamp)
+
+# CLASS: Face analysis pipeline shared by the Single and Hybrid models
+# Subclasses provide face extraction and attribute analysis:
+# - name / model_type / log_file: run banner, InferencePool model type and analysis log
+# - extract_camera(cam_id, frame, stage, cam_detectors): list of (face image, face coords) in one camera's frame
+# - analyse(face_batch, cam_actions): analysis results of a FaceBatch
+# - warm_up(**kwargs), load_detectors(config) and worker_warm_up(cam_detectors, actions) (optional)
+class FaceModel:
+    name = "MODEL"
+    model_type = None
+    log_file = './analysis/model_analysis.jsonl'
+
+    # DEF: Detector backend per camera ID for a run, loaded before the feed starts (None if the model has no choice)
+    def load_detectors(self, config):
+        return None
+
+    # DEF: warm_up() arguments for the inference workers of a run
+    def worker_warm_up(self, cam_detectors, actions):
+        return {"actions": actions}
+
+    # DEF: Extract and analyse every face in a set of frames (one sampling tick)
+    # frames: list of (cam ID, frame), cam_stages: DetectionStage per camera ID
+    # tracker: optional FaceTracker, only faces whose track needs (re-)analysis are analysed
+    # cam_actions: analysis actions per camera, keep_crops: attach each face crop to its result (stored by save_results)
+    # result_cache: ResultCache (or its options), faces matching a recently analysed crop reuse its result instead of being analysed
+    # cam_detectors: detector backend per camera ID (hybrid model)
+    # Returns list of analysis results
+    def process(self, frames, tracker=None, cam_stages=None, cam_actions=None, keep_crops=False, result_cache=None, cam_detectors=None):
+        timestamp = time.time()
+        faces = self.select_faces(frames, tracker, cam_stages, cam_detectors, timestamp)
+        if not faces:
+            return []
+        analysed = self.analyse_extracted(faces, cam_actions, keep_crops, result_cache)
+        if tracker:
+            for result, (_, _, _, track) in analysed:
+                tracker.add_result(track, result, timestamp)
+        return [result for result, _ in analysed]
+
+    # DEF: Analyse faces extracted elsewhere (worker tasks, when the run loop detects and tracks in the main process)
+    # faces: list of (cam ID, face image, face coords)
+    # Returns list of analysis results
+    def process_faces(self, faces, cam_actions=None, keep_crops=False, result_cache=None):
+        return [result for result, _ in self.analyse_extracted(faces, cam_actions, keep_crops, result_cache)]
+
+    # DEF: Extract the faces of a set of frames and keep those that need analysis
+    # With a tracker, faces are matched to tracks and only those whose track needs (re-)analysis are kept
+    # Returns list of (cam ID, face image, face coords, track or None)
+    def select_faces(self, frames, tracker=None, cam_stages=None, cam_detectors=None, timestamp=None):
+        selected = []
+        for cam_id, frame in frames:
+            with timed_stage("detect", cam=cam_id):
+                faces = self.extract_camera(cam_id, frame, cam_stages.get(cam_id) if cam_stages else None, cam_detectors)
+            tracks = tracker.update(cam_id, [coords for _, coords in faces], timestamp) if tracker else [None] * len(faces)
+            for (face_img, faces_coords), track in zip(faces, tracks):
+                if track is None or tracker.should_analyse(track, timestamp):
+                    selected.append((cam_id, face_img, faces_coords, track))
+        return selected
+
+    # DEF: Analyse extracted faces as one batch, faces matching a cached crop reuse its result
+    # faces: list of (cam ID, face image, face coords, ...), anything after the coords is passed through
+    # Returns list of (result, face) pairs
+    def analyse_extracted(self, faces, cam_actions=None, keep_crops=False, result_cache=None):
+        result_cache = get_result_cache(result_cache)
+        face_batch = FaceBatch()
+        batch_faces = []
+        batch_keys = []
+        cached = []
+        for face in faces:
+            cam_id, face_img, faces_coords = face[:3]
+            if result_cache:
+                result, key = result_cache.get(cam_id, face_img, faces_coords)
+                if result is not None:
+                    cached.append((result, face))
+                    continue
+                batch_keys.append(key)
+            face_batch.add(cam_id, face_img, faces_coords)
+            batch_faces.append(face)
+
+        analysed = []
+        if face_batch:
+            with timed_stage("analyse"):
+                results = self.analyse(face_batch, cam_actions)
+            if results:
+                analysed = list(zip(results, batch_faces))
+            if result_cache:
+                for result, key in zip(results, batch_keys):
+                    result_cache.put(key, result)
+        analysed += cached
+
+        if keep_crops:
+            # Copied, boxes are drawn on the frames before results are saved
+            for result, face in analysed:
+                result["crop"] = face[1].copy()
+        return analysed
+
+    # DEF: Save analysis results (json & DB) and report them
+    # Rows go through db_writer when given, otherwise one direct insert per result
+    # Embeddings go to embedding_store (when given) and their IDs are saved with the rows
+    # Crops go to crop_store (when given) and their paths are saved as image_path
+    def save_results(self, results, update_callback=None, db_writer=None, embedding_store=None, crop_store=None):
+        with timed_stage("persist"):
+            if embedding_store:
+                embedding_store.add_results(results)
+            for result in results:
+                crop = result.pop("crop", None)
+                if crop_store:
+                    result["image_path"] = crop_store.save(crop, result.get("cam_id"), result.get("track_id"))
+                save_analysis(result, self.log_file)
+                if db_writer:
+                    db_writer.write(result, result.get("image_path"))
+                else:
+                    save_analysis_db(result, result.get("image_path"))
+                if update_callback:
+                    update_callback(f"Analysis result (Cam {result['cam_id']}): {describe_result(result)}")
+
+    # DEF: Runs the model
+    # Opens camera(s), extracts faces, analyses faces, saves analysis results (json & DB), prints performance summary
+    # config: RunConfig, options: RunConfig options (override config's when both are given)
+    # The run always stops cleanly: in-flight work is drained, writers are flushed and every camera is released
+    def run_model(self, config=None, update_callback=None, **options):
+        config = config.replace(**options) if config else RunConfig(**options)
+        cam_ids = config.cam_ids
+
+        print("----------------------")
+        print(f"Running Model - {self.name}")
+        print("----------------------")
+
+        # INITS
+        init_db()
+        # Metrics describe one run (the GUI runs the models repeatedly in one process)
+        METRICS.clear()
+
+        if update_callback: update_callback(f"Starting Model: {self.name}")
+        total_timer = Timer(label="Total")
+        analysis_timer = Timer(label="Analysis")
+
+        frame_counter = 0
+        analysis_counter = 0
+        face_counter = 0
+        cached_counter = 0
+        track_counter = 0
+        tracker = FaceTracker(**(config.tracker_options or {})) if config.tracking else None
+        motion_gates = build_motion_gates(cam_ids, config.motion, config.cam_settings)
+        cam_stages = build_detection_stages(cam_ids, config.detection, config.cam_settings)
+        embedding_store = EmbeddingStore(**(config.embeddings if isinstance(config.embeddings, dict) else {})) if config.embeddings else None
+        cam_actions = build_cam_actions(cam_ids, config.actions, config.cam_settings, embed=embedding_store is not None)
+        crop_store = CropStore(**(config.crops if isinstance(config.crops, dict) else {})) if config.crops else None
+        keep_crops = crop_store is not None
+        # Inline analysis shares one cache object, workers get the options
+        result_cache = config.result_cache
+        cache = ResultCache(**(result_cache if isinstance(result_cache, dict) else {})) if result_cache and not config.workers else None
+        cache_option = cache or result_cache or None
+        scheduler = AnalysisScheduler(cam_ids, min_interval=config.frequency / config.framerate, capacity=config.workers or 1, **(config.scheduler_options or {}))
+
+        total_timer.start()
+
+        # LOAD DETECTORS (once, before the feed starts)
+        try:
+            cam_detectors = self.load_detectors(config)
+        except Exception as e:
+            error = f"Run Model Error: Could not load detector. {e}"
+            if update_callback: update_callback(error)
+            print(error)
+            return
+
+        # START INFERENCE WORKERS (optional, each holds warm models)
+        pool = None
+        tasks = {}
+        if config.workers:
+            if update_callback: update_callback(f"Starting {config.workers} inference workers...")
+            warm_up_kwargs = self.worker_warm_up(cam_detectors, set().union(*cam_actions.values()))
+            pool = InferencePool(self.model_type, config.workers, warm_up_kwargs=warm_up_kwargs, **(config.worker_options or {}))
+            try:
+                pool.start()
+                METRICS.gauge("queue_depth", fn=pool.in_flight, queue="inference")
+            except Exception as e:
+                pool.stop()
+                error = f"Run Model Error: Could not start inference workers. {e}"
+                if update_callback: update_callback(error)
+                print(error)
+                return
+
+        # OPEN CAMS
+        if not cam_ids:
+            error = "Run Model Error: No cameras available."
+            if update_callback: update_callback(error)
+            print(error)
+            if pool: pool.stop()
+            return
+        if config.shared_capture:
+            # Capture processes open the cameras and start delivering frames straight away
+            shared_options = config.shared_capture if isinstance(config.shared_capture, dict) else {}
+            capture = SharedCaptureGroup(cam_ids, config.framerate, **shared_options)
+            if not capture.start():
+                error = "Run Model Error: One or more cameras could not be opened."
+                if update_callback: update_callback(error)
+                print(error)
+                if pool: pool.stop()
+                return
+        else:
+            cams = [open_cam(cam_id) for cam_id in cam_ids]
+            if None in cams:
+                error = "Run Model Error: One or more cameras could not be opened."
+                if update_callback: update_callback(error)
+                print(error)
+                for cam in cams:
+                    if cam is not None:
+                        cam.release()
+                if pool: pool.stop()
+                return
+            for cam in cams:
+                cam.set(cv2.CAP_PROP_FPS, config.framerate)
+
+        # START METRICS ENDPOINT (optional)
+        metrics_server = MetricsServer(METRICS, port=config.metrics_port).start() if config.metrics_port else None
+
+        # START DB WRITER (one connection, batched commits off the analysis loop)
+        db_writer = DBWriter().start()
+
+        # START RETENTION (drops old days and vacuums in the background)
+        retention_worker = None
+        if config.retention:
+            retention_options = config.retention if isinstance(config.retention, dict) else {"max_age_days": config.retention}
+            retention_worker = RetentionWorker(DB_PATH, **retention_options).start()
+
+        # START CAPTURE (one thread per camera, the loop always gets the freshest frame)
+        if not config.shared_capture:
+            capture = CaptureGroup(dict(zip(cam_ids, cams)))
+            capture.start()
+
+        limits = RunLimits(config.max_frames, config.max_duration, config.max_faces, config.stop_event)
+        throttle = DisplayThrottle(config.display_fps)
+
+        # LIVE CAM FEED
+        while True:
+            latest = capture.read_latest()
+            if not latest and capture.ended():
+                error = "Run Model Error: No cameras are delivering frames."
+                if update_callback: update_callback(error)
+                print(error)
+                break
+
+            frames = [(cam_id, frame) for cam_id, _, _, frame in latest]
+            annotated = {}
+            frame_counter += len(frames)
+            METRICS.counter("frames_processed_total").inc(len(frames))
+            now = time.time()
+
+            # MOTION GATE (every frame, on a downscaled copy)
+            for cam_id, frame in frames:
+                if cam_id in motion_gates:
+                    with timed_stage("motion", cam=cam_id):
+                        moving = motion_gates[cam_id].update(frame, now)
+                    if moving:
+                        scheduler.note_activity(cam_id, now)
+
+            # SCHEDULING (cameras due for analysis, idle motion-gated cameras skipped, within the analysis budget)
+            candidates = []
+            for cam_id in scheduler.due([cam_id for cam_id, _ in frames], now):
+                if cam_id in motion_gates and not motion_gates[cam_id].should_analyse(now):
+                    scheduler.skip(cam_id, now)
+                else:
+                    candidates.append(cam_id)
+            selected = scheduler.select(candidates, now)
+            analyse_frames = [(cam_id, frame) for cam_id, frame in frames if cam_id in selected]
+            if tracker:
+                # Cameras not analysed this tick (not due, over budget or motion-skipped) were not looked at,
+                # their tracks are held rather than counted as missed
+                for cam_id, _ in frames:
+                    if cam_id not in selected:
+                        tracker.keep_alive(cam_id, now)
+
+            # EXTRACTION, ANALYSIS & SAVING (faces from all selected cameras analysed as one batch)
+            if analyse_frames:
+                if update_callback: update_callback(f"Processing frame {frame_counter}")
+
+                if pool and tracker:
+                    # Worker mode with tracking: detect and track here (the tracker decides which faces need analysis),
+                    # queue only those faces, a full queue skips this tick. Crops are copied, shared frames get reused
+                    detect_start = time.perf_counter()
+                    faces = self.select_faces(analyse_frames, tracker, cam_stages, cam_detectors, time.time())
+                    detect_time = time.perf_counter() - detect_start
+                    task_id = None
+                    if faces:
+                        items = [(cam_id, face_img.copy(), faces_coords) for cam_id, face_img, faces_coords, _ in faces]
+                        task_id = pool.submit(items, method="process_faces", cam_actions=cam_actions, keep_crops=keep_crops, result_cache=cache_option)
+                    if task_id is None:
+                        scheduler.record(detect_time, len(analyse_frames))
+                    else:
+                        face_tracks = {(cam_id, *map(int, faces_coords)): track for cam_id, _, faces_coords, track in faces}
+                        for track in face_tracks.values():
+                            track.pending += 1
+                        tasks[task_id] = WorkerTask([], face_tracks, len(items), len(analyse_frames), detect_time)
+                elif pool:
+                    # Worker mode: queue the frames, a full queue skips this tick
+                    # Shared frames stay pinned in their rings until the task's results are collected (or it is given up on)
+                    shared = capture.shareable(analyse_frames)
+                    task_id = pool.submit(shared, cam_stages=cam_stages, cam_actions=cam_actions, keep_crops=keep_crops, result_cache=cache_option, cam_detectors=cam_detectors)
+                    if task_id is None:
+                        capture.release(shared)
+                    else:
+                        tasks[task_id] = WorkerTask(shared, {}, len(shared), len(shared), 0.0)
+                else:
+                    analysis_timer.start()
+
+                    analysis_start = time.perf_counter()
+                    results = self.process(analyse_frames, tracker, cam_stages, cam_actions, keep_crops, cache_option, cam_detectors)
+                    scheduler.record(time.perf_counter() - analysis_start, len(analyse_frames))
+                    results = capture.drop_overwritten(results)
+                    for result in results:
+                        scheduler.note_activity(result["cam_id"], now)
+
+                    if results:
+                        print(f"{len(results)} face(s) detected in the frame(s).")
+                        cam_frames = dict(frames)
+
+                        for result in results:
+                            cam_id = result["cam_id"]
+                            if cam_id not in annotated:
+                                # Drawn on a copy, shared capture frames are views of the ring (read by other processes)
+                                annotated[cam_id] = cam_frames[cam_id].copy()
+                            region = result["region"]
+                            x, y, w, h = region["x"], region["y"], region["w"], region["h"]
+                            cv2.rectangle(annotated[cam_id], (x, y), (x+w, y+h), (0, 255, 0), 2)
+
+                        if not tracker:
+                            self.save_results(results, update_callback, db_writer, embedding_store, crop_store)
+
+                        analysis_counter += 1
+                        face_counter += len(results)
+                        cached_counter += count_cached(results)
+                        METRICS.counter("faces_analysed_total").inc(len(results))
+                    else:
+                        print("No face detected in the frame.")
+                        analysis_timer.reset()
+
+                    analysis_timer.stop()
+
+                print(f"Frame: {frame_counter}")
+
+            # COLLECT WORKER RESULTS (in submission order)
+            if pool:
+                for task_id, results, cost in pool.collect():
+                    task = finish_task(capture, tasks, task_id)
+                    if task and task.frames:
+                        # Cost per frame, worker time for its items plus any detection done here
+                        frame_cost = (task.detect_time + cost * task.items) / task.frames
+                        scheduler.record(frame_cost)
+                        METRICS.histogram("inference_seconds_per_frame").record(frame_cost)
+                    if results:
+                        for result in results:
+                            scheduler.note_activity(result["cam_id"])
+                        if tracker:
+                            add_track_results(tracker, task, results, time.time())
+                        else:
+                            self.save_results(results, update_callback, db_writer, embedding_store, crop_store)
+                        analysis_counter += 1
+                        face_counter += len(results)
+                        cached_counter += count_cached(results)
+                        METRICS.counter("faces_analysed_total").inc(len(results))
+                finish_lost_tasks(capture, pool, tasks)
+
+            # SAVE FINISHED TRACKS (one aggregated record per person)
+            if tracker:
+                records = tracker.expire(time.time())
+                if records:
+                    self.save_results(records, update_callback, db_writer, embedding_store, crop_store)
+                    track_counter += len(records)
+
+            # DISPLAY (optional, rate-limited)
+            if config.display and frames and throttle.due():
+                with timed_stage("display"):
+                    for cam_id, frame in frames:
+                        cv2.imshow(f"{self.name.title()} Model Feed {cam_id}", annotated.get(cam_id, frame))
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+
+            # RUN LIMITS (frames, time, faces, stop signal)
+            stop_reason = limits.reached(frame_counter, face_counter)
+            if stop_reason:
+                msg = f"Stopping analysis: {stop_reason}."
+                if update_callback: update_callback(msg)
+                print(msg)
+                break
+
+        capture.stop()
+
+        # Finish in-flight work before stopping the workers
+        if pool:
+            for task_id, results, _ in pool.drain():
+                task = finish_task(capture, tasks, task_id)
+                if results:
+                    if tracker:
+                        add_track_results(tracker, task, results, time.time())
+                    else:
+                        self.save_results(results, update_callback, db_writer, embedding_store, crop_store)
+                    analysis_counter += 1
+                    face_counter += len(results)
+                    cached_counter += count_cached(results)
+                    METRICS.counter("faces_analysed_total").inc(len(results))
+            pool.stop()
+            METRICS.remove("queue_depth", queue="inference")
+            finish_lost_tasks(capture, None, tasks)
+
+        # Shared frame rings go once the workers are done with them
+        capture.close()
+
+        # Save the tracks still open
+        if tracker:
+            records = tracker.flush()
+            self.save_results(records, update_callback, db_writer, embedding_store, crop_store)
+            track_counter += len(records)
+
+        if crop_store:
+            crop_store.close()
+        db_writer.stop()
+        if retention_worker:
+            retention_worker.stop()
+        close_analysis_logs()
+
+        total_timer.stop()
+        if config.display:
+            cv2.destroyAllWindows()
+
+        # PERFORMANCE SUMMARY
+        summary = f"\n==== {self.name}  MODEL\n"
+        summary += "== Performance Summary\n"
+        summary += f"Processed Frames: {frame_counter}\n"
+        summary += f"Dropped Frames: {capture.dropped()}\n"
+        summary += f"Analysed Frames: {analysis_counter}\n"
+        summary += f"Analysed Faces: {face_counter}\n"
+        if tracker:
+            summary += f"Saved Tracks: {track_counter}\n"
+        if result_cache:
+            summary += f"Cached Results: {cached_counter} ({cached_counter / face_counter * 100 if face_counter else 0:.1f}% of analysed faces)\n"
+        estimated_fps = frame_counter / total_timer.total_time if total_timer.total_time > 0 else 0
+        summary += f"Estimated FPS: {estimated_fps:.2f}\n"
+
+        total_summary = total_timer.summary(False, False)
+        analysis_summary = analysis_timer.summary()
+
+        full_summary = summary + "\n" + total_summary + "\n" + analysis_summary
+        if pool:
+            full_summary += "\n" + pool.summary()
+        if tracker:
+            full_summary += "\n" + tracker.summary()
+        if motion_gates:
+            full_summary += "\n" + motion_summary(motion_gates)
+        full_summary += "\n" + scheduler.summary()
+        full_summary += "\n" + db_writer.summary()
+        if crop_store:
+            full_summary += "\n" + crop_store.summary()
+        if cache:
+            full_summary += "\n" + cache.summary()
+        if retention_worker:
+            full_summary += "\n" + retention_worker.summary()
+        full_summary += "\n" + stage_summary()
+
+        if update_callback: update_callback(full_summary)
+        print(full_summary)
+
+        if config.metrics_path:
+            METRICS.write_snapshot(config.metrics_path)
+        if metrics_server:
+            metrics_server.stop()
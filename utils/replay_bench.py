@@ -0,0 +1,243 @@
+import argparse
+import json
+import multiprocessing as mp
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is reported as None there
+    resource = None
+
+from utils.detection_stage import DetectionStage
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# -----------------------------------
+
+# DEF: Yield frames from a video file
+def video_frames(path):
+    cap = cv2.VideoCapture(str(path))
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+# DEF: Yield frames from a directory of images (sorted by name), looping `loops` times
+def image_frames(folder, loops=1):
+    paths = [p for p in sorted(Path(folder).iterdir()) if p.suffix.lower() in IMAGE_EXTENSIONS]
+    images = [img for img in (cv2.imread(str(p)) for p in paths) if img is not None]
+    for _ in range(loops):
+        yield from images
+
+# DEF: Yield deterministic synthetic frames
+# Noisy backgrounds with faces at seeded positions: face images from face_folder pasted in, or drawn faces
+# (skin-toned ellipses with eyes and a mouth) without one
+def synthetic_frames(count, width=1280, height=720, faces_per_frame=1, face_folder=None, seed=0):
+    rng = np.random.default_rng(seed)
+    faces = list(image_frames(face_folder)) if face_folder else []
+    background = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+    background = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    for i in range(count):
+        frame = np.roll(background, shift=(i * 3) % width, axis=1).copy()
+        for _ in range(faces_per_frame):
+            size = int(rng.integers(height // 8, height // 3))
+            x = int(rng.integers(0, width - size))
+            y = int(rng.integers(0, height - size))
+            if faces:
+                frame[y:y+size, x:x+size] = cv2.resize(faces[int(rng.integers(len(faces)))], (size, size))
+                continue
+            center = (x + size // 2, y + size // 2)
+            cv2.ellipse(frame, center, (size // 3, size // 2 - 2), 0, 0, 360, (140, 170, 210), -1)
+            for eye_x in (center[0] - size // 7, center[0] + size // 7):
+                cv2.circle(frame, (eye_x, center[1] - size // 8), max(2, size // 20), (40, 40, 40), -1)
+            cv2.ellipse(frame, (center[0], center[1] + size // 6), (size // 8, size // 20), 0, 0, 180, (60, 60, 150), -1)
+        yield frame
+
+# DEF: Build a frame source from a source string
+# "synthetic" or "synthetic:<count>", an image directory, or a video file
+def open_source(source, max_frames=None, face_folder=None, seed=0):
+    if source.startswith("synthetic"):
+        count = int(source.split(":", 1)[1]) if ":" in source else (max_frames or 500)
+        return synthetic_frames(count, face_folder=face_folder, seed=seed)
+    if Path(source).is_dir():
+        return image_frames(source)
+    return video_frames(source)
+
+# -----------------------------------
+
+# DEF: Percentiles and mean of a list of durations (seconds)
+def latency_stats(durations):
+    if not durations:
+        return {"count": 0}
+    ordered = sorted(durations)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": ordered[-1],
+    }
+
+# DEF: Peak resident memory of this process in MB (None if unavailable)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+# DEF: Replay a frame source through one model and measure it
+# Each tick takes `cameras` frames from the source as cameras 0..N-1 and runs them through model.process(), the same call
+# the live pipeline makes (detection per frame, all faces analysed in one batch), with its extract and analyse steps timed
+# rate: ticks per second (None = as fast as possible), detection: DetectionStage options (None = full-frame detection)
+# actions: attribute actions to analyse (None = age, gender and race)
+# Returns dict of throughput and per-stage latency stats
+def replay(model_type, source, cameras=1, rate=None, max_frames=None, detector='haar', face_folder=None, seed=0, detection=None, actions=None):
+    from utils.workers import build_model
+    from utils.attributes import ACTIONS, check_actions
+
+    model = build_model(model_type)
+    actions = check_actions(actions if actions is not None else ACTIONS)
+    cam_actions = {cam_id: actions for cam_id in range(cameras)}
+    cam_stages = {cam_id: DetectionStage(**detection) for cam_id in range(cameras)} if detection else None
+    cam_detectors = {cam_id: detector for cam_id in range(cameras)}
+    warm_start = time.perf_counter()
+    if model_type == "hybrid":
+        model.warm_up(detectors=(detector,), actions=actions)
+    else:
+        model.warm_up(actions=actions)
+    warm_up_time = time.perf_counter() - warm_start
+
+    stages = {"detect": [], "analyse": [], "tick": []}
+
+    # Time the model's own extract / analyse steps as process() calls them
+    extract_camera, analyse = model.extract_camera, model.analyse
+    def timed_extract(*args, **kwargs):
+        stage_start = time.perf_counter()
+        faces = extract_camera(*args, **kwargs)
+        stages["detect"].append(time.perf_counter() - stage_start)
+        return faces
+    def timed_analyse(*args, **kwargs):
+        stage_start = time.perf_counter()
+        results = analyse(*args, **kwargs)
+        stages["analyse"].append(time.perf_counter() - stage_start)
+        return results
+    model.extract_camera, model.analyse = timed_extract, timed_analyse
+
+    frames_done = 0
+    faces_done = 0
+    ticks = 0
+
+    frames = open_source(source, max_frames, face_folder, seed)
+    start = time.perf_counter()
+    while max_frames is None or frames_done < max_frames:
+        tick_frames = []
+        for cam_id in range(cameras):
+            frame = next(frames, None)
+            if frame is None:
+                break
+            tick_frames.append((cam_id, frame))
+        if not tick_frames:
+            break
+
+        if rate:
+            # Fixed rate: wait for this tick's slot
+            delay = start + ticks / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        tick_start = time.perf_counter()
+        results = model.process(tick_frames, cam_stages=cam_stages, cam_actions=cam_actions, cam_detectors=cam_detectors)
+        stages["tick"].append(time.perf_counter() - tick_start)
+        faces_done += len(results)
+
+        frames_done += len(tick_frames)
+        ticks += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "model": model_type,
+        "detector": detector if model_type == "hybrid" else "mtcnn",
+        "source": source,
+        "cameras": cameras,
+        "rate": rate,
+        "detection": detection,
+        "actions": list(actions),
+        "warm_up_time": warm_up_time,
+        "frames": frames_done,
+        "ticks": ticks,
+        "faces": faces_done,
+        "elapsed": elapsed,
+        "fps": frames_done / elapsed if elapsed > 0 else 0.0,
+        "faces_per_sec": faces_done / elapsed if elapsed > 0 else 0.0,
+        "stages": {name: latency_stats(durations) for name, durations in stages.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+# DEF: Run replay() in a fresh process so each model's peak RSS is measured on its own
+def replay_isolated(model_type, **kwargs):
+    with mp.get_context("spawn").Pool(1) as pool:
+        return pool.apply(replay, (model_type,), kwargs)
+
+# DEF: Print a short comparison of replay results
+def print_results(results):
+    print(f"{'Model':<8} {'Frames':>7} {'FPS':>8} {'Faces/s':>8} {'Detect p95':>11} {'Analyse p95':>12} {'Tick p99':>9} {'RSS MB':>8}")
+    for r in results:
+        detect = r["stages"]["detect"].get("p95", 0.0) * 1000
+        analyse = r["stages"]["analyse"].get("p95", 0.0) * 1000
+        tick = r["stages"]["tick"].get("p99", 0.0) * 1000
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+        print(f"{r['model']:<8} {r['frames']:>7} {r['fps']:>8.2f} {r['faces_per_sec']:>8.2f} {detect:>9.1f}ms {analyse:>10.1f}ms {tick:>7.1f}ms {rss:>8}")
+
+# Main
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic frames through the models and measure them")
+    parser.add_argument("--source", default="synthetic", help="Video file, image directory, or synthetic[:count]")
+    parser.add_argument("--models", nargs="+", default=["single", "hybrid"], choices=["single", "hybrid"])
+    parser.add_argument("--cameras", type=int, default=1, help="Frames per tick (simulated cameras)")
+    parser.add_argument("--rate", type=float, help="Ticks per second (default: as fast as possible)")
+    parser.add_argument("--max-frames", type=int, help="Stop after this many frames")
+    parser.add_argument("--detector", default="haar", help="Hybrid model detector backend")
+    parser.add_argument("--detect-width", type=int, help="Downscale frames to this width for detection")
+    parser.add_argument("--actions", nargs="*", default=["age", "gender", "race"], choices=["age", "gender", "race"], help="Attributes to analyse")
+    parser.add_argument("--face-folder", help="Face images to paste into synthetic frames (default: drawn faces)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="replay_results.json", help="JSON results file")
+    args = parser.parse_args()
+
+    results = []
+    for model_type in args.models:
+        print(f"Replaying {args.source} through {model_type}...")
+        results.append(replay_isolated(
+            model_type,
+            source=args.source,
+            cameras=args.cameras,
+            rate=args.rate,
+            max_frames=args.max_frames,
+            detector=args.detector,
+            face_folder=args.face_folder,
+            seed=args.seed,
+            detection={"detect_width": args.detect_width} if args.detect_width else None,
+            actions=args.actions
+        ))
+
+    print_results(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to: {args.output}")
+
+if __name__ == "__main__":
+    main()
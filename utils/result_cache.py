@@ -0,0 +1,127 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+from utils.image_hash import dhash, phash, hamming
+
+# Result keys that belong to one face (set again on every hit), not to the cached analysis
+FACE_KEYS = ("cam_id", "region", "crop", "cached")
+
+HASH_METHODS = ("dhash", "phash", "both")
+
+_caches = {}
+
+# -----------------------------------
+
+# CLASS: Analysis results of recently seen face crops, keyed by a perceptual hash of the crop
+# A crop within max_distance bits of a cached crop from the same camera gets that crop's attributes without running the models
+# (seated staff, posters, anyone standing still between sampled frames)
+# - Crops are normalised before hashing (grayscale, crop_size x crop_size, equalised histogram), so small shifts in light still match
+# - method: 'dhash', 'phash', or 'both' (both hashes must be within max_distance, fewest false matches)
+# - Each camera keeps its max_size most recently used results, entries expire ttl seconds after they were analysed
+class ResultCache:
+    def __init__(self, max_size=256, ttl=30.0, max_distance=5, method='both', crop_size=64):
+        if method not in HASH_METHODS:
+            raise ValueError(f"Unknown hash method: {method}. Available: {', '.join(HASH_METHODS)}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.method = method
+        self.crop_size = crop_size
+
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        self.lookups = 0
+        self.hits = 0
+        self.expired = 0
+        self.evicted = 0
+
+    # DEF: Perceptual hashes of a normalised face crop
+    # Returns tuple of hashes (dHash and/or pHash, depending on method)
+    def hash_crop(self, crop):
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        normalised = cv2.equalizeHist(cv2.resize(gray, (self.crop_size, self.crop_size), interpolation=cv2.INTER_AREA))
+        if self.method == 'dhash':
+            return (dhash(normalised),)
+        if self.method == 'phash':
+            return (phash(normalised),)
+        return dhash(normalised), phash(normalised)
+
+    # DEF: Look up a face crop
+    # On a hit, returns a copy of the cached result tagged with the face's camera ID and region (and "cached": True)
+    # Returns (result or None, key), pass the key to put() with the result once a miss has been analysed
+    def get(self, cam_id, crop, coords):
+        hashes = self.hash_crop(crop)
+        now = time.monotonic()
+        with self.lock:
+            self.lookups += 1
+            entries = self.entries.setdefault(cam_id, OrderedDict())
+
+            match = None
+            for entry_id, (entry_hashes, result, stored_at) in list(entries.items()):
+                if now - stored_at > self.ttl:
+                    del entries[entry_id]
+                    self.expired += 1
+                    continue
+                if match is None and all(hamming(a, b) <= self.max_distance for a, b in zip(hashes, entry_hashes)):
+                    match = entry_id
+
+            if match is None:
+                return None, (cam_id, hashes)
+            entries.move_to_end(match)
+            self.hits += 1
+            result = copy.deepcopy(entries[match][1])
+
+        x, y, w, h = coords
+        result["cam_id"] = cam_id
+        result["region"] = {"x": int(x), "y": int(y), "w": int(w), "h": int(h)}
+        result["cached"] = True
+        return result, (cam_id, hashes)
+
+    # DEF: Cache the analysis result of a crop looked up with get()
+    def put(self, key, result):
+        cam_id, hashes = key
+        cached = {name: copy.deepcopy(value) for name, value in result.items() if name not in FACE_KEYS}
+        with self.lock:
+            entries = self.entries.setdefault(cam_id, OrderedDict())
+            entries[hashes] = (hashes, cached, time.monotonic())
+            entries.move_to_end(hashes)
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+                self.evicted += 1
+
+    # DEF: Share of lookups answered from the cache
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    # DEF: Summary of the cache's activity
+    def summary(self):
+        output = "\n== Result Cache Summary\n"
+        output += f"Lookups: {self.lookups}\n"
+        output += f"Hits: {self.hits} ({self.hit_rate() * 100:.1f}%)\n"
+        output += f"Expired: {self.expired}\n"
+        output += f"Evicted: {self.evicted}\n"
+        output += f"Cached results: {sum(len(entries) for entries in self.entries.values())}\n"
+        return output.strip()
+
+# DEF: Get a result cache from process() options
+# A ResultCache is used as is, True or a dict of ResultCache options gets one cache per process and options
+# (inference workers receive the options and each keep their own cache)
+# Returns the ResultCache, or None if caching is off
+def get_result_cache(options):
+    if not options or isinstance(options, ResultCache):
+        return options or None
+    key = repr(sorted(options.items())) if isinstance(options, dict) else "default"
+    cache = _caches.get(key)
+    if cache is None:
+        cache = ResultCache(**(options if isinstance(options, dict) else {}))
+        _caches[key] = cache
+    return cache
+
+# DEF: Number of results answered from a result cache
+def count_cached(results):
+    return sum(1 for result in results if result.get("cached"))
@@ -0,0 +1,312 @@
+import argparse
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Rollup granularities, coarsest first: table name and the length of the ISO timestamp prefix that names a bucket
+# e.g. hour buckets are "2025-04-01T13", day buckets "2025-04-01"
+GRANULARITIES = {
+    "day": ("face_rollup_day", 10),
+    "hour": ("face_rollup_hour", 13),
+    "minute": ("face_rollup_minute", 16),
+}
+
+# Age bands are AGE_BAND years wide, keyed by their lower bound (0, 10, 20, ...)
+AGE_BAND = 10
+
+# Rollup keys cannot be NULL (NULLs never conflict in a primary key), missing values are stored as these
+NO_CAM = -1
+NO_LABEL = ''
+NO_AGE = -1
+
+KEY_COLUMNS = ("cam_id", "gender", "race", "age_band")
+
+# -----------------------------------
+
+# DEF: Create the rollup tables
+def init_rollups(cursor):
+    for table, _ in GRANULARITIES.values():
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TEXT NOT NULL,
+                cam_id INTEGER NOT NULL,
+                gender TEXT NOT NULL,
+                race TEXT NOT NULL,
+                age_band INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                age_sum INTEGER NOT NULL,
+                PRIMARY KEY (bucket, cam_id, gender, race, age_band)
+            ) WITHOUT ROWID
+        ''')
+
+# DEF: Age band of an age (NO_AGE if unknown)
+def age_band(age):
+    return NO_AGE if age is None else int(age) // AGE_BAND * AGE_BAND
+
+# DEF: Add entries to the rollup tables, in the caller's transaction
+# entries: list of (timestamp, cam_id, gender, race, age), aggregated in Python first so each bucket is written once per batch
+def update_rollups(cursor, entries):
+    counts = Counter()
+    age_sums = Counter()
+    for timestamp, cam_id, gender, race, age in entries:
+        key = (
+            NO_CAM if cam_id is None else cam_id,
+            gender or NO_LABEL,
+            race or NO_LABEL,
+            age_band(age),
+        )
+        for granularity, (_, length) in GRANULARITIES.items():
+            bucket_key = (granularity, timestamp[:length]) + key
+            counts[bucket_key] += 1
+            age_sums[bucket_key] += age or 0
+
+    for granularity, (table, _) in GRANULARITIES.items():
+        cursor.executemany(f'''
+            INSERT INTO {table} (bucket, cam_id, gender, race, age_band, count, age_sum)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (bucket, cam_id, gender, race, age_band)
+            DO UPDATE SET count = count + excluded.count, age_sum = age_sum + excluded.age_sum
+        ''', [key[1:] + (count, age_sums[key]) for key, count in counts.items() if key[0] == granularity])
+
+# DEF: SQL statements adding the row NEW to the rollup tables, for triggers on face_data
+# Same buckets and keys as update_rollups()
+def rollup_trigger_statements():
+    statements = []
+    for table, length in GRANULARITIES.values():
+        statements.append(f'''
+        INSERT INTO {table} (bucket, cam_id, gender, race, age_band, count, age_sum)
+        SELECT substr(NEW.timestamp, 1, {length}), COALESCE(NEW.cam_id, {NO_CAM}), COALESCE(NEW.gender, '{NO_LABEL}'),
+               COALESCE(NEW.race, '{NO_LABEL}'), COALESCE(NEW.age / {AGE_BAND} * {AGE_BAND}, {NO_AGE}), 1, COALESCE(NEW.age, 0)
+        WHERE true
+        ON CONFLICT (bucket, cam_id, gender, race, age_band)
+        DO UPDATE SET count = count + 1, age_sum = age_sum + excluded.age_sum;''')
+    return statements
+
+# DEF: Remove every bucket of whole days (ISO dates, e.g. "2025-04-01") from the rollup tables, in the caller's transaction
+# For rows removed a whole day at a time (retention drops day partitions), the days' buckets held exactly those rows
+def drop_rollup_days(cursor, days):
+    ranges = [(day, (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")) for day in days]
+    for table, _ in GRANULARITIES.values():
+        # Every bucket of a day starts with its date, so it sorts from the date up to the next one
+        cursor.executemany(f"DELETE FROM {table} WHERE bucket >= ? AND bucket < ?", ranges)
+
+# DEF: Empty the rollup tables
+def clear_rollups(cursor):
+    for table, _ in GRANULARITIES.values():
+        cursor.execute(f"DELETE FROM {table}")
+
+# DEF: Rebuild every rollup table from face_data (historical data, or after rows were deleted)
+def rebuild_rollups(db_path='db/faces.db'):
+    from utils.db_utils import init_db
+    init_db(db_path)
+
+    start = time.perf_counter()
+    try:
+        conn = sqlite3.connect(db_path)
+        with conn:
+            clear_rollups(conn)
+            for table, length in GRANULARITIES.values():
+                conn.execute(f'''
+                    INSERT INTO {table} (bucket, cam_id, gender, race, age_band, count, age_sum)
+                    SELECT substr(timestamp, 1, {length}),
+                           COALESCE(cam_id, {NO_CAM}),
+                           COALESCE(gender, '{NO_LABEL}'),
+                           COALESCE(race, '{NO_LABEL}'),
+                           COALESCE(age / {AGE_BAND} * {AGE_BAND}, {NO_AGE}),
+                           COUNT(*),
+                           COALESCE(SUM(age), 0)
+                    FROM face_data
+                    WHERE timestamp IS NOT NULL
+                    GROUP BY 1, 2, 3, 4, 5
+                ''')
+        conn.close()
+    except sqlite3.Error as e:
+        print("Rollup Rebuild Error:", e)
+        return False
+    print(f"Rollups rebuilt in {time.perf_counter() - start:.2f} sec")
+    return True
+
+# -----------------------------------
+
+# DEF: Full ISO timestamp string (same format as face_data) of a datetime or ISO string, None passes through
+def to_timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.isoformat(timespec="microseconds")
+
+# DEF: Check whether a timestamp falls exactly on a bucket boundary of a granularity
+def is_aligned(timestamp, length):
+    if timestamp is None:
+        return True
+    # The part below the bucket must be all zero (e.g. "T00:00:00.000000" for days)
+    return all(c in "0:.T" for c in timestamp[length:])
+
+# Length of one bucket of each granularity
+BUCKET_SPANS = {
+    "day": timedelta(days=1),
+    "hour": timedelta(hours=1),
+    "minute": timedelta(minutes=1),
+}
+
+# DEF: Start of the bucket holding a timestamp (ISO string)
+def bucket_floor(timestamp, granularity):
+    return to_timestamp(timestamp[:GRANULARITIES[granularity][1]])
+
+# DEF: First bucket boundary at or after a timestamp (ISO string)
+def bucket_ceil(timestamp, granularity):
+    floor = bucket_floor(timestamp, granularity)
+    if floor == timestamp:
+        return floor
+    return to_timestamp(datetime.fromisoformat(floor) + BUCKET_SPANS[granularity])
+
+# DEF: Split a time range into segments that each rollup answers exactly
+# The whole buckets in the middle come from the coarsest allowed rollup, the partial edges from finer ones
+# (e.g. 04:17 to 09:00 two days later: minutes to 05:00, hours to midnight, whole days, then hours to 09:00)
+# Granularities are at least as fine as the requested interval, minute segments may have unaligned ends
+# Returns list of (granularity, start, end), start / end None for an open end
+def plan_segments(start=None, end=None, interval=None):
+    names = list(GRANULARITIES)
+    return split_segments(start, end, names[names.index(interval):] if interval else names)
+
+# DEF: plan_segments() over a list of granularities, coarsest first
+def split_segments(start, end, granularities):
+    if start is not None and end is not None and start >= end:
+        return []
+    granularity, finer = granularities[0], granularities[1:]
+    if not finer:
+        return [(granularity, start, end)]
+
+    middle_start = None if start is None else bucket_ceil(start, granularity)
+    middle_end = None if end is None else bucket_floor(end, granularity)
+    if middle_start is not None and middle_end is not None and middle_start >= middle_end:
+        # No whole bucket in the range
+        return split_segments(start, end, finer)
+
+    segments = split_segments(start, middle_start, finer) if start is not None else []
+    segments.append((granularity, middle_start, middle_end))
+    if end is not None:
+        segments += split_segments(middle_end, end, finer)
+    return segments
+
+# DEF: Query face counts from the rollup tables
+# start / end: time range (datetime or ISO string, end exclusive), rounded down to minutes
+# interval: None for totals over the range, or "minute" / "hour" / "day" for one row per time bucket
+# group_by: any of "cam_id", "gender", "race", "age_band"
+# cam_id, gender, race filter exactly, min_age / max_age filter by age band
+# Returns list of dicts with the grouping keys, "count" and "mean_age" (None when no ages were known), and "bucket" if interval is set
+def query_rollup(start=None, end=None, interval=None, group_by=(), cam_id=None, gender=None, race=None,
+                 min_age=None, max_age=None, db_path='db/faces.db'):
+    if interval is not None and interval not in GRANULARITIES:
+        raise ValueError(f"Unknown interval: {interval}")
+    for column in group_by:
+        if column not in KEY_COLUMNS:
+            raise ValueError(f"Cannot group by: {column}")
+
+    start, end = to_timestamp(start), to_timestamp(end)
+    segments = plan_segments(start, end, interval)
+    if not segments:
+        return []
+
+    filters, params = [], []
+    if cam_id is not None:
+        filters.append("cam_id = ?")
+        params.append(cam_id)
+    if gender and gender.lower() != "all":
+        filters.append("gender = ?")
+        params.append(gender)
+    if race and race.lower() != "all":
+        filters.append("race = ?")
+        params.append(race)
+    if min_age is not None:
+        filters.append("age_band >= ?")
+        params.append(age_band(min_age))
+    if max_age is not None:
+        filters.append("age_band <= ? AND age_band != ?")
+        params += [age_band(max_age), NO_AGE]
+
+    keys = (["bucket"] if interval else []) + list(group_by)
+    # Buckets of a finer rollup are merged into the requested interval
+    columns = [f"substr(bucket, 1, {GRANULARITIES[interval][1]}) AS bucket" if key == "bucket" else key for key in keys]
+
+    # One SELECT per segment, each from its own rollup table, summed together
+    parts, part_params = [], []
+    for granularity, segment_start, segment_end in segments:
+        table, length = GRANULARITIES[granularity]
+        segment_filters, segment_params = [], []
+        if segment_start is not None:
+            segment_filters.append("bucket >= ?")
+            segment_params.append(segment_start[:length])
+        if segment_end is not None:
+            # A partial end bucket is included only for minute rollups, where it cannot be split further
+            segment_filters.append("bucket < ?" if is_aligned(segment_end, length) else "bucket <= ?")
+            segment_params.append(segment_end[:length])
+        where = segment_filters + filters
+        part = f"SELECT {', '.join(columns + [''])}count, age_sum, CASE WHEN age_band != {NO_AGE} THEN count ELSE 0 END AS aged FROM {table}"
+        if where:
+            part += " WHERE " + " AND ".join(where)
+        parts.append(part)
+        part_params += segment_params + params
+
+    query = f"SELECT {', '.join(keys + [''])}SUM(count), SUM(age_sum), SUM(aged) FROM ({' UNION ALL '.join(parts)})"
+    if keys:
+        positions = ", ".join(str(i + 1) for i in range(len(keys)))
+        query += f" GROUP BY {positions} ORDER BY {positions}"
+    params = part_params
+
+    try:
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+    except sqlite3.Error as e:
+        print("Database error:", e)
+        return []
+
+    results = []
+    for row in rows:
+        values = dict(zip(keys, row[:len(keys)]))
+        count, age_sum, aged = row[len(keys):]
+        if not count:
+            continue
+        for column, missing in (("cam_id", NO_CAM), ("gender", NO_LABEL), ("race", NO_LABEL), ("age_band", NO_AGE)):
+            if values.get(column, None) == missing:
+                values[column] = None
+        values["count"] = count
+        values["mean_age"] = age_sum / aged if aged else None
+        results.append(values)
+    return results
+
+# Main
+# rebuild: recompute the rollups from face_data, query: print counts for a time range
+def main():
+    parser = argparse.ArgumentParser(description="Face count rollups (minute / hour / day)")
+    parser.add_argument("--db", default='db/faces.db')
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Rebuild the rollup tables from face_data")
+
+    query = commands.add_parser("query", help="Print face counts from the rollups")
+    query.add_argument("--start", help="ISO start time (inclusive)")
+    query.add_argument("--end", help="ISO end time (exclusive)")
+    query.add_argument("--interval", choices=list(GRANULARITIES))
+    query.add_argument("--group-by", nargs="*", default=[], choices=KEY_COLUMNS)
+    query.add_argument("--cam", type=int)
+    query.add_argument("--gender")
+    query.add_argument("--race")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rebuild_rollups(args.db)
+        return
+
+    start = time.perf_counter()
+    rows = query_rollup(args.start, args.end, args.interval, args.group_by, args.cam, args.gender, args.race, db_path=args.db)
+    elapsed = time.perf_counter() - start
+    for row in rows:
+        print(row)
+    segments = plan_segments(to_timestamp(args.start), to_timestamp(args.end), args.interval)
+    print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms ({', '.join(granularity for granularity, _, _ in segments)} rollups)")
+
+if __name__ == "__main__":
+    main()
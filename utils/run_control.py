@@ -0,0 +1,125 @@
+import signal
+import threading
+import time
+
+# -----------------------------------
+
+# CLASS: Options of a model run (see FaceModel.run_model)
+# frequency: each camera is analysed at most once every `frequency` frames (at `framerate`), less often when over budget
+# detector: default detector backend (hybrid model), cam_settings: per-camera overrides e.g. {1: {"detector": "yunet"}}
+# workers: number of inference processes (0 = analyse inline), worker_options: InferencePool options
+# tracking: follow faces across frames and save one aggregated record per person, tracker_options: FaceTracker options
+# motion: gate detection on motion (True or MotionGate options), per-camera overrides under cam_settings[cam_id]["motion"]
+# scheduler_options: AnalysisScheduler options (budget, max_latency, priority...)
+# detection: downscale / ROI / face size stage before detection (True or DetectionStage options), per-camera overrides under cam_settings[cam_id]["detection"]
+# actions: attribute actions to run (any of age, gender, race), per-camera overrides under cam_settings[cam_id]["actions"]
+# Only the models the requested actions need are loaded, unanalysed attributes are left empty in the results
+# embeddings: store a face embedding per saved result for "seen before?" searches (True or EmbeddingStore options)
+# crops: keep a JPEG/WebP crop of every saved face as image_path (True or CropStore options)
+# result_cache: reuse the result of a near-identical crop (perceptual hash) seen recently on the same camera instead of analysing it
+# (True or ResultCache options), inference workers each keep their own cache
+# retention: drop face_data days older than this many days in the background, and vacuum the freed pages (days, or RetentionWorker options)
+# shared_capture: capture in separate processes into shared-memory frame rings (True or SharedCaptureGroup options),
+# frames reach the analysis loop and inference workers as views / references instead of copies
+# metrics_port: serve stage latencies, counters and queue depths on http://127.0.0.1:<port>/metrics (Prometheus) and /metrics.json
+# metrics_path: write a JSON snapshot of the metrics at the end of the run
+# display: show the camera feeds (False for headless servers), display_fps: maximum feed refreshes per second
+# max_frames, max_duration (seconds), max_faces: stop the run when any is reached, stop_event: threading.Event that stops the run
+class RunConfig:
+    def __init__(self, framerate=24, frequency=24, cam_ids=(0,), detector='haar', cam_settings=None,
+                 workers=0, worker_options=None, tracking=False, tracker_options=None,
+                 motion=None, scheduler_options=None, detection=None, actions=("age", "gender", "race"),
+                 embeddings=None, crops=None, result_cache=None, retention=None, shared_capture=None,
+                 metrics_port=None, metrics_path=None, display=True, display_fps=None,
+                 max_frames=None, max_duration=None, max_faces=None, stop_event=None):
+        self.framerate = framerate
+        self.frequency = frequency
+        self.cam_ids = list(cam_ids)
+        self.detector = detector
+        self.cam_settings = cam_settings
+        self.workers = workers
+        self.worker_options = worker_options
+        self.tracking = tracking
+        self.tracker_options = tracker_options
+        self.motion = motion
+        self.scheduler_options = scheduler_options
+        self.detection = detection
+        self.actions = actions
+        self.embeddings = embeddings
+        self.crops = crops
+        self.result_cache = result_cache
+        self.retention = retention
+        self.shared_capture = shared_capture
+        self.metrics_port = metrics_port
+        self.metrics_path = metrics_path
+        self.display = display
+        self.display_fps = display_fps
+        self.max_frames = max_frames
+        self.max_duration = max_duration
+        self.max_faces = max_faces
+        self.stop_event = stop_event
+
+    # DEF: Copy of the config with some options changed
+    def replace(self, **options):
+        config = RunConfig(**vars(self))
+        for name, value in options.items():
+            if not hasattr(config, name):
+                raise TypeError(f"Unknown run option: {name}")
+            setattr(config, name, value)
+        return config
+
+# CLASS: Stop conditions for a model run
+# Any of max_frames, max_duration (seconds) and max_faces can be set, stop_event stops the run from outside (signal, GUI)
+class RunLimits:
+    def __init__(self, max_frames=None, max_duration=None, max_faces=None, stop_event=None):
+        self.max_frames = max_frames
+        self.max_duration = max_duration
+        self.max_faces = max_faces
+        self.stop_event = stop_event
+        self.started = time.perf_counter()
+
+    # DEF: Check the limits
+    # Returns the reason to stop, or None to keep running
+    def reached(self, frames, faces):
+        if self.stop_event is not None and self.stop_event.is_set():
+            return "stop requested"
+        if self.max_frames is not None and frames >= self.max_frames:
+            return f"{frames} frames processed"
+        if self.max_faces is not None and faces >= self.max_faces:
+            return f"{faces} faces analysed"
+        if self.max_duration is not None and time.perf_counter() - self.started >= self.max_duration:
+            return f"{self.max_duration} seconds elapsed"
+        return None
+
+# CLASS: Limits how often the camera feeds are drawn
+# fps: maximum display refreshes per second (None = every loop)
+class DisplayThrottle:
+    def __init__(self, fps=None):
+        self.interval = 1.0 / fps if fps else 0.0
+        self.last = None
+
+    # DEF: Check whether a refresh is due, and mark it done if so
+    def due(self, now=None):
+        now = now if now is not None else time.perf_counter()
+        if self.last is not None and now - self.last < self.interval:
+            return False
+        self.last = now
+        return True
+
+# DEF: Route SIGINT/SIGTERM to a stop event so the run drains in-flight work and flushes its writers before exiting
+# A second signal falls back to the default handler (force quit)
+# Must be called from the main thread, returns the stop event
+def install_stop_handlers(stop_event=None):
+    stop_event = stop_event or threading.Event()
+    signals = [signal.SIGINT, signal.SIGTERM]
+    previous = {sig: signal.getsignal(sig) for sig in signals}
+
+    def handle(signum, frame):
+        print(f"\nReceived {signal.Signals(signum).name}, finishing in-flight work... (repeat to force quit)")
+        stop_event.set()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    for sig in signals:
+        signal.signal(sig, handle)
+    return stop_event
@@ -0,0 +1,109 @@
+import math
+import time
+
+# -----------------------------------
+
+# CLASS: Adaptive analysis scheduler
+# Decides which cameras get analysed on each loop, replacing the fixed "every Nth frame" gate
+# - Each camera waits at least min_interval seconds between analyses
+# - The analysis rate is limited so analysis uses at most `budget` of the analysers' time (capacity = parallel analysers),
+#   measured from the recent per-frame analysis cost; under overload the rate drops instead of a backlog building up
+# - With max_latency set, a tick never takes more cameras than fit in that time
+# - Cameras that waited longest go first, cameras with recent faces or motion are weighted up
+class AnalysisScheduler:
+    def __init__(self, cam_ids, min_interval=1.0, budget=0.8, max_latency=None, capacity=1,
+                 priority_window=5.0, priority_boost=3.0, smoothing=0.2):
+        self.cam_ids = list(cam_ids)
+        self.min_interval = min_interval
+        self.budget = budget
+        self.max_latency = max_latency
+        self.capacity = capacity
+        self.priority_window = priority_window
+        self.priority_boost = priority_boost
+        self.smoothing = smoothing
+
+        self.cost = None
+        self.tokens = float(len(self.cam_ids))
+        self.refilled_at = None
+        self.last_analysed = {cam_id: None for cam_id in self.cam_ids}
+        self.last_active = {cam_id: None for cam_id in self.cam_ids}
+
+        self.selected = {cam_id: 0 for cam_id in self.cam_ids}
+        self.deferred = {cam_id: 0 for cam_id in self.cam_ids}
+
+    # DEF: Analyses per second the budget allows at the current cost (None until a cost is measured)
+    def rate(self):
+        if not self.cost:
+            return None
+        return self.capacity * self.budget / self.cost
+
+    # DEF: Cameras whose minimum interval has elapsed
+    def due(self, cam_ids, now=None):
+        now = now if now is not None else time.time()
+        return [cam_id for cam_id in cam_ids
+                if self.last_analysed.get(cam_id) is None or now - self.last_analysed[cam_id] >= self.min_interval]
+
+    # DEF: Mark a camera as active (faces found or motion seen), giving it priority for a while
+    def note_activity(self, cam_id, now=None):
+        self.last_active[cam_id] = now if now is not None else time.time()
+
+    # DEF: Use up a camera's slot without analysing it (e.g. no motion), it is checked again after min_interval
+    def skip(self, cam_id, now=None):
+        self.last_analysed[cam_id] = now if now is not None else time.time()
+
+    # DEF: Choose which of the candidate cameras to analyse now
+    # Returns list of cam IDs, highest priority first
+    def select(self, cam_ids, now=None):
+        now = now if now is not None else time.time()
+        if not cam_ids:
+            return []
+
+        # Refill analysis tokens at the budgeted rate, at most one per camera
+        rate = self.rate()
+        burst = float(len(self.cam_ids))
+        if rate is None:
+            self.tokens = burst
+        elif self.refilled_at is not None:
+            self.tokens = min(burst, self.tokens + rate * (now - self.refilled_at))
+        self.refilled_at = now
+
+        limit = len(cam_ids)
+        if self.max_latency and self.cost:
+            limit = min(limit, max(1, math.floor(self.max_latency * self.capacity / self.cost)))
+
+        chosen = []
+        for cam_id in sorted(cam_ids, key=lambda c: self._priority(c, now), reverse=True):
+            if len(chosen) >= limit or self.tokens < 1.0:
+                self.deferred[cam_id] += 1
+                continue
+            self.tokens -= 1.0
+            chosen.append(cam_id)
+            self.last_analysed[cam_id] = now
+            self.selected[cam_id] += 1
+        return chosen
+
+    # DEF: Priority of a camera, time waited weighted up for recent activity
+    def _priority(self, cam_id, now):
+        last = self.last_analysed.get(cam_id)
+        waited = now - last if last is not None else float("inf")
+        active = self.last_active.get(cam_id)
+        if active is not None and now - active <= self.priority_window:
+            return waited * self.priority_boost
+        return waited
+
+    # DEF: Record the measured cost of analysing `frames` frames (seconds)
+    def record(self, duration, frames=1):
+        if frames <= 0:
+            return
+        cost = duration / frames
+        self.cost = cost if self.cost is None else self.smoothing * cost + (1 - self.smoothing) * self.cost
+
+    # DEF: Summary of the scheduler's decisions
+    def summary(self):
+        output = "\n== Scheduler Summary\n"
+        if self.cost:
+            output += f"Analysis cost: {self.cost:.4f} sec/frame\n"
+            output += f"Budgeted rate: {self.rate():.2f} frames/sec\n"
+        for cam_id in self.cam_ids:
+            output += f"Cam {cam_id}: Analysed: {self.selected[cam_id]}, Deferred (over budget): {self.deferred[cam_id]}\n"
+        return output.strip()
@@ -0,0 +1,222 @@
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+
+import cv2
+
+from utils.frame_ring import FrameRing, attach_ring, release_ring
+from utils.metrics import METRICS
+
+# -----------------------------------
+
+# DEF: Capture one camera into its ring until stopped (capture process thread)
+# Stops after max_failures consecutive failed reads (camera unplugged, end of video file)
+def ring_writer(cam_id, cam, ring, frame_ready, stop_event, max_failures):
+    failures = 0
+    while not stop_event.is_set():
+        ret, frame = cam.read()
+        if not ret:
+            failures += 1
+            if failures == 1:
+                print(f"Capture Error: Could not read frame from camera {cam_id}.")
+            if failures >= max_failures:
+                break
+            time.sleep(0.01)
+            continue
+        failures = 0
+        seq = ring.write(frame, time.time())
+        if seq is None:
+            print(f"Capture Error: Camera {cam_id} changed frame size, frame skipped.")
+            continue
+        if seq:
+            frame_ready.set()
+    ring.end()
+    frame_ready.set()
+
+# DEF: Capture process loop
+# Opens its cameras, creates one ring per camera (sized from the first frame) and reports it to the parent,
+# then writes every frame into the rings until stop_event is set
+def capture_main(cam_ids, framerate, slots, max_failures, report_queue, frame_ready, stop_event):
+    # Ctrl+C reaches the whole process group, the parent decides when capture stops
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from utils.model_utils import open_cam
+
+    cams, rings, threads = [], [], []
+    for cam_id in cam_ids:
+        cam = open_cam(cam_id)
+        if cam is None:
+            report_queue.put(("error", cam_id, "Could not open camera."))
+            continue
+        cam.set(cv2.CAP_PROP_FPS, framerate)
+        cam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        cams.append(cam)
+
+        ret, frame = cam.read()
+        if not ret:
+            report_queue.put(("error", cam_id, "Could not read a first frame."))
+            continue
+        ring = FrameRing.create(frame.shape, slots)
+        ring.write(frame, time.time())
+        rings.append(ring)
+        report_queue.put(("ready", cam_id, ring.spec))
+
+        thread = threading.Thread(target=ring_writer, args=(cam_id, cam, ring, frame_ready, stop_event, max_failures), daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    stop_event.wait()
+    for thread in threads:
+        thread.join(1.0)
+    for cam in cams:
+        cam.release()
+    # The parent removes the rings once every reader is done
+    for ring in rings:
+        ring.close()
+
+# DEF: Split camera IDs between capture processes (round robin)
+def split_cams(cam_ids, processes):
+    return [cam_ids[i::processes] for i in range(processes) if cam_ids[i::processes]]
+
+# -----------------------------------
+
+# CLASS: Cameras captured by separate processes into shared-memory frame rings
+# Same interface as CaptureGroup. Frames are read as NumPy views of the ring slots (no copy),
+# and are sent to inference workers as small SharedFrame references instead of pickled frames
+# processes: capture processes (cameras are split between them), slots: frames kept per camera
+class SharedCaptureGroup:
+    def __init__(self, cam_ids, framerate=24, processes=None, slots=8, max_failures=50):
+        self.cam_ids = list(cam_ids)
+        self.framerate = framerate
+        self.processes_count = max(1, min(len(self.cam_ids), processes or (os.cpu_count() or 1) // 2 or 1))
+        self.slots = slots
+        self.max_failures = max_failures
+
+        self.context = mp.get_context("spawn")
+        self.report_queue = self.context.Queue()
+        self.frame_ready = self.context.Event()
+        self.stop_event = self.context.Event()
+        self.processes = []
+
+        self.rings = {}
+        self.last_refs = {}
+        self.overwritten = 0
+        self.counted = {}
+        self.closed_dropped = 0
+
+    # DEF: Start the capture processes and wait until every camera has a ring
+    # Returns True if every camera opened, otherwise stops everything and returns False
+    def start(self, timeout=30):
+        for process_cams in split_cams(self.cam_ids, self.processes_count):
+            process = self.context.Process(
+                target=capture_main,
+                args=(process_cams, self.framerate, self.slots, self.max_failures, self.report_queue, self.frame_ready, self.stop_event),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+        errors = []
+        deadline = time.time() + timeout
+        while len(self.rings) + len(errors) < len(self.cam_ids):
+            try:
+                status, cam_id, value = self.report_queue.get(timeout=max(0.1, deadline - time.time()))
+            except queue.Empty:
+                errors.append("Timed out waiting for cameras.")
+                break
+            if status == "ready":
+                self.rings[cam_id] = attach_ring(value)
+                self.counted[cam_id] = (0, 0)
+            else:
+                errors.append(f"Camera {cam_id}: {value}")
+
+        if errors:
+            for error in errors:
+                print("Shared Capture Error:", error)
+            self.stop()
+            self.close()
+            return False
+        return True
+
+    # DEF: Get the freshest frame from every camera that has a new one
+    # Waits up to timeout seconds for any camera to deliver a frame
+    # Returns list of (cam ID, seq, timestamp, frame view)
+    def read_latest(self, timeout=0.1):
+        self.frame_ready.wait(timeout)
+        self.frame_ready.clear()
+
+        latest = []
+        for cam_id, ring in self.rings.items():
+            frame = ring.read_latest()
+            self.count_frames(cam_id, ring)
+            if frame is not None:
+                seq, timestamp, view, ref = frame
+                self.last_refs[cam_id] = ref
+                latest.append((cam_id, seq, timestamp, view))
+        return latest
+
+    # DEF: Add the frames captured / dropped since the last read to the metrics (captured in another process)
+    def count_frames(self, cam_id, ring):
+        captured, dropped = ring.captured(), ring.dropped()
+        last_captured, last_dropped = self.counted[cam_id]
+        if captured > last_captured:
+            METRICS.counter("frames_captured_total", cam=cam_id).inc(captured - last_captured)
+        if dropped > last_dropped:
+            METRICS.counter("frames_dropped_total", cam=cam_id).inc(dropped - last_dropped)
+        self.counted[cam_id] = (captured, dropped)
+
+    # DEF: Frames in the form sent to inference workers
+    # Each frame is pinned in its ring (the slot is not reused) until release() is called with the returned list
+    # Returns list of (cam ID, SharedFrame) for the last frames read
+    def shareable(self, frames):
+        shared = []
+        for cam_id, _ in frames:
+            ref = self.last_refs[cam_id]
+            if self.rings[cam_id].pin(ref):
+                shared.append((cam_id, ref))
+        return shared
+
+    # DEF: Unpin frames returned by shareable() (their task's results are in, or the task was skipped or lost)
+    def release(self, shared):
+        for cam_id, ref in shared:
+            ring = self.rings.get(cam_id)
+            if ring is not None:
+                ring.unpin(ref)
+
+    # DEF: Remove results taken from frames that were overwritten while being analysed (in this process)
+    def drop_overwritten(self, results):
+        cams = {result["cam_id"] for result in results}
+        stale = {cam_id for cam_id in cams if not self.rings[cam_id].valid(self.last_refs[cam_id])}
+        if not stale:
+            return results
+        self.overwritten += len(stale)
+        return [result for result in results if result["cam_id"] not in stale]
+
+    # DEF: Check whether every camera has stopped delivering frames
+    def ended(self):
+        return all(ring.ended() for ring in self.rings.values()) or not any(process.is_alive() for process in self.processes)
+
+    # DEF: Total frames overwritten before the analysis loop read them
+    def dropped(self):
+        if not self.rings:
+            return self.closed_dropped
+        return sum(ring.dropped() for ring in self.rings.values())
+
+    # DEF: Stop the capture processes (they release their cameras), the rings stay readable until close()
+    def stop(self, timeout=3):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+    # DEF: Remove the rings (after every reader, including inference workers, is done with them)
+    def close(self):
+        self.closed_dropped = self.dropped()
+        for ring in self.rings.values():
+            release_ring(ring.spec, unlink=True)
+        self.rings = {}
+        self.last_refs = {}
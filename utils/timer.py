@@ -1,9 +1,15 @@
 import time
+from collections import deque
+
+from utils.metrics import Histogram
 
 # CLASS: General performance timer
 # Remembers runs, total time, and average time
+# Keeps only the last max_samples run times, percentiles come from a fixed-size histogram of every run
 class Timer:
-    def __init__(self, label=None, verbose=True):
+    _counter = 0
+
+    def __init__(self, label=None, verbose=True, max_samples=1000):
         if label is None:
             Timer._counter += 1
             label = f"Timer-{Timer._counter}"
@@ -11,11 +17,13 @@ class Timer:
         self.verbose = verbose
         self.start_time = None
         self.total_time = 0.0
+        self.success_time = 0.0
         self.call_count = 0
         self.success_call_count = 0
-        self.times = []
-        self.success_times = []
-    
+        self.times = deque(maxlen=max_samples)
+        self.success_times = deque(maxlen=max_samples)
+        self.histogram = Histogram()
+
     # DEF: Start a timer
     def start(self):
         if self.start_time is not None:
@@ -29,40 +37,54 @@ class Timer:
         return time.perf_counter() - self.start_time
 
     # DEF: Stop the timer and return elapsed time
+    # Counts as a successful run
     def stop(self):
         if self.start_time is None:
             return "Timer is not running. Call start() before stopping."
         duration = time.perf_counter() - self.start_time
         self.total_time += duration
+        self.success_time += duration
         self.call_count += 1
+        self.success_call_count += 1
         self.times.append(duration)
+        self.success_times.append(duration)
+        self.histogram.record(duration)
         self.start_time = None
 
         if self.verbose and self.label:
             print(f"[T:{self.label}] Run {self.call_count}: {duration:.4f} seconds")
 
         return duration
-    
+
     # DEF: Reset the timer to initial state
     # Adds to call count and overall times list
-    # Does not add to successful call count or successful times list
+    # Does not add to total time, successful call count or successful times list
     def reset(self):
+        if self.start_time is None:
+            return 0.0
         duration = time.perf_counter() - self.start_time
         self.start_time = None
         self.call_count += 1
         self.times.append(duration)
+        self.histogram.record(duration)
         if self.verbose and self.label:
             print(f"[T:{self.label}] Run {self.call_count}: RESET")
         return 0.0
-    
+
     # DEF: Get the average time of all runs
     def average(self):
-        avg_success_time = self.total_time / self.success_call_count if self.success_call_count > 0 else 0.0
-        avg_time = self.total_time / self.call_count if self.call_count > 0 else 0.0
-        return avg_time
-    
+        return self.total_time / self.call_count if self.call_count > 0 else 0.0
+
+    # DEF: Get the average time of successful runs
+    def average_success(self):
+        return self.success_time / self.success_call_count if self.success_call_count > 0 else 0.0
+
+    # DEF: Get the time at a percentile (0-100) of all runs
+    def percentile(self, p):
+        return self.histogram.percentile(p / 100)
+
     # DEF: Print a summary of the timer object
-    # Includes total time, call count (+successful), and average time (+successful)
+    # Includes total time, call count (+successful), average time (+successful) and percentiles
     def summary(self, print_runs=True, print_avg=True):
         output = f"\n== Timer Summary: {self.label or 'Unnamed'}\n"
         output += f"Time: {self.total_time:.4f} sec\n"
@@ -73,9 +95,11 @@ class Timer:
         if print_avg:
             output += f"Average time: {self.average():.4f} sec\n"
             if self.success_call_count > 0:
-                output += f"Average successful time: {self.total_time / self.success_call_count:.4f} sec\n"
+                output += f"Average successful time: {self.average_success():.4f} sec\n"
+            if self.call_count > 1:
+                output += f"p50 / p95 / p99: {self.percentile(50):.4f} / {self.percentile(95):.4f} / {self.percentile(99):.4f} sec\n"
         return output.strip()
-    
-    # DEF: Get the times list
+
+    # DEF: Get the times list (most recent max_samples runs)
     def get_times(self):
-        return self.times
\ No newline at end of file
+        return list(self.times)
@@ -0,0 +1,235 @@
+from collections import Counter
+
+# -----------------------------------
+
+# DEF: Intersection over union of two boxes (x, y, w, h)
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+# DEF: Distance between two box centres, relative to the size of the first box
+def centroid_distance(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    dx = (ax + aw / 2) - (bx + bw / 2)
+    dy = (ay + ah / 2) - (by + bh / 2)
+    return (dx * dx + dy * dy) ** 0.5 / max(aw, ah, 1)
+
+# DEF: Confidence of a result's dominant gender and race (lowest of the two, 0-100)
+def result_confidence(result):
+    scores = []
+    if result.get("dominant_gender") and isinstance(result.get("gender"), dict):
+        scores.append(result["gender"].get(result["dominant_gender"], 0.0))
+    if result.get("dominant_race") and isinstance(result.get("race"), dict):
+        scores.append(result["race"].get(result["dominant_race"], 0.0))
+    return min(scores) if scores else 0.0
+
+# -----------------------------------
+
+# CLASS: One tracked face on one camera
+# Holds the latest box and the attribute results gathered for the person so far
+class Track:
+    def __init__(self, track_id, cam_id, box, timestamp):
+        self.id = track_id
+        self.cam_id = cam_id
+        self.box = box
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+        # Observations of the camera in a row without a matching face
+        self.missed = 0
+        # Last time the camera delivered a frame, observed or not
+        self.alive_at = timestamp
+
+        self.results = 0
+        self.ages = []
+        self.genders = Counter()
+        self.races = Counter()
+        self.best_confidence = 0.0
+        self.embedding = None
+        self.crop = None
+        self.analysed_at = None
+        self.analysed_area = 0
+        # Analyses sent to inference workers and not back yet, the track does not expire while any are out
+        self.pending = 0
+
+    # DEF: Add an attribute result to the track's aggregate
+    # Gender and race are confidence-weighted votes, age is the mean, the embedding and crop are the most confident result's
+    def add_result(self, result, timestamp):
+        self.results += 1
+        self.analysed_at = timestamp
+        self.analysed_area = self.box[2] * self.box[3]
+
+        confidence = result_confidence(result)
+        best = confidence >= self.best_confidence
+        if result.get("embedding") is not None and (self.embedding is None or best):
+            self.embedding = result["embedding"]
+        if result.get("crop") is not None and (self.crop is None or best):
+            self.crop = result["crop"]
+        self.best_confidence = max(self.best_confidence, confidence)
+        if result.get("age") is not None:
+            self.ages.append(result["age"])
+        if result.get("dominant_gender"):
+            self.genders[result["dominant_gender"]] += max(confidence, 1.0)
+        if result.get("dominant_race"):
+            self.races[result["dominant_race"]] += max(confidence, 1.0)
+
+    # DEF: Build the aggregated record for the track (same keys as an analysis result)
+    def record(self):
+        x, y, w, h = self.box
+        record = {
+            "track_id": self.id,
+            "cam_id": self.cam_id,
+            "region": {"x": int(x), "y": int(y), "w": int(w), "h": int(h)},
+            "age": int(round(sum(self.ages) / len(self.ages))) if self.ages else None,
+            "dominant_gender": self.genders.most_common(1)[0][0] if self.genders else None,
+            "dominant_race": self.races.most_common(1)[0][0] if self.races else None,
+            "confidence": self.best_confidence,
+            "samples": self.results,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+        if self.embedding is not None:
+            record["embedding"] = self.embedding
+        if self.crop is not None:
+            record["crop"] = self.crop
+        return record
+
+# CLASS: Associates face detections across frames into per-camera tracks
+# Matches by IoU, falling back to centroid distance for fast-moving faces
+# Decides when a track needs (re-)analysis and emits one aggregated record per finished track
+# A track finishes after max_missed observations of its camera without its face, however far apart the scheduler
+# spaces them, or after max_age seconds without a frame from its camera at all (camera gone)
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_distance=0.75, max_missed=3, max_age=30.0, reanalyse_interval=None,
+                 target_confidence=80.0, retry_interval=1.0, growth_factor=1.5):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.max_age = max_age
+        self.reanalyse_interval = reanalyse_interval
+        self.target_confidence = target_confidence
+        self.retry_interval = retry_interval
+        self.growth_factor = growth_factor
+
+        self.tracks = {}
+        self.created = 0
+        self.analyses = 0
+        self.skipped = 0
+
+    # DEF: Match a camera's face boxes to its tracks, creating tracks for new faces
+    # Returns list of tracks in the same order as boxes
+    def update(self, cam_id, boxes, timestamp):
+        cam_tracks = [track for track in self.tracks.values() if track.cam_id == cam_id]
+        assigned = [None] * len(boxes)
+        used = set()
+
+        # Greedy IoU matching, best overlaps first
+        pairs = sorted(
+            ((iou(track.box, box), t, b) for t, track in enumerate(cam_tracks) for b, box in enumerate(boxes)),
+            reverse=True
+        )
+        for score, t, b in pairs:
+            if score < self.iou_threshold:
+                break
+            if t in used or assigned[b] is not None:
+                continue
+            assigned[b] = cam_tracks[t]
+            used.add(t)
+
+        # Centroid fallback for boxes that moved too far to overlap
+        for b, box in enumerate(boxes):
+            if assigned[b] is not None:
+                continue
+            candidates = [(centroid_distance(track.box, box), t) for t, track in enumerate(cam_tracks) if t not in used]
+            if candidates:
+                distance, t = min(candidates)
+                if distance <= self.max_distance:
+                    assigned[b] = cam_tracks[t]
+                    used.add(t)
+                    continue
+            self.created += 1
+            track = Track(self.created, cam_id, box, timestamp)
+            self.tracks[track.id] = track
+            assigned[b] = track
+
+        for track, box in zip(assigned, boxes):
+            if track.last_seen != timestamp:
+                track.hits += 1
+            track.box = box
+            track.last_seen = timestamp
+            track.alive_at = max(track.alive_at, timestamp)
+            track.missed = 0
+
+        # The camera was observed and these faces were not in it
+        seen = {track.id for track in assigned}
+        for track in cam_tracks:
+            if track.id not in seen:
+                track.missed += 1
+                track.alive_at = max(track.alive_at, timestamp)
+        return assigned
+
+    # DEF: Check whether a track's face should be sent for attribute analysis
+    # Analyses once per track, then again when the interval elapses, the result was low-confidence,
+    # or the face has grown enough (moved closer) to give a better crop. Never while an analysis is still out with a worker
+    def should_analyse(self, track, timestamp):
+        since = None if track.analysed_at is None else timestamp - track.analysed_at
+        analyse = not track.pending and (
+            since is None
+            or (self.reanalyse_interval is not None and since >= self.reanalyse_interval)
+            or (track.best_confidence < self.target_confidence and since >= self.retry_interval)
+            or (track.box[2] * track.box[3] >= track.analysed_area * self.growth_factor)
+        )
+        if analyse:
+            self.analyses += 1
+        else:
+            self.skipped += 1
+        return analyse
+
+    # DEF: Add an analysis result to a track
+    def add_result(self, track, result, timestamp):
+        track.add_result(result, timestamp)
+        result["track_id"] = track.id
+
+    # DEF: Keep a camera's tracks alive without observing it
+    # For cameras that delivered a frame but were not analysed (deferred by the scheduler or skipped because nothing moved):
+    # not looking is not a miss, so their tracks are held until the camera is observed again
+    def keep_alive(self, cam_id, timestamp):
+        for track in self.tracks.values():
+            if track.cam_id == cam_id:
+                track.alive_at = max(track.alive_at, timestamp)
+
+    # DEF: Remove tracks missed max_missed times, or whose camera sent nothing for max_age seconds
+    # Tracks waiting for a worker's analysis stay
+    # Returns aggregated records for finished tracks that have at least one result
+    def expire(self, timestamp):
+        finished = [
+            track for track in self.tracks.values()
+            if not track.pending and (
+                track.missed >= self.max_missed
+                or (self.max_age is not None and timestamp - track.alive_at > self.max_age)
+            )
+        ]
+        for track in finished:
+            del self.tracks[track.id]
+        return [track.record() for track in finished if track.results]
+
+    # DEF: Finish every track (end of run)
+    # Returns aggregated records for tracks that have at least one result
+    def flush(self):
+        records = [track.record() for track in self.tracks.values() if track.results]
+        self.tracks = {}
+        return records
+
+    # DEF: Summary of the tracker's activity
+    def summary(self):
+        output = "\n== Tracker Summary\n"
+        output += f"Tracks: {self.created}\n"
+        output += f"Analyses run: {self.analyses}\n"
+        output += f"Analyses skipped: {self.skipped}\n"
+        return output.strip()
@@ -0,0 +1,34 @@
+import threading
+from collections import deque
+
+# -----------------------------------
+
+# CLASS: Coalesces status updates from model threads for the GUI
+# Model threads publish() as often as they like, the GUI drain()s at its own fixed rate
+# Only the last capacity messages are kept, older ones are overwritten (counted as coalesced)
+class UpdateBus:
+    def __init__(self, capacity=32):
+        self.lock = threading.Lock()
+        self.messages = deque(maxlen=capacity)
+        self.published = 0
+        self.delivered = 0
+
+    # DEF: Publish a status message (any thread)
+    def publish(self, message):
+        with self.lock:
+            self.messages.append(message)
+            self.published += 1
+
+    # DEF: Take every buffered message, oldest first (GUI thread)
+    # Returns list of messages, empty if nothing was published since the last drain
+    def drain(self):
+        with self.lock:
+            messages = list(self.messages)
+            self.messages.clear()
+            self.delivered += len(messages)
+        return messages
+
+    # DEF: Number of messages overwritten before the GUI saw them
+    def coalesced(self):
+        with self.lock:
+            return self.published - self.delivered - len(self.messages)
@@ -0,0 +1,293 @@
+import multiprocessing as mp
+import os
+import queue
+import signal
+import time
+
+# Heavy imports (TensorFlow, DeepFace, the model modules) happen inside the workers,
+# after the thread settings are applied, so this module stays cheap to import
+
+# -----------------------------------
+
+# DEF: Apply per-worker CPU affinity and TensorFlow thread counts
+# Must run before TensorFlow is imported in the worker process
+def configure_worker(intra_op_threads=1, inter_op_threads=1, cpu_ids=None):
+    if cpu_ids and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpu_ids)
+        except OSError as e:
+            print("Worker Affinity Error:", e)
+
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra_op_threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op_threads)
+    os.environ["OMP_NUM_THREADS"] = str(intra_op_threads)
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+# DEF: Build a model object by type name
+def build_model(model_type):
+    if model_type == "single":
+        from intellai_single import SingleModel
+        return SingleModel()
+    if model_type == "hybrid":
+        from intellai_hybrid import HybridModel
+        return HybridModel()
+    raise ValueError(f"Unknown model type: {model_type}")
+
+# DEF: Worker process loop
+# Holds a warm model and runs each task's model method (process() on frames, process_faces() on extracted faces)
+# until it receives None
+# Frames sent as SharedFrame references are read in place from the shared-memory rings,
+# results from frames overwritten while being processed are dropped
+def worker_main(worker_id, model_type, warm_up_kwargs, task_queue, result_queue, intra_op_threads, inter_op_threads, cpu_ids):
+    # Ctrl+C reaches the whole process group, the parent decides when workers stop (after draining)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_worker(intra_op_threads, inter_op_threads, cpu_ids)
+    from utils.frame_ring import resolve_frames, drop_overwritten
+
+    model = build_model(model_type)
+    try:
+        model.warm_up(**warm_up_kwargs)
+    except Exception as e:
+        print(f"Worker {worker_id} Warm-up Error:", e)
+    result_queue.put(("ready", worker_id, None))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, method, frames, process_kwargs = task
+        # Lets the pool tell which task was lost if this worker dies
+        result_queue.put(("started", worker_id, task_id))
+        start = time.perf_counter()
+        try:
+            frames, refs = resolve_frames(frames) if method == "process" else (frames, {})
+            results = getattr(model, method)(frames, **process_kwargs)
+            if refs:
+                results, _ = drop_overwritten(results, refs)
+        except Exception as e:
+            print(f"Worker {worker_id} Process Error:", e)
+            results = []
+        cost = (time.perf_counter() - start) / max(1, len(frames))
+        result_queue.put((task_id, worker_id, results, cost))
+
+# DEF: Split the available CPUs evenly between workers
+# Returns one list of CPU IDs per worker
+def split_cpus(workers):
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cpus) // workers)
+    return [cpus[(i * per_worker) % len(cpus):][:per_worker] for i in range(workers)]
+
+# -----------------------------------
+
+# CLASS: Pool of long-lived inference processes, each holding a warm detector and attribute models
+# Frames are dispatched through a bounded queue and results are returned in submission order
+# - A worker that exits is restarted (at most max_restarts times per pool), the task it was running is given up
+# - A task without a result task_timeout seconds after it was submitted is given up, later tasks are not held back by it
+class InferencePool:
+    def __init__(self, model_type, workers=None, queue_size=None, intra_op_threads=1, inter_op_threads=1, cpu_affinity=False, warm_up_kwargs=None,
+                 task_timeout=30.0, max_restarts=3):
+        self.model_type = model_type
+        self.workers = workers or max(1, (os.cpu_count() or 1) // max(1, intra_op_threads))
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.warm_up_kwargs = warm_up_kwargs or {}
+        self.task_timeout = task_timeout
+        self.max_restarts = max_restarts
+
+        if cpu_affinity is True:
+            self.cpu_ids = split_cpus(self.workers)
+        elif cpu_affinity:
+            self.cpu_ids = list(cpu_affinity)
+        else:
+            self.cpu_ids = [None] * self.workers
+
+        # spawn: workers must not inherit a forked TensorFlow runtime
+        self.context = mp.get_context("spawn")
+        self.task_queue = self.context.Queue(maxsize=queue_size or self.workers * 2)
+        self.result_queue = self.context.Queue()
+        self.processes = []
+
+        self.next_task_id = 0
+        self.next_result_id = 0
+        self.pending = {}
+        self.submit_times = {}
+        # Task each worker is running (from its "started" message), and tasks given up on
+        self.running = {}
+        self.lost = set()
+        self.latency_total = 0.0
+        self.completed = 0
+        self.lost_count = 0
+        self.restarts = 0
+        self.skipped = 0
+
+    # DEF: Start one worker process
+    def _start_worker(self, worker_id):
+        process = self.context.Process(
+            target=worker_main,
+            args=(worker_id, self.model_type, self.warm_up_kwargs, self.task_queue, self.result_queue,
+                  self.intra_op_threads, self.inter_op_threads, self.cpu_ids[worker_id % len(self.cpu_ids)]),
+            daemon=True
+        )
+        process.start()
+        return process
+
+    # DEF: Start the worker processes and wait until every worker has warmed up
+    def start(self, timeout=300):
+        for worker_id in range(self.workers):
+            self.processes.append(self._start_worker(worker_id))
+
+        ready = 0
+        deadline = time.time() + timeout
+        while ready < self.workers:
+            try:
+                message = self.result_queue.get(timeout=1.0)
+            except queue.Empty:
+                # A worker that exits while warming up (failed import, out of memory) never reports ready
+                exited = [process for process in self.processes if not process.is_alive()]
+                if exited or time.time() > deadline:
+                    reason = f"{len(exited)} exited while warming up" if exited else "timed out"
+                    raise RuntimeError(f"Only {ready} of {self.workers} inference workers started ({reason}).")
+                continue
+            if message[0] == "ready":
+                ready += 1
+
+    # DEF: Submit a set of frames (one sampling tick) for processing
+    # method: model method run on them, "process" (frames) or "process_faces" (extracted faces, list of (cam ID, face image, coords))
+    # Returns the task ID, or None if the queue is full and block is False, or no worker is left (the tick is skipped)
+    def submit(self, frames, block=False, method="process", **process_kwargs):
+        if not any(self.processes):
+            self.skipped += 1
+            return None
+        task_id = self.next_task_id
+        try:
+            self.task_queue.put((task_id, method, frames, process_kwargs), block=block)
+        except queue.Full:
+            self.skipped += 1
+            return None
+        self.next_task_id += 1
+        self.submit_times[task_id] = time.perf_counter()
+        return task_id
+
+    # DEF: Give up on a task, its place in the result order is skipped
+    def _lose(self, task_id):
+        if task_id in self.lost or task_id < self.next_result_id or task_id in self.pending:
+            return
+        self.lost.add(task_id)
+        self.submit_times.pop(task_id, None)
+        self.lost_count += 1
+
+    # DEF: Restart workers that exited, giving up on the task each was running
+    def _check_workers(self):
+        for worker_id, process in enumerate(self.processes):
+            if process is None or process.is_alive():
+                continue
+            task_id = self.running.pop(worker_id, None)
+            if task_id is not None:
+                self._lose(task_id)
+            print(f"Inference Worker Error: worker {worker_id} exited (code {process.exitcode}).")
+            if self.restarts < self.max_restarts:
+                self.restarts += 1
+                self.processes[worker_id] = self._start_worker(worker_id)
+            else:
+                self.processes[worker_id] = None
+
+    # DEF: Give up on tasks without a result after task_timeout seconds
+    def _expire_tasks(self):
+        if not self.task_timeout:
+            return
+        now = time.perf_counter()
+        for task_id in range(self.next_result_id, self.next_task_id):
+            submitted = self.submit_times.get(task_id)
+            if submitted is not None and now - submitted > self.task_timeout:
+                print(f"Inference Worker Error: task {task_id} timed out after {self.task_timeout:.0f} sec.")
+                self._lose(task_id)
+
+    # DEF: Collect finished results in submission order
+    # Results that finish early wait in a reorder buffer until all earlier tasks are done or given up on
+    # Returns list of (task ID, results, processing cost per frame in seconds, per face for process_faces tasks)
+    def collect(self, timeout=0.0):
+        while True:
+            try:
+                message = self.result_queue.get(timeout=timeout) if timeout else self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            timeout = 0.0
+            if message[0] == "ready":
+                # A restarted worker has warmed up
+                continue
+            if message[0] == "started":
+                _, worker_id, task_id = message
+                self.running[worker_id] = task_id
+                continue
+
+            task_id, worker_id, results, cost = message
+            if self.running.get(worker_id) == task_id:
+                del self.running[worker_id]
+            if task_id < self.next_result_id:
+                # Given up on and already skipped, too late to keep its place in the order
+                continue
+            self.lost.discard(task_id)
+            self.pending[task_id] = (results, cost)
+            submitted = self.submit_times.pop(task_id, None)
+            if submitted is not None:
+                self.latency_total += time.perf_counter() - submitted
+                self.completed += 1
+
+        self._check_workers()
+        self._expire_tasks()
+
+        ordered = []
+        while self.next_result_id < self.next_task_id:
+            if self.next_result_id in self.pending:
+                ordered.append((self.next_result_id, *self.pending.pop(self.next_result_id)))
+            elif self.next_result_id in self.lost:
+                self.lost.discard(self.next_result_id)
+            else:
+                break
+            self.next_result_id += 1
+        return ordered
+
+    # DEF: Number of submitted tasks without a collected result
+    def in_flight(self):
+        return self.next_task_id - self.next_result_id
+
+    # DEF: Wait for all in-flight tasks and return their results in order
+    def drain(self, timeout=30):
+        drained = []
+        deadline = time.time() + timeout
+        while self.in_flight() > 0 and time.time() < deadline:
+            drained.extend(self.collect(timeout=0.1))
+        return drained
+
+    # DEF: Stop all workers
+    def stop(self, timeout=5):
+        processes = [process for process in self.processes if process is not None]
+        for _ in processes:
+            try:
+                self.task_queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for process in processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+    # DEF: Summary of the pool's performance
+    def summary(self):
+        output = f"\n== Worker Pool Summary: {self.model_type} x{self.workers}\n"
+        output += f"Tasks: {self.completed}\n"
+        output += f"Skipped ticks (queue full): {self.skipped}\n"
+        if self.lost_count:
+            output += f"Lost tasks (worker exited / timed out): {self.lost_count}\n"
+        if self.restarts:
+            output += f"Worker restarts: {self.restarts}\n"
+        if self.completed > 0:
+            output += f"Average task latency: {self.latency_total / self.completed:.4f} sec\n"
+        return output.strip()